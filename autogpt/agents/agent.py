@@ -8,15 +8,18 @@ from typing import TYPE_CHECKING, Any, Optional
 
 if TYPE_CHECKING:
     from autogpt.config import AIConfig, Config
+    from autogpt.json_utils.response_parser import ParsedResponse
     from autogpt.llm.base import ChatModelResponse, ChatSequence
     from autogpt.memory.vector import VectorMemory
     from autogpt.models.command_registry import CommandRegistry
 
-from autogpt.json_utils.utilities import extract_dict_from_response, validate_dict
+from autogpt.commands.command_cache import EarlyCommand, is_read_only_call
+from autogpt.json_utils.utilities import log_parse_result, validate_dict
 from autogpt.llm.api_manager import ApiManager
 from autogpt.llm.base import Message
 from autogpt.llm.utils import count_string_tokens
-from autogpt.logs import logger
+from autogpt.logs import background_writer, logger
+from autogpt.logs.tracing import traced
 from autogpt.logs.log_cycle import (
     CURRENT_CONTEXT_FILE_NAME,
     FULL_MESSAGE_HISTORY_FILE_NAME,
@@ -24,6 +27,8 @@ from autogpt.logs.log_cycle import (
     USER_INPUT_FILE_NAME,
     LogCycleHandler,
 )
+from autogpt.processing.local_summary import LocalSummarizer
+from autogpt.processing.result_condenser import ResultCondenser
 from autogpt.workspace import Workspace
 
 from .base import AgentThoughts, BaseAgent, CommandArgs, CommandName
@@ -63,6 +68,18 @@ class Agent(BaseAgent):
         self.log_cycle_handler = LogCycleHandler()
         """LogCycleHandler for structured debug logging."""
 
+        self.result_condenser = ResultCondenser(
+            lambda text: count_string_tokens(text, self.llm.name),
+            token_budget=config.command_result_token_budget,
+        )
+        """Cuts long command results down to what matters, e.g. errors in build logs."""
+
+        self.local_summarizer = LocalSummarizer(
+            lambda text: count_string_tokens(text, self.llm.name),
+            max_tokens=config.local_summary_max_tokens,
+        )
+        """Summarizes trivial command results without a summary cycle."""
+
     def construct_base_prompt(self, *args, **kwargs) -> ChatSequence:
         if kwargs.get("prepend_messages") is None:
             kwargs["prepend_messages"] = []
@@ -105,6 +122,11 @@ class Agent(BaseAgent):
     def on_before_think(self, *args, **kwargs) -> ChatSequence:
         prompt = super().on_before_think(*args, **kwargs)
 
+        if self.early_command is not None:
+            # Started for a response whose command was never executed
+            self.early_command.wait()
+            self.early_command = None
+
         self.log_cycle_handler.log_count_within_cycle = 0
         self.log_cycle_handler.log_cycle(
             self.ai_config.ai_name,
@@ -122,12 +144,44 @@ class Agent(BaseAgent):
         )
         return prompt
 
+    def on_command_ready(self, command_name: CommandName, command_args: CommandArgs) -> None:
+        """Starts a read-only command while the rest of its response is streaming.
+
+        `execute` uses the result if it is asked to execute the same call.
+        """
+        if (
+            command_name == "human_feedback"
+            or command_name not in self.command_registry
+            or not is_read_only_call(command_name, command_args)
+        ):
+            return
+        if self.early_command is not None:
+            # The response of an earlier attempt of this cycle was discarded
+            self.early_command.wait()
+        logger.debug(f"Starting {command_name} {command_args} before the response is complete")
+        self.early_command = EarlyCommand(
+            command_name,
+            command_args,
+            lambda: execute_command(command_name, command_args, agent=self),
+        )
+
+    @traced()
     def execute(
         self,
         command_name: str | None,
         command_args: dict[str, str] | None,
         user_input: str | None,
     ) -> str:
+        early_command, self.early_command = self.early_command, None
+        if early_command is not None and not early_command.matches(command_name, command_args):
+            # Never run two commands in the container at once, and let it cache its
+            # output before a writing command invalidates the cache
+            early_command.wait()
+            early_command = None
+
+        # Commands that may write invalidate the cached output of read-only commands
+        self.command_cache.begin(command_name, command_args)
+
         # Execute command
         if command_name is not None and command_name.lower().startswith("error"):
             result = f"Could not execute command: {command_name}{command_args}"
@@ -146,23 +200,30 @@ class Agent(BaseAgent):
                 if not plugin.can_handle_pre_command():
                     continue
                 command_name, arguments = plugin.pre_command(command_name, command_args)
-            command_result = execute_command(
-                command_name=command_name,
-                arguments=command_args,
-                agent=self,
-            )
+            if early_command is not None and early_command.matches(command_name, command_args):
+                logger.debug(f"Using the result of {command_name}, started while streaming")
+                command_result = early_command.result()
+            else:
+                if early_command is not None:
+                    early_command.wait()
+                command_result = execute_command(
+                    command_name=command_name,
+                    arguments=command_args,
+                    agent=self,
+                )
 
-            if len(str(command_result)) < 15000:
+            condensed = self.result_condenser.condense(str(command_result))
+            if not condensed.dropped_regions:
                 result = f"Command {command_name} returned: " f"{command_result}"
             else:
-                result = f"Command {command_name} returned a lengthy response, we truncated it: " f"The first 7000 characters:\n{str(command_result)[:7000]}\n...The last 7000 characters:\n{str(command_result)[-7000:]}"
-            result_tlength = count_string_tokens(str(command_result), self.llm.name)
-            memory_tlength = count_string_tokens(
-                str(self.history.summary_message()), self.llm.name
-            )
-            #if result_tlength + memory_tlength > self.send_token_limit:
-            #    result = f"Failure: command {command_name} returned too much output. \
-            #        Do not execute this command again with the same arguments."
+                logger.debug(
+                    f"Condensed result of {command_name}: kept {condensed.kept_windows}"
+                    f" error windows, dropped {condensed.dropped_lines} lines"
+                )
+                result = (
+                    f"Command {command_name} returned a lengthy response, we condensed it:\n"
+                    f"{condensed.text}"
+                )
 
             for plugin in self.config.plugins:
                 if not plugin.can_handle_post_command():
@@ -178,23 +239,29 @@ class Agent(BaseAgent):
 
 
     def parse_and_process_response(
-        self, llm_response: ChatModelResponse, *args, **kwargs
+        self,
+        llm_response: ChatModelResponse,
+        parsed_response: ParsedResponse,
+        *args,
+        **kwargs,
     ) -> tuple[CommandName | None, CommandArgs | None, AgentThoughts]:
         if not llm_response.content:
             raise SyntaxError("Assistant response has no text content")
-        with open("experimental_setups/experiments_list.txt") as eht:
-            exps = eht.read().splitlines()
+        exps = self.file_cache.read_lines("experimental_setups/experiments_list.txt")
 
-        with open(os.path.join("experimental_setups", exps[-1], "responses", "model_responses_{}".format(self.project_path)), "a+") as patf:
-            patf.write(llm_response.content)
-        assistant_reply_dict = extract_dict_from_response(llm_response.content)
+        background_writer.write(
+            os.path.join("experimental_setups", exps[-1], "responses", "model_responses_{}".format(self.project_path)),
+            llm_response.content,
+        )
+        log_parse_result(parsed_response)
+        # The only copy of the reply in the cycle, as it is changed below
+        assistant_reply_dict = parsed_response.to_dict()
 
         if "command" not in assistant_reply_dict:
             assistant_reply_dict["command"] = {"name": "missing_command", "args":{}}
         command_dict = assistant_reply_dict["command"]
 
-        with open("commands_interface.json") as cif:
-            commands_interface = json.load(cif)
+        commands_interface = self.file_cache.read_json("commands_interface.json")
 
         if command_dict["name"] in list(commands_interface.keys()):
             ref_args = commands_interface[command_dict["name"]]
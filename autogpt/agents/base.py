@@ -7,6 +7,7 @@ import pexpect
 import time
 
 import re
+import contextlib
 from abc import ABCMeta, abstractmethod
 from typing import TYPE_CHECKING, Any, Literal, Optional
 import json
@@ -20,15 +21,36 @@ if TYPE_CHECKING:
 
 from autogpt.llm.base import ChatModelResponse, ChatSequence, Message
 from autogpt.llm.providers.openai import OPEN_AI_CHAT_MODELS, get_openai_command_specs
-from autogpt.llm.utils import count_message_tokens, create_chat_completion
-from autogpt.logs import logger
+from autogpt.llm.routing import get_router
+from autogpt.llm.streaming import ChatStreamMonitor
+from autogpt.llm.utils import (
+    count_message_tokens,
+    count_string_tokens,
+    create_chat_completion,
+)
+from autogpt.logs import background_writer, logger
+from autogpt.logs.prompt_archive import PromptArchive
+from autogpt.logs.tracing import traced
+from autogpt.memory.loop_detector import Loop, LoopDetector
 from autogpt.memory.message_history import MessageHistory
+from autogpt.memory.repo_analysis import (
+    RepoAnalysis,
+    RepoAnalysisStore,
+    detect_languages,
+    prompt_version,
+    repo_commit,
+)
+from autogpt.memory.step_compaction import StepCompactor, format_step
+from autogpt.prompts.assembler import FileCache, PromptAssembler
+from autogpt.prompts.layout import PrefixCacheTracker, Stability
+from autogpt.prompts.packer import REQUIRED, PromptPacker, SectionPolicy
 from autogpt.prompts.prompt import DEFAULT_TRIGGERING_PROMPT
-from autogpt.json_utils.utilities import extract_dict_from_response
+from autogpt.json_utils.response_parser import ParsedResponse, parse_response
 from autogpt.commands.info_collection_static import collect_requirements, infer_requirements, extract_instructions_from_readme
-from autogpt.commands.docker_helpers_static import start_container, remove_ansi_escape_sequences, ask_llm
+from autogpt.commands.docker_helpers_static import start_container, remove_ansi_escape_sequences, ask_llm, progress_bar_chunk_size
 from autogpt.commands.search_documentation import search_install_doc
-from autogpt.commands.commands_summary_helper import condense_history
+from autogpt.commands.command_cache import CommandCache, EarlyCommand
+from autogpt.commands.commands_summary_helper import condense_history, merge_phase_digests, summarize_phase
 
 from agentstepper.api.debugger import AgentStepper
 
@@ -36,6 +58,28 @@ CommandName = str
 CommandArgs = dict[str, str]
 AgentThoughts = dict[str, Any]
 
+PROMPT_SECTION_POLICIES: dict[str, SectionPolicy] = {
+    "goals": REQUIRED,
+    "commands": REQUIRED,
+    "project": REQUIRED,
+    "cycle_instruction": REQUIRED,
+    "general_guidelines": SectionPolicy(priority=90, min_tokens=500),
+    "problems_memory": SectionPolicy(priority=80, min_tokens=200, max_tokens=2000),
+    "unified_summary": SectionPolicy(priority=70, min_tokens=300, max_tokens=3000),
+    "dockerfiles": SectionPolicy(priority=60, max_tokens=4000, shrink="summary"),
+    "workflows": SectionPolicy(priority=50, max_tokens=4000, shrink="summary"),
+    "command_result": SectionPolicy(priority=40, min_tokens=1000, shrink="keep_tail"),
+    "executed_steps": SectionPolicy(priority=30, min_tokens=1000, shrink="keep_tail"),
+}
+"""How the sections of the agent prompt are shrunk to fit the token budget.
+
+The static sections come first in the prompt and rank above the history and the
+command result, so the sections that change every cycle are shrunk first and the
+cached prompt prefix stays intact.
+"""
+
+UNIFIED_SUMMARY_SYSTEM_PROMPT = "You are an expert in developing and deploying software. Particularly, you are good at creating environment for installing and setting up arbitrary projects from source code in a dev-environment that is suitable for running tests. In addition you know how to run test suites of different projects in different languages and different testing and building frameworks. Use this ability to produce information context that I am going to include in the prompt of and LLM (your answer should be ready to copy paste without edits.)"
+
 class BaseAgent(metaclass=ABCMeta):
     """Base class for all Auto-GPT agents."""
 
@@ -184,6 +228,7 @@ class BaseAgent(metaclass=ABCMeta):
         self.interact_with_shell("cd {}".format(os.path.join(self.workspace_path, self.project_path)))
 
         self.commands_and_summary = []
+        self.step_compactor = StepCompactor(summarize_phase, merge_phase_digests)
         self.written_files = []
 
         self.container = None
@@ -194,14 +239,34 @@ class BaseAgent(metaclass=ABCMeta):
                 logger.info("ERROR HAPPENED WHILE CREATING THE CONTAINER")
                 self.hyperparams["image"] = "NIL"
 
-        self.found_workflows = self.find_workflows(self.project_path)
+        self.analysis_store = RepoAnalysisStore()
+        self.repo_analysis = self.analyze_repo()
+        self.found_workflows = self.repo_analysis.workflows
         self.found_workflows_summary = {}
-        self.search_results = self.search_documentation()
-        self.dockerfiles = self.find_dockerfiles()
-        self.dockerfiles = [] if not self.dockerfiles else self.dockerfiles
+        self.search_results = self.repo_analysis.search_results
+        self.dockerfiles = self.repo_analysis.dockerfiles
         self.command_stuck = False
+        self.loop_detector = LoopDetector()
+        self.command_cache = CommandCache()
+        self.early_command: Optional[EarlyCommand] = None
+        self.prompt_archive = PromptArchive(
+            os.path.join(
+                "experimental_setups",
+                self.exp_number,
+                "logs",
+                "prompt_archive_{}".format(self.project_path.replace("/", "")),
+            )
+        )
         #self.condensed_history = []
-        self.unified_summary = None
+        self.unified_summary = self.repo_analysis.unified_summary
+        count_tokens = lambda text: count_string_tokens(text, self.llm.name)
+        self.prefix_cache_tracker = PrefixCacheTracker(count_tokens)
+        self.file_cache = FileCache()
+        self.prompt_assembler = PromptAssembler(
+            count_tokens,
+            self.file_cache,
+            packer=PromptPacker(count_tokens, PROMPT_SECTION_POLICIES),
+        )
 
     def to_dict(self):
         return {
@@ -237,7 +302,13 @@ class BaseAgent(metaclass=ABCMeta):
             "found_workflows": self.found_workflows,
             "search_results": self.search_results,
             "dockerfiles": self.dockerfiles,
-            "found_workflows_summary": self.found_workflows_summary
+            "found_workflows_summary": self.found_workflows_summary,
+            "repo_analysis": {
+                "commit": self.repo_analysis.commit,
+                "prompt_version": self.repo_analysis.prompt_version,
+                "languages": self.repo_analysis.languages,
+            },
+            "step_compaction": self.step_compactor.to_dict(),
         }
 
 
@@ -262,10 +333,42 @@ class BaseAgent(metaclass=ABCMeta):
         {}
         ```
         """.format(wp, content)
-        llm_result = ask_llm(system_prompt, query)
+        llm_result = ask_llm(system_prompt, query, call_site="workflow_analysis")
         self.found_workflows_summary[workflow_path] = llm_result
         return llm_result
 
+    def analyze_repo(self) -> RepoAnalysis:
+        """Finds the CI files, documentation and languages of the project.
+
+        The analysis is stored per commit of the project, so re-runs on the same
+        commit load it from disk instead of searching again.
+        """
+        project_dir = os.path.join(self.workspace_path, self.project_path)
+        with open(os.path.join("prompt_files", "search_workflows_summary")) as f:
+            version = prompt_version(UNIFIED_SUMMARY_SYSTEM_PROMPT, f.read())
+        commit = repo_commit(project_dir)
+
+        start = time.perf_counter()
+        analysis = self.analysis_store.load(self.project_url, commit, version)
+        if analysis is not None:
+            logger.info(
+                f"Loaded the analysis of {self.project_url} at {commit[:12]} "
+                f"in {(time.perf_counter() - start) * 1000:.1f} ms"
+            )
+            return analysis
+
+        analysis = RepoAnalysis(
+            repo_url=self.project_url,
+            commit=commit,
+            prompt_version=version,
+            workflows=self.find_workflows(self.project_path),
+            search_results=self.search_documentation(),
+            dockerfiles=self.find_dockerfiles() or [],
+            languages=detect_languages(project_dir),
+        )
+        self.analysis_store.save(analysis)
+        return analysis
+
     def search_documentation(self,):
         if os.path.exists("search_logs/{}".format(self.project_path)):
             with open(os.path.join("search_logs", self.project_path, "{}_build_install_from_source.json".format(self.project_path))) as bifs:
@@ -341,13 +444,13 @@ class BaseAgent(metaclass=ABCMeta):
 
     def remove_progress_bars(self, text):
         try:
-            with open("prompt_files/remove_progress_bars") as rpb:
-                system_prompt= rpb.read()
+            system_prompt = self.file_cache.read("prompt_files/remove_progress_bars")
             summary = ""
-            for i in range(int(len(text)/100000)+1):
-                query= "Here is the output of a command that you should clean:\n"+ text[i*100000: (i+1)*100000]
-                summary += "\n" + ask_llm(query, system_prompt)
-                print("CLEANED 100K CHARACTERS.........")
+            chunk_size = progress_bar_chunk_size(system_prompt)
+            for i in range(int(len(text)/chunk_size)+1):
+                query= "Here is the output of a command that you should clean:\n"+ text[i*chunk_size: (i+1)*chunk_size]
+                summary += "\n" + ask_llm(query, system_prompt, call_site="progress_bar_cleanup")
+                print(f"CLEANED {chunk_size} CHARACTERS.........")
                 print("LEN CLEANED:", len(summary))
         except Exception as e:
             print("ERRRRRROOOOOOOOOOOR IN PROGRESSSSSSSSSS:", e)
@@ -365,8 +468,7 @@ class BaseAgent(metaclass=ABCMeta):
         return remove_ansi_escape_sequences(self.shell.before), remove_ansi_escape_sequences(self.shell.after)
 
     def validate_command_parsing(self, command_dict):
-        with open("commands_interface.json") as cif:
-            commands_interface = json.load(cif)
+        commands_interface = self.file_cache.read_json("commands_interface.json")
 
         command_dict = command_dict["command"]
         if command_dict["name"] in list(commands_interface.keys()):
@@ -382,14 +484,13 @@ class BaseAgent(metaclass=ABCMeta):
         else:
             return False
         
-    def detect_command_repetition(self, ref_cmd: dict) -> bool:
+    def detect_command_repetition(self, ref_cmd: dict) -> Optional[Loop]:
         """
-        Returns True if the last 6 commands (including ref_cmd) form:
-          - a period‐1 repetition (A A A A A A), or
-          - a period‐2 alternating loop (A B A B A B), or
-          - a period‐3 loop (A B C A B C), or
-          - a “3 + 3” loop (A A A B B B).
-        Otherwise returns False.
+        Returns the loop that the latest commands would form if the command of
+        ref_cmd came next, or None. Loops of any period up to
+        `self.loop_detector.max_period` are detected (A A A A A A, A B A B A B,
+        A B C A B C, ...), as well as "3 + 3" loops (A A A B B B). Commands that
+        only differ in whitespace or flags count as the same.
 
         ref_cmd is expected to be the parsed LLM response dict:
             {
@@ -400,60 +501,14 @@ class BaseAgent(metaclass=ABCMeta):
               }
             }
         """
-        # 1) Gather serialized strings for all previous assistant commands
-        previous_cmds: list[str] = []
-        for msg in self.history:
-            if msg.role != "assistant":
-                continue
-            try:
-                parsed = extract_dict_from_response(msg.content)
-                cmd_dict = parsed.get("command", None)
-                if cmd_dict is None:
-                    continue
-                # Canonicalize via JSON‐dump with sorted keys
-                cmd_str = json.dumps(cmd_dict)
-                previous_cmds.append(cmd_str)
-            except Exception:
-                continue
-
-        # 2) Serialize the incoming (candidate) command
         try:
             new_cmd_dict = ref_cmd["command"]
-            new_cmd_str = json.dumps(new_cmd_dict)
+            loop = self.loop_detector.check(new_cmd_dict)
         except Exception:
-            return False
-
-        # 3) If fewer than 5 prior commands exist, we cannot form a 6‐element window yet
-        if len(previous_cmds) < 5:
-            return False
-
-        # The window of exactly six “stringified” commands
-        window: list[str] = previous_cmds[-5:] + [new_cmd_str]
-
-        # 4) Check for period‐1, period‐2, or period‐3
-        for p in (1, 2, 3):
-            repetitive = True
-            for i in range(6):
-                if window[i] != window[i % p]:
-                    repetitive = False
-                    break
-            if repetitive:
-                logger.info(f"REPETITION DETECTED (period={p}): {window}")
-                return True
-
-        # 5) Check for “AAA BBB” pattern:
-        #    - window[0]==window[1]==window[2]
-        #    - window[3]==window[4]==window[5]
-        #    - window[0] != window[3]   (so it’s really two distinct blocks of three)
-        if (
-            window[0] == window[1] == window[2]
-            and window[3] == window[4] == window[5]
-            and window[0] != window[3]
-        ):
-            logger.info(f"REPETITION DETECTED (AAA BBB): {window}")
-            return True
-
-        return False
+            return None
+        if loop:
+            logger.info(f"REPETITION DETECTED ({loop.kind}, period={loop.period}): {loop.commands}")
+        return loop
         
     def handle_command_repitition(self, repeated_command: dict, handling_strategy: str = ""):
         if handling_strategy == "":
@@ -465,6 +520,7 @@ class BaseAgent(metaclass=ABCMeta):
         else:
             raise ValueError("The value given to the param handling_strategy is unsuported: {}".format(handling_strategy))
 
+    @traced()
     def think(
         self,
         instruction: Optional[str] = None,
@@ -481,11 +537,8 @@ class BaseAgent(metaclass=ABCMeta):
         #logger.info("CURRENT DIRECTORY {}".format(os.getcwd()))
         
 
-        with open(os.path.join("experimental_setups", self.exp_number, "logs", "prompt_history_{}".format(self.project_path.replace("/", ""))), "a+") as patf:
-            patf.write(prompt.dump())
-        
-        with open(os.path.join("experimental_setups", self.exp_number, "logs", "cycles_list_{}".format(self.project_path.replace("/", ""))), "a+") as patf:
-            patf.write(self.cycle_type+"\n")
+        # Sections that are the same as in earlier prompts are stored once
+        self.prompt_archive.append(self.cycle_type, self.prompt_text)
         
         # 2) Query the LLM normally
         if self.debugger:
@@ -494,25 +547,17 @@ class BaseAgent(metaclass=ABCMeta):
                 prompt.setFromDictList(modifiedMessages['MessageSequence'])
             except Exception:
                 pass # Don't apply changes if there's a problem with parsing them.
-        raw_response = create_chat_completion(
-            prompt,
-            self.config,
-            functions=get_openai_command_specs(self.command_registry)
-            if self.config.openai_functions
-            else None,
-        )
+        cache_stats = self.prefix_cache_tracker.observe(prompt.raw())
+        logger.debug(f"Cycle {self.cycle_count} ({self.cycle_type}) prompt prefix: {cache_stats}")
+        raw_response, parsed_response = self.query_llm(prompt)
         
         if self.debugger:
             raw_response.content = self.debugger.end_llm_query_breakpoint(raw_response.content)
+            if raw_response.content != parsed_response.raw:
+                parsed_response = parse_response(raw_response.content or "")
 
-        # 3) Try to parse the JSON out of the LLM’s reply, then check repetition
-        try:
-            response_dict = extract_dict_from_response(raw_response.content)
-            repetition = self.detect_command_repetition(response_dict)
-        except Exception as e:
-            # If parsing fails, just treat this as a “no repetition” case and pass through.
-            self.cycle_count += 1
-            return self.on_response(raw_response, thought_process_id, prompt, instruction)
+        # 3) Check the parsed reply for repetition; a reply without a command has none
+        repetition = self.detect_command_repetition(parsed_response.data or {})
 
         # 4) If repetition is detected, invoke the “re-planner” sub-call via ask_llm
         if repetition:
@@ -545,11 +590,11 @@ class BaseAgent(metaclass=ABCMeta):
             history_text = "\n\n".join(history_block)
 
             # 4.3) Identify the last attempted command (which triggered repetition)
-            last_cmd_attempt = json.dumps(response_dict["command"], sort_keys=True)
+            last_cmd_attempt = json.dumps(parsed_response.data["command"], sort_keys=True)
 
             # 4.4) Compose the user‐level query for the re-planner
             query = (
-                "We detected a repetition pattern in the last six commands.\n\n"
+                f"We detected a repetition pattern (period {repetition.period}) in the last {len(repetition.commands)} commands.\n\n"
                 f"Last attempted command (which caused repetition):\n{last_cmd_attempt}\n\n"
                 "Below is the full list of previously executed commands and their summaries:\n"
                 f"{history_text}\n\n"
@@ -568,12 +613,18 @@ class BaseAgent(metaclass=ABCMeta):
             )
 
             # 4.5) Ask the LLM for a “break‐out‐of‐repetition” response
-            llm_response_str = ask_llm(system_prompt, query)
+            router = get_router()
+            llm_response_str = ask_llm(
+                system_prompt,
+                query,
+                model=router.escalate("cycle_planning", "repetition", self.llm.name),
+                call_site="replanning",
+            )
 
             # 4.6) Attempt to parse what the re‐planner returned; if it fails, build a minimal fallback
-            try:
-                new_response_dict = extract_dict_from_response(llm_response_str)
-            except Exception:
+            replan = parse_response(llm_response_str)
+            new_response_dict = replan.data
+            if not replan.ok:
                 fallback_response = {
                     "thoughts": "Failed to parse the re‐planner response; issuing a repetition_detected stub.",
                     "command": {
@@ -596,7 +647,11 @@ class BaseAgent(metaclass=ABCMeta):
                 self.cycle_count += 1
                 
                 return self.on_response(
-                    replan_chat_response, thought_process_id, prompt, instruction
+                    replan_chat_response,
+                    ParsedResponse(llm_response_str, fallback_response),
+                    thought_process_id,
+                    prompt,
+                    instruction,
                 )
 
             # 4.7) If parsing succeeded, re‐serialize the JSON so we know it’s valid
@@ -613,12 +668,90 @@ class BaseAgent(metaclass=ABCMeta):
             self.cycle_count += 1
             
             return self.on_response(
-                replan_chat_response, thought_process_id, prompt, instruction
+                replan_chat_response,
+                ParsedResponse(replan_content, new_response_dict, replan.repairs),
+                thought_process_id,
+                prompt,
+                instruction,
             )
 
         # 5) No repetition → handle the original LLM reply as usual
         self.cycle_count += 1
-        return self.on_response(raw_response, thought_process_id, prompt, instruction)
+        return self.on_response(
+            raw_response, parsed_response, thought_process_id, prompt, instruction
+        )
+
+    @traced()
+    def query_llm(self, prompt: ChatSequence) -> tuple[ChatModelResponse, ParsedResponse]:
+        """Sends the prompt of this cycle to the model the router picks for it.
+
+        If the response cannot be parsed, the query is retried on a stronger model
+        as far as the route of the cycle type allows.
+
+        Returns:
+            The response, and its content parsed; the rest of the cycle uses this
+            parse instead of parsing the content again.
+        """
+        call_site = "cycle_planning" if self.cycle_type == "CMD" else "summary"
+
+        def query(model: str) -> tuple[ChatModelResponse, ParsedResponse]:
+            model_info = OPEN_AI_CHAT_MODELS.get(model)
+            if not model_info or prompt.token_length >= model_info.max_tokens * 3 // 4:
+                # The prompt was built for the agent's own LLM
+                model = self.llm.name
+            stream_monitor = self.create_stream_monitor()
+            response = create_chat_completion(
+                prompt,
+                self.config,
+                functions=get_openai_command_specs(self.command_registry)
+                if self.config.openai_functions
+                else None,
+                model=model,
+                stream_monitor=stream_monitor,
+            )
+            if stream_monitor:
+                logger.info(f"Cycle {self.cycle_count} ({self.cycle_type}) streaming: {stream_monitor.stats}")
+            return response, parse_response(response.content or "")
+
+        def validate(result: tuple[ChatModelResponse, ParsedResponse]) -> Optional[str]:
+            response, parsed = result
+            if response.function_call or parsed.ok:
+                return None
+            return "parse_error"
+
+        return get_router().call(call_site, query, self.llm.name, validate=validate)
+
+    def create_stream_monitor(self) -> ChatStreamMonitor | None:
+        """Returns a monitor for streaming the next response, if streaming is enabled.
+
+        In command cycles the streamed `command.name` is validated against the
+        commands the agent can execute, so a response naming an unknown command
+        is cut short, and `on_command_ready` is called once the command is complete.
+        """
+        if not self.config.openai_streaming or self.config.openai_functions:
+            return None
+        if self.cycle_type != "CMD":
+            return ChatStreamMonitor()
+        return ChatStreamMonitor(
+            known_commands=self.known_command_names(),
+            on_command_ready=self.on_command_ready,
+        )
+
+    def on_command_ready(self, command_name: CommandName, command_args: CommandArgs) -> None:
+        """Called while the response of a command cycle is streaming, as soon as its
+        command is complete. The rest of the response has not been received yet.
+        """
+
+    def known_command_names(self) -> set[str]:
+        """The names `execute_command` accepts: native commands, their aliases and
+        the commands that plugins added to the prompt generator"""
+        names = set(self.command_registry.commands) | set(
+            self.command_registry.commands_aliases
+        )
+        if self.ai_config.prompt_generator is not None:
+            for command in self.ai_config.prompt_generator.commands:
+                names.update((command.label.lower(), command.name.lower()))
+        return names
 
     def think_2(
         self,
@@ -644,11 +777,8 @@ class BaseAgent(metaclass=ABCMeta):
         #logger.info("CURRENT DIRECTORY {}".format(os.getcwd()))
         
 
-        with open(os.path.join("experimental_setups", self.exp_number, "logs", "prompt_history_{}".format(self.project_path.replace("/", ""))), "a+") as patf:
-            patf.write(prompt.dump())
-        
-        with open(os.path.join("experimental_setups", self.exp_number, "logs", "cycles_list_{}".format(self.project_path.replace("/", ""))), "a+") as patf:
-            patf.write(self.cycle_type+"\n")
+        # Sections that are the same as in earlier prompts are stored once
+        self.prompt_archive.append(self.cycle_type, self.prompt_text)
         # handle querying strategy
         # For now, we do not evaluate the external query
         # we just want to observe how good is it
@@ -661,34 +791,10 @@ class BaseAgent(metaclass=ABCMeta):
             else None,
         )
         
-        try:
-            response_dict = extract_dict_from_response(raw_response.content)
-        except Exception:
-            # If parsing fails, just hand it off to on_response as usual
-            self.cycle_count += 1
-            return self.on_response(raw_response, thought_process_id, prompt, instruction)
-
-        repetition = self.detect_command_repetition(response_dict)
+        parsed_response = parse_response(raw_response.content or "")
+        repetition = self.detect_command_repetition(parsed_response.data or {})
         if repetition:
-            # Build the 6‐element window (same as in detect_command_repetition)
-            previous_cmds: list[str] = []
-            for msg in self.history:
-                if msg.role != "assistant":
-                    continue
-                try:
-                    parsed = extract_dict_from_response(msg.content)
-                    cmd_dict = parsed.get("command", None)
-                    if cmd_dict is None:
-                        continue
-                    cmd_str = json.dumps(cmd_dict)
-                    previous_cmds.append(cmd_str)
-                except Exception:
-                    continue
-
-            # Serialize the incoming (candidate) command again
-            new_cmd_str = json.dumps(response_dict["command"])
-
-            window_payload = previous_cmds[-5:] + [new_cmd_str]
+            window_payload = repetition.commands
 
             # Directly return the special repetition_detected command:
             cmd_name = "repetition_detected"
@@ -697,19 +803,21 @@ class BaseAgent(metaclass=ABCMeta):
 
             #self.cycle_count += 1
             #return cmd_name, cmd_args, agent_thoughts
-            raw_response_content = json.dumps(
-                {
-                    "thoughts": "REPETITION DETECTED!",
-                    "command": {
-                        "name": cmd_name,
-                        "args": cmd_args
-                }
+            raw_response_dict = {
+                "thoughts": "REPETITION DETECTED!",
+                "command": {
+                    "name": cmd_name,
+                    "args": cmd_args
                 }
-            )
+            }
+            raw_response_content = json.dumps(raw_response_dict)
             raw_response = ChatModelResponse(model_info="", content=raw_response_content, function_call=None)
+            parsed_response = ParsedResponse(raw_response_content, raw_response_dict)
             
         self.cycle_count += 1
-        return self.on_response(raw_response, thought_process_id, prompt, instruction)
+        return self.on_response(
+            raw_response, parsed_response, thought_process_id, prompt, instruction
+        )
         
     @abstractmethod
     def execute(
@@ -736,8 +844,14 @@ class BaseAgent(metaclass=ABCMeta):
             text += self.steps_object[k]["static_header"] + self.steps_object[k]["step_line"] + "\n"
 
         text = "\n# History of executed commands:\n(Remember the executed commands and their outcomes to avoid repetition and also to build up on top of them, e.g, remember to set java to jdk 17 after installing jdk 17 ... but not only that...)\nBelow is a list of commands that you have executed so far and summary of the result of each command:\n"
-        for command, summary in self.commands_and_summary:
-            text += command + "\nThe summary of the output of above command: " + json.dumps(summary, indent=4)+"\n"
+        self.step_compactor.compact(self.commands_and_summary)
+        if self.step_compactor.digests:
+            text += "Digest of the earlier commands, oldest first:\n"
+            for digest in self.step_compactor.digests:
+                text += "- " + digest + "\n"
+            text += "Most recent commands:\n"
+        for command, summary in self.step_compactor.recent(self.commands_and_summary):
+            text += format_step(command, summary)
         text +="END OF COMMANDS HISTORY SECTION\n\n"
         return text
 
@@ -759,89 +873,109 @@ class BaseAgent(metaclass=ABCMeta):
     ) -> ChatSequence:
 
         ## added this part to change the prompt structure
-
-        if self.customize["GENERAL_GUIDELINES"]:
-            steps_text = self.construct_executed_steps_text()
-        else:
-            steps_text = "\n"
+        # Sections are ordered from most to least stable, so that the prompt prefix
+        # stays byte-identical across cycles and can be cached by the provider.
+        # File-backed sections are only read again when the files change.
+        layout = self.prompt_assembler
+        layout.begin()
 
         prompt = ChatSequence.for_model(
             self.llm.name,
             [Message("system", self.prompt_dictionary["role"])])
         
-        definitions_prompt = ""
         static_sections_names = ["goals", "commands", "general_guidelines"]
 
         for key in static_sections_names:
             if isinstance(self.prompt_dictionary[key], list):
-                definitions_prompt += "\n".join(self.prompt_dictionary[key]) + "\n"
+                layout.add(key, "\n".join(self.prompt_dictionary[key]) + "\n")
             elif isinstance(self.prompt_dictionary[key], str):
-                definitions_prompt += self.prompt_dictionary[key] + "\n"
+                layout.add(key, self.prompt_dictionary[key] + "\n")
             else:
                 raise TypeError("For now we only support list and str types.")
         
-        definitions_prompt += "\n## Information about the project:\n\nProject path: the project under scope has the following path/name within the file system, which you should use when calling the tools: {}".format(self.project_path) + "\n"
-        definitions_prompt += "\nProject github url (needed for dockerfile script): {}\n".format(self.project_url)
+        layout.add(
+            "project",
+            "\n## Information about the project:\n\nProject path: the project under scope has the following path/name within the file system, which you should use when calling the tools: {}".format(self.project_path) + "\n"
+            + "\nProject github url (needed for dockerfile script): {}\n".format(self.project_url),
+        )
         
-        if os.path.exists("problems_memory/{}".format(self.project_path)):
-            with open("problems_memory/{}".format(self.project_path)) as pm:
-                previous_memory = pm.read()
-            definitions_prompt += "\nFrom previous attempts we learned that:\n {}\n\n".format(previous_memory)
+        layout.add_file(
+            "problems_memory",
+            "problems_memory/{}".format(self.project_path),
+            "\nFrom previous attempts we learned that:\n {}\n\n",
+        )
         
 
         workflows_summary = ""
         if self.found_workflows and self.customize["WORKFLOWS_SEARCH"]:
-            definitions_prompt += "\n\n"
+            workflows_prompt = "\n\n"
             "The following workflow files might contain information on how to setup the project and run test cases. However, you might need to adapt them to your task and goal current setup (e.g, docker container, language version...). In case the file are not relevant ro not suitable, just ignore them.\n"
             for w in self.found_workflows:
                 wn = w.split("/")[-1] if "/" in w else w
-                with open(w) as wfp:
-                    w_content = wfp.read()
-                definitions_prompt += "File: wn \n```\n{}\n```\n".format(w_content)
+                w_content = layout.file_block(w)
+                if w_content is None:
+                    continue
+                workflows_prompt += "File: wn \n```\n{}\n```\n".format(w_content)
                 #workflows_summary += "\nWorkflow file: {}\nExtracted installation steps:\n{}\n".format(
                 #    wn, 
                 #    self.found_workflows_summary.get(w, self.workflow_to_script(w))) 
+            layout.add(
+                "workflows",
+                workflows_prompt,
+                summary="\n\nWorkflow files of the project: {}\n".format(", ".join(self.found_workflows)),
+            )
         
         if self.search_results and self.customize["WEB_SEARCH"]:
-            #definitions_prompt += "\nWe searched on google for installing / building {} from source code on Ubuntu/Debian.".format(self.project_path)
-            #definitions_prompt += "Here is the summary of the top 5 results:\n".format()
-            merged_summary = ""
-            for w_result in self.search_results:
-                if len(w_result["analysis"]) < 100:
-                    continue
-                merged_summary += "Web page url: {}\n".format(w_result["url"])
-                merged_summary += "Summary of page content: {}\n\n".format(w_result["analysis"])
-        
-            merged_summary += "Dockerfiles:\n"
-            for file in self.dockerfiles:
-                merged_summary += "\n{}\n```\n".format(file.replace("execution_agent_workspace/", ""))
-                with open(file) as dfp:
-                    df_content = dfp.read()
-                merged_summary += df_content
-                merged_summary += "\n```\n"
-
             if not self.unified_summary:
-                s_prompt = "You are an expert in developing and deploying software. Particularly, you are good at creating environment for installing and setting up arbitrary projects from source code in a dev-environment that is suitable for running tests. In addition you know how to run test suites of different projects in different languages and different testing and building frameworks. Use this ability to produce information context that I am going to include in the prompt of and LLM (your answer should be ready to copy paste without edits.)"
-
-                with open("prompt_files/search_workflows_summary") as sws:
-                    query = sws.read()
+                #definitions_prompt += "\nWe searched on google for installing / building {} from source code on Ubuntu/Debian.".format(self.project_path)
+                #definitions_prompt += "Here is the summary of the top 5 results:\n".format()
+                merged_summary = ""
+                for w_result in self.search_results:
+                    if len(w_result["analysis"]) < 100:
+                        continue
+                    merged_summary += "Web page url: {}\n".format(w_result["url"])
+                    merged_summary += "Summary of page content: {}\n\n".format(w_result["analysis"])
+            
+                merged_summary += "Dockerfiles:\n"
+                for file in self.dockerfiles:
+                    merged_summary += "\n{}\n```\n".format(file.replace("execution_agent_workspace/", ""))
+                    merged_summary += layout.files.read(file) or ""
+                    merged_summary += "\n```\n"
+
+                s_prompt = UNIFIED_SUMMARY_SYSTEM_PROMPT
+                query = layout.files.read("prompt_files/search_workflows_summary")
                 query = query.format(self.project_path) 
                 query+= merged_summary
                 query+="\n<--- End of search resutls"
                 print(merged_summary)
-                self.unified_summary = ask_llm(query, s_prompt)
+                self.unified_summary = ask_llm(query, s_prompt, call_site="doc_analysis")
+                self.repo_analysis.unified_summary = self.unified_summary
+                self.analysis_store.save(self.repo_analysis)
 
-            definitions_prompt += "Summary of some info that I already know about the repo:\n```\n" + self.unified_summary + "\n```\n"
+            layout.add("unified_summary", "Summary of some info that I already know about the repo:\n```\n" + self.unified_summary + "\n```\n")
 
         if self.dockerfiles and self.customize["WORKFLOWS_SEARCH"]:
-            definitions_prompt += "\n\n We found the following dockerfile scripts within the repo. The dockerfile scripts might help you build a suitable docker image for this repository: "+ " ,".join(self.dockerfiles).replace("execution_agent_workspace/", "") + "\n"
+            dockerfiles_prompt = "\n\n We found the following dockerfile scripts within the repo. The dockerfile scripts might help you build a suitable docker image for this repository: "+ " ,".join(self.dockerfiles).replace("execution_agent_workspace/", "") + "\n"
             for file in self.dockerfiles:
-                definitions_prompt += "\n{}\n```\n".format(file.replace("execution_agent_workspace/", ""))
-                with open(file) as dfp:
-                    df_content = dfp.read()
-                definitions_prompt += df_content
-                definitions_prompt += "\n```\n"
-            
+                # Dockerfiles whose content is already in the prompt, e.g. quoted
+                # by the unified summary, are not repeated
+                df_content = layout.file_block(file)
+                if df_content is None:
+                    continue
+                dockerfiles_prompt += "\n{}\n```\n".format(file.replace("execution_agent_workspace/", ""))
+                dockerfiles_prompt += df_content
+                dockerfiles_prompt += "\n```\n"
+            layout.add(
+                "dockerfiles",
+                dockerfiles_prompt,
+                summary=dockerfiles_prompt[:dockerfiles_prompt.index("\n", 2) + 1],
+            )
+
+        # The history of executed commands only grows at its end
+        if self.customize["GENERAL_GUIDELINES"]:
+            layout.add("executed_steps", "\n" + self.construct_executed_steps_text(), Stability.APPEND_ONLY)
+        else:
+            layout.add("executed_steps", "\n\n", Stability.APPEND_ONLY)
 
         if len(self.history) > 2:
             last_command = self.history[-2]
@@ -855,21 +989,39 @@ class BaseAgent(metaclass=ABCMeta):
             cycle_instruction = self.cmd_cycle_instruction
             if self.track_budget:
                 cycle_instruction += "\n" + "In this conversation you can only have a limited number of calls tools." + "\n Consider this limitation, so you repeat the same commands unless it is really necessary, such as for debugging and resolving issues.\n"
+            layout.add("cycle_instruction", "\n\n" + cycle_instruction, Stability.CYCLE)
+            budget = self.prompt_section_budget(prompt, prepend_messages + append_messages, reserve_tokens)
             prompt.extend(ChatSequence.for_model(
                 self.llm.name,
-                [Message("user", definitions_prompt + "\n" + steps_text + "\n\n" + cycle_instruction)] + prepend_messages,
+                [Message("user", layout.render(budget))] + prepend_messages,
             ))
         
             if append_messages:
                 prompt.extend(append_messages)
         else:
             cycle_instruction = self.summary_cycle_instruction
+            layout.add("cycle_instruction", "\n\n" + cycle_instruction + "\n", Stability.CYCLE)
+            layout.add("command_result", command_result.content, Stability.CYCLE)
+            budget = self.prompt_section_budget(prompt, [], reserve_tokens)
             prompt.extend(ChatSequence.for_model(
                 self.llm.name,
-                [Message("user", definitions_prompt + "\n" + steps_text + "\n\n" + cycle_instruction+"\n" + command_result.content)]
+                [Message("user", layout.render(budget))]
             ))
+        logger.debug(f"Cycle {self.cycle_count} prompt sections (tokens): {layout.breakdown_text()}")
         return prompt
 
+    def prompt_section_budget(
+        self, prompt: ChatSequence, extra_messages: list[Message], reserve_tokens: int
+    ) -> int:
+        """The number of tokens left for the sections of the prompt's main message"""
+        fixed_messages = prompt.messages + extra_messages + [Message("user", "")]
+        return (
+            self.send_token_limit
+            - reserve_tokens
+            - count_message_tokens(fixed_messages, self.llm.name)
+        )
+
+    @traced()
     def construct_prompt(
         self,
         cycle_instruction: str,
@@ -1011,6 +1163,7 @@ class BaseAgent(metaclass=ABCMeta):
     def on_response(
         self,
         llm_response: ChatModelResponse,
+        parsed_response: ParsedResponse,
         thought_process_id: ThoughtProcessID,
         prompt: ChatSequence,
         instruction: str,
@@ -1022,6 +1175,7 @@ class BaseAgent(metaclass=ABCMeta):
 
         Params:
             llm_response: The raw response from the chat model
+            parsed_response: The content of the response, parsed
             prompt: The prompt that was executed
             instruction: The instruction for the current cycle, also used in constructing the prompt
 
@@ -1031,23 +1185,29 @@ class BaseAgent(metaclass=ABCMeta):
 
         # Save assistant reply to message history
         self.history.append(prompt[-1])
-        self.history.add(
-            "assistant", llm_response.content, "ai_response"
-        )  # FIXME: support function calls
+        self.history.add_reply(parsed_response)  # FIXME: support function calls
 
         if self.cycle_type != "CMD":
-            self.summary_result = json.loads(llm_response.content)
+            if not parsed_response.ok:
+                raise ValueError(f"Could not parse the summary: {parsed_response.error}")
+            # The summary becomes part of the agent's state, which may change it
+            self.summary_result = parsed_response.to_dict()
             self.steps_object[self.current_step]["result_of_step"].append(self.summary_result)
             return
+
+        # Only the latest response is looked at, the detector keeps track of the rest
+        with contextlib.suppress(Exception):
+            command = parsed_response.command
+            if command is not None:
+                self.loop_detector.push(command)
         
         try:
             return self.parse_and_process_response(
-                llm_response, thought_process_id, prompt, instruction
+                llm_response, parsed_response, thought_process_id, prompt, instruction
             )
         except SyntaxError as e:
             logger.error(f"Response could not be parsed: {e}")
-            with open("parsing_erros_responses.txt", "a") as pers:
-                pers.write(llm_response.content+"\n")
+            background_writer.write("parsing_erros_responses.txt", llm_response.content + "\n")
             # TODO: tune this message
             self.history.add(
                 "system",
@@ -1062,6 +1222,7 @@ class BaseAgent(metaclass=ABCMeta):
     def parse_and_process_response(
         self,
         llm_response: ChatModelResponse,
+        parsed_response: ParsedResponse,
         thought_process_id: ThoughtProcessID,
         prompt: ChatSequence,
         instruction: str,
@@ -1073,6 +1234,7 @@ class BaseAgent(metaclass=ABCMeta):
 
         Params:
             llm_response: The raw response from the chat model
+            parsed_response: The content of the response, parsed once for the cycle
             prompt: The prompt that was executed
             instruction: The instruction for the current cycle, also used in constructing the prompt
 
@@ -1,6 +1,6 @@
 """The application entry point.  Can be invoked by a CLI or any other front end application."""
+import atexit
 import time
-import json
 import os
 
 import enum
@@ -28,7 +28,19 @@ from autogpt.app.utils import (
 from autogpt.commands import COMMAND_CATEGORIES
 from autogpt.config import AIConfig, Config, ConfigBuilder, check_openai_api_key
 from autogpt.llm.api_manager import ApiManager
-from autogpt.logs import logger
+from autogpt.llm.hedging import configure_hedger
+from autogpt.llm.providers.replay import configure_replay
+from autogpt.llm.rate_limiter import configure_rate_limiter
+from autogpt.llm.routing import configure_router, parse_routes
+from autogpt.logs import (
+    background_writer,
+    console_renderer,
+    flush_on_signals,
+    logger,
+)
+from autogpt.logs.parsable_log import ParsableLog
+from autogpt.logs.tracing import tracer
+from autogpt.memory.snapshots import SnapshotStore
 from autogpt.memory.vector import get_memory
 from autogpt.models.command_registry import CommandRegistry
 from autogpt.plugins import scan_plugins
@@ -76,7 +88,24 @@ def run_auto_gpt(
     logger.config = config
 
     # TODO: fill in llm values here
-    check_openai_api_key(config)
+    if config.llm_replay_mode != "replay":
+        check_openai_api_key(config)
+    configure_replay(
+        config.llm_replay_mode, config.llm_replay_file, config.llm_replay_match
+    )
+    configure_rate_limiter(
+        config.openai_rpm_limit,
+        config.openai_tpm_limit,
+        config.openai_max_concurrency,
+        config.openai_rate_limit_state_file,
+    )
+    configure_hedger(
+        config.openai_hedge_model,
+        config.openai_hedge_api_base,
+        config.openai_hedge_api_key,
+        config.openai_hedge_budget_percent,
+        config.openai_hedge_fallback_delay,
+    )
 
     create_config(
         config,
@@ -94,6 +123,9 @@ def run_auto_gpt(
         allow_downloads,
         skip_news,
     )
+    configure_router(
+        config.fast_llm, config.smart_llm, parse_routes(config.llm_routes)
+    )
 
     if config.continuous_mode:
         for line in get_legal_warning().split("\n"):
@@ -226,7 +258,10 @@ def run_interaction_loop(
     cycle_budget = cycles_remaining = _get_cycle_budget(
         config.continuous_mode, config.continuous_limit
     )
-    spinner = Spinner("Thinking...", plain_output=config.plain_output)
+    spinner = Spinner(
+        "Thinking...",
+        plain_output=config.plain_output or not console_renderer.interactive,
+    )
     
     debugger: AgentStepper
     repository_path = 'execution_agent_workspace/gson'
@@ -263,6 +298,8 @@ def run_interaction_loop(
 
         # Set up an interrupt signal for the agent.
         signal.signal(signal.SIGINT, graceful_agent_interrupt)
+        # Queued log writes reach the disk even if the run is terminated
+        flush_on_signals(background_writer)
 
         #########################
         # Application Main Loop #
@@ -272,23 +309,35 @@ def run_interaction_loop(
         ## create log file
         project_path = agent.project_path
         current_ts = time.time()
-        parsable_log_file = "parsable_logs/{}".format(project_path+str(current_ts)) + ".json"
-        
-        with open(parsable_log_file, "w") as plf:
-            json.dump({
-                "project": project_path,
-                "language": agent.hyperparams["language"],
-                "ExecutionAgent_attempt": []
-            }, plf)
+        parsable_log_file = "parsable_logs/{}".format(project_path+str(current_ts)) + ".jsonl"
+        parsable_log = ParsableLog(
+            parsable_log_file,
+            fsync=config.parsable_log_fsync,
+            project=project_path,
+            language=agent.hyperparams["language"],
+        )
+        atexit.register(parsable_log.close)
+        snapshots = SnapshotStore(
+            "experimental_setups/{}/saved_contexts/{}".format(agent.exp_number, agent.project_path)
+        )
+        if config.trace_events:
+            # Open in Perfetto (ui.perfetto.dev) or chrome://tracing
+            tracer.start(
+                "experimental_setups/{}/logs/trace_{}{}.json".format(
+                    agent.exp_number, project_path.replace("/", ""), current_ts
+                )
+            )
 
         while cycles_remaining > 0:
             logger.debug(f"Cycle budget: {cycle_budget}; remaining: {cycles_remaining}")
+            tracer.begin("cycle", remaining=cycles_remaining, type=agent.cycle_type)
             #logger.info("XXXXXXXXXXXXXXXXXXX {} XXXXXXXXXXXXXXXXXXXX".format(agent.cycle_type))
             if agent.cycle_type != "CMD":
                 #agent.think()
                 agent.cycle_type = "CMD"
                 #logger.info(" YYYYYYYYYYYYYYYYY SUMMARY CYCLE EXECUTED YYYYYYYYYYYYYYYYYYYY")
                 logger.info(str(agent.summary_result))
+                tracer.end()
                 continue
             ########
             # Plan #
@@ -382,37 +431,36 @@ def run_interaction_loop(
                 if command_name: result = debugger.end_tool_invocation_breakpoint(result)
                 debugger.commit_agent_changes()
 
-                with open(parsable_log_file) as plf:
-                    parsable_content = json.load(plf)
-
-                parsable_content["ExecutionAgent_attempt"].append(
-                    {
-                        "command_name": command_name,
-                        "command_args": command_args,
-                        "command_result": result,
-                        "prompt_content": agent.prompt_text
-                    }
+                parsable_log.attempt(
+                    command_name=command_name,
+                    command_args=command_args,
+                    command_result=result,
+                    prompt_content=agent.prompt_text,
                 )
 
-                with open(parsable_log_file, "w") as plf:
-                    json.dump(parsable_content, plf)
-
                 if result is not None:
                     logger.typewriter_log("SYSTEM: ", Fore.YELLOW, result)
-                    agent.cycle_type = "SUMMARY"
-                    agent.think()
-                    agent.history = agent.history[:-2]
-                    
-                    agent.commands_and_summary.append(("Call to tool {} with arguments {}".format(command_name, command_args), agent.summary_result))
+                    command_text = "Call to tool {} with arguments {}".format(command_name, command_args)
+                    # Trivial results are summarized without the summary cycle
+                    local_summary = agent.local_summarizer.summarize(command_text, result)
+                    if local_summary is not None:
+                        agent.summary_result = local_summary
+                        agent.steps_object[agent.current_step]["result_of_step"].append(
+                            agent.summary_result
+                        )
+                    else:
+                        agent.cycle_type = "SUMMARY"
+                        with tracer.span("summary cycle"):
+                            agent.think()
+                        agent.history = agent.history[:-2]
+                        agent.local_summarizer.record(command_text, result, agent.summary_result)
+                    logger.debug(f"Summaries made without the LLM: {agent.local_summarizer.stats()}")
+
+                    agent.commands_and_summary.append((command_text, agent.summary_result))
                     #agent.condensed_history.append(
                     #    "\nCommand:{}\nResult summary:{}\n---".format(str(command_name) + str(command_args), condense_history(agent.summary_result["summary"])))
-                    with open(parsable_log_file) as plf:
-                        parsable_content = json.load(plf)
-
-                    parsable_content["ExecutionAgent_attempt"][-1]["result_summary"] = agent.summary_result
-
-                    with open(parsable_log_file, "w") as plf:
-                        json.dump(parsable_content, plf)
+                    parsable_log.update_attempt(result_summary=agent.summary_result)
+                    parsable_log.update_run(summary_calls=agent.local_summarizer.stats())
 
                     agent.cycle_type = "CMD"
                     parsing_tests = parse_test_results(str(result))
@@ -421,9 +469,17 @@ def run_interaction_loop(
                 else:
                     logger.typewriter_log("SYSTEM: ", Fore.YELLOW, "Unable to execute command")
 
-                if not os.path.exists("experimental_setups/{}/saved_contexts/{}".format(agent.exp_number, agent.project_path)):
-                    os.system("mkdir experimental_setups/{}/saved_contexts/{}".format(agent.exp_number, agent.project_path))
-                agent.save_to_file("experimental_setups/{}/saved_contexts/{}/cycle_{}".format(agent.exp_number, agent.project_path, cycle_budget - cycles_remaining))
+                # Only what changed since the previous cycle is written
+                snapshots.save(cycle_budget - cycles_remaining, agent.to_dict())
+
+            tracer.end(command=command_name)
+            tracer.flush()
+
+        logger.info(f"Summaries made without the LLM: {agent.local_summarizer.stats()}")
+        tracer.stop()
+        background_writer.flush()
+        logger.info(f"Background log writes: {background_writer.stats()}")
+        parsable_log.close()
 
 import re
 
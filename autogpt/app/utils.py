@@ -8,7 +8,7 @@ from prompt_toolkit import ANSI, PromptSession
 from prompt_toolkit.history import InMemoryHistory
 
 from autogpt.config import Config
-from autogpt.logs import logger
+from autogpt.logs import console_renderer, logger
 
 session = PromptSession(history=InMemoryHistory())
 
@@ -45,6 +45,7 @@ def clean_input(config: Config, prompt: str = "", talk=False):
 
         # ask for input, default when just pressing Enter is y
         logger.info("Asking user via keyboard...")
+        console_renderer.flush()
 
         # handle_sigint must be set to False, so the signal handler in the
         # autogpt/main.py could be employed properly. This referes to
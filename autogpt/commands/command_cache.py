@@ -0,0 +1,257 @@
+"""Cache of the results of read-only shell commands."""
+from __future__ import annotations
+
+import contextvars
+import re
+import shlex
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+READ_ONLY_PROGRAMS = {
+    "basename",
+    "cat",
+    "cmp",
+    "column",
+    "cut",
+    "diff",
+    "dirname",
+    "du",
+    "egrep",
+    "fgrep",
+    "file",
+    "find",
+    "grep",
+    "head",
+    "less",
+    "ls",
+    "md5sum",
+    "more",
+    "nproc",
+    "printenv",
+    "pwd",
+    "readlink",
+    "realpath",
+    "sha1sum",
+    "sha256sum",
+    "sort",
+    "stat",
+    "tail",
+    "tr",
+    "tree",
+    "uname",
+    "wc",
+    "whereis",
+    "which",
+    "whoami",
+}
+"""Programs that only read, unless given one of their `WRITING_FLAGS`"""
+
+WRITING_FLAGS = {
+    "find": {
+        "-exec",
+        "-execdir",
+        "-ok",
+        "-okdir",
+        "-delete",
+        "-fprint",
+        "-fprint0",
+        "-fprintf",
+        "-fls",
+    },
+    "sort": {"-o", "--output"},
+    "tree": {"-o"},
+    "tail": {"-f", "-F", "--follow"},
+    "less": {"-o", "-O"},
+}
+
+VERSION_FLAGS = {"--version", "-V"}
+VERSION_ARGUMENTS = {
+    "java": {"-version"},
+    "javac": {"-version"},
+    "go": {"version"},
+    "poetry": {"version"},
+    "cargo": {"version"},
+}
+"""Other ways to only print the version, for the programs where they are read-only.
+
+`version` is not generally safe: `yarn version` and `npm version` bump the version
+in package.json.
+"""
+SHORT_VERSION_FLAG_PROGRAMS = {
+    "node",
+    "npm",
+    "yarn",
+    "pnpm",
+    "mvn",
+    "gradle",
+    "ruby",
+    "php",
+    "perl",
+}
+"""Programs for which `-v` prints the version rather than meaning "verbose\""""
+
+READ_ONLY_SUBCOMMANDS = {
+    "git": {"status", "log", "diff", "show", "rev-parse", "ls-files", "describe"},
+    "pip": {"list", "show", "freeze"},
+    "pip3": {"list", "show", "freeze"},
+    "npm": {"ls", "list", "view"},
+    "conda": {"list"},
+    "gem": {"list"},
+    "dpkg": {"-l", "-L", "-s"},
+}
+
+READ_ONLY_TOOLS = {"read_file", "repetition_detected", "human_feedback"}
+"""Agent commands other than shell commands that do not change any file"""
+
+_SHELL_OPERATORS = {"|", "<"}
+_WHITESPACE = re.compile(r"\s+")
+
+
+def is_read_only(command: str) -> bool:
+    """Whether a shell command only reads the state of the file system.
+
+    Pipelines of read-only commands and input redirection are allowed; output
+    redirection, command lists, substitutions and background jobs are not.
+    """
+    if "`" in command or "$(" in command:
+        return False
+    lexer = shlex.shlex(command, posix=True, punctuation_chars=True)
+    lexer.whitespace_split = True
+    try:
+        tokens = list(lexer)
+    except ValueError:
+        return False
+
+    segment: list[str] = []
+    for token in tokens + ["|"]:
+        if token and set(token) <= set("();<>|&"):
+            if token not in _SHELL_OPERATORS or not segment:
+                return False
+            if token == "|" and not _is_read_only_program(segment):
+                return False
+            segment = [] if token == "|" else segment + ["<"]
+        else:
+            segment.append(token)
+    return True
+
+
+def _is_read_only_program(argv: list[str]) -> bool:
+    if "<" in argv:
+        argv = argv[: argv.index("<")]
+    if not argv:
+        return False
+    program, args = argv[0].rsplit("/", 1)[-1], argv[1:]
+
+    if len(args) == 1 and (
+        args[0] in VERSION_FLAGS
+        or args[0] in VERSION_ARGUMENTS.get(program, ())
+        or (args[0] == "-v" and program in SHORT_VERSION_FLAG_PROGRAMS)
+    ):
+        return True
+    if program in READ_ONLY_SUBCOMMANDS:
+        return bool(args) and args[0] in READ_ONLY_SUBCOMMANDS[program]
+    if program not in READ_ONLY_PROGRAMS:
+        return False
+    if program == "printenv" or program == "pwd":
+        return True
+    writing_flags = WRITING_FLAGS.get(program, set())
+    return not any(arg.split("=")[0] in writing_flags for arg in args)
+
+
+def is_read_only_call(
+    command_name: Optional[str], arguments: Optional[dict[str, Any]]
+) -> bool:
+    """Whether a call to an agent command leaves the file system unchanged"""
+    if command_name == "linux_terminal":
+        return is_read_only(str((arguments or {}).get("command", "")))
+    return command_name in READ_ONLY_TOOLS
+
+
+@dataclass
+class CacheEntry:
+    output: str
+    generation: int
+
+
+class CommandCache:
+    """Caches the output of read-only commands until the file system may have changed.
+
+    Every command or file operation that may write bumps the file system
+    generation; cached outputs of earlier generations are not served.
+
+    Params:
+        max_entries: The number of commands whose output is kept.
+    """
+
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self.generation = 0
+        self.hits = 0
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+
+    def begin(
+        self, command_name: Optional[str], arguments: Optional[dict[str, Any]]
+    ) -> None:
+        """Called before the agent runs a command"""
+        if not is_read_only_call(command_name, arguments):
+            self.invalidate()
+
+    def invalidate(self) -> None:
+        self.generation += 1
+
+    def lookup(self, command: str) -> Optional[str]:
+        """Returns the output of `command` if nothing changed since it last ran"""
+        entry = self._entries.get(self.key(command))
+        if entry is None or entry.generation != self.generation:
+            return None
+        self._entries.move_to_end(self.key(command))
+        self.hits += 1
+        return entry.output
+
+    def store(self, command: str, output: str) -> None:
+        key = self.key(command)
+        self._entries.pop(key, None)
+        self._entries[key] = CacheEntry(output, self.generation)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    @staticmethod
+    def key(command: str) -> str:
+        return _WHITESPACE.sub(" ", command.strip())
+
+
+class EarlyCommand:
+    """A read-only command started before the agent decided to execute it.
+
+    While a response is still streaming, its command is already known; a
+    read-only one can run in the meantime. The agent then takes the result if it
+    executes the same call, or waits for the command to finish before running a
+    different one, so that two commands never use the container at once.
+
+    Params:
+        command_name: The name of the command being run.
+        arguments: The arguments it is run with.
+        run: Runs the command and returns its result.
+    """
+
+    def __init__(
+        self, command_name: str, arguments: dict[str, Any], run: Callable[[], Any]
+    ):
+        self.command_name = command_name
+        self.arguments = dict(arguments)
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="early-command")
+        self._future: Future = executor.submit(contextvars.copy_context().run, run)
+        executor.shutdown(wait=False)
+
+    def matches(self, command_name: str, arguments: Optional[dict[str, Any]]) -> bool:
+        return command_name == self.command_name and (arguments or {}) == self.arguments
+
+    def result(self) -> Any:
+        """Waits for the command and returns its result (or raises its exception)"""
+        return self._future.result()
+
+    def wait(self) -> None:
+        """Waits for the command without taking its result"""
+        self._future.exception()
@@ -48,5 +48,39 @@ OLD FORMAT:
 
 NEW CONDENSED FORMAT[ONLY OUTPUT THE CONDENSED FORMAT, NO EXPLANATION AROUND]:
 """
-    result = ask_llm(system_prompt, user_prompt)
-    return result
\ No newline at end of file
+    result = ask_llm(system_prompt, user_prompt, call_site="history_condensing")
+    return result
+
+
+def summarize_phase(history: str) -> str:
+    """Condenses a run of executed commands into a short digest of that phase"""
+    system_prompt = (
+        "You are a helpful assistant that condenses part of the command history of an "
+        "agent setting up a software project into a short digest of that phase. "
+        "State what was tried, what failed and why, and the resulting state, e.g. "
+        "\"Tried JDK 11, the build failed on an unsupported class file version; "
+        "switched to JDK 17 and the build succeeded.\" Keep exact versions, paths and "
+        "error messages that matter later. Use at most five sentences."
+    )
+    user_prompt = f"""Command history:
+{history}
+
+DIGEST[ONLY OUTPUT THE DIGEST, NO EXPLANATION AROUND]:
+"""
+    return ask_llm(user_prompt, system_prompt, call_site="history_condensing")
+
+
+def merge_phase_digests(digests: str) -> str:
+    """Merges consecutive phase digests into one, keeping what still matters"""
+    system_prompt = (
+        "You are a helpful assistant that merges consecutive digests of the command "
+        "history of an agent setting up a software project into a single digest. "
+        "Keep the final state, dead ends that must not be retried and exact versions, "
+        "paths and error messages that matter later. Use at most five sentences."
+    )
+    user_prompt = f"""Digests, oldest first:
+{digests}
+
+MERGED DIGEST[ONLY OUTPUT THE DIGEST, NO EXPLANATION AROUND]:
+"""
+    return ask_llm(user_prompt, system_prompt, call_site="history_condensing")
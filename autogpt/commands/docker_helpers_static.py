@@ -8,6 +8,14 @@ import time
 from langchain.chat_models import ChatOpenAI
 from langchain.schema.messages import HumanMessage, SystemMessage, AIMessage
 
+from autogpt.llm.metering import get_usage_meter
+from autogpt.llm.providers.openai import OPEN_AI_CHAT_MODELS
+from autogpt.llm.providers.replay import get_replay
+from autogpt.llm.rate_limiter import get_rate_limiter
+from autogpt.llm.routing import get_router
+from autogpt.llm.utils import count_string_tokens
+from autogpt.logs.tracing import traced
+
 ACTIVE_SCREEN = {
     "name": "my_screen_session",
     "id": None,
@@ -15,9 +23,29 @@ ACTIVE_SCREEN = {
     "prep_end": False
 }
 
-def ask_llm(query, system_message, model="gpt-4.1-mini"):
+# The model of ask_llm unless LLM_ROUTES moves its call site to a tier
+ASK_LLM_MODEL = "gpt-4.1-mini"
+
+def ask_llm(query, system_message, model=None, call_site="default"):
+    """Asks the LLM a single question.
+
+    Unless `model` is given, the model is picked by the router for `call_site`.
+    """
+    replay = get_replay()
+    replay_messages = [
+        {"role": "system", "content": system_message},
+        {"role": "user", "content": query},
+    ]
+    if replay.replaying:
+        record = replay.lookup("ask_llm", replay_messages)
+        get_usage_meter().record_cache_hit(record.model or "unknown", call_site)
+        return record.content
+
     with open("openai_token.txt") as opt:
         token = opt.read()
+
+    router = get_router()
+    model = model or router.model_for(call_site, ASK_LLM_MODEL)
     chat = ChatOpenAI(openai_api_key=token, model=model)
 
     messages = [
@@ -29,10 +57,44 @@ def ask_llm(query, system_message, model="gpt-4.1-mini"):
             )  
     ]
     #response_format={ "type": "json_object" }
-    response = chat.invoke(messages)
+    started_at = time.perf_counter()
+    with get_rate_limiter().request((len(query) + len(system_message)) // 4):
+        response = chat.invoke(messages)
+    latency = time.perf_counter() - started_at
+
+    meter = get_usage_meter()
+    usage = getattr(response, "response_metadata", {}).get("token_usage")
+    if usage:
+        meter.record_usage(model, usage, latency, call_site=call_site)
+    else:
+        meter.record(
+            model,
+            count_string_tokens(system_message + query, model),
+            count_string_tokens(response.content, model),
+            latency,
+            call_site=call_site,
+        )
 
+    if replay.recording:
+        replay.record("ask_llm", replay_messages, response.content, model=model)
     return response.content
 
+PROGRESS_BAR_CHUNK_CHARS = 100000
+
+def progress_bar_chunk_size(system_prompt):
+    """The number of characters of command output to clean per LLM call.
+
+    The cleaned output is about as long as its chunk, so a chunk takes at most half
+    of the routed model's context left after the system prompt, at a conservative
+    3 characters per token. Models without known limits get 100K characters.
+    """
+    model = get_router().model_for("progress_bar_cleanup", ASK_LLM_MODEL)
+    model_info = OPEN_AI_CHAT_MODELS.get(model)
+    if not model_info:
+        return PROGRESS_BAR_CHUNK_CHARS
+    free_tokens = model_info.max_tokens - count_string_tokens(system_prompt, model)
+    return max(1000, min(PROGRESS_BAR_CHUNK_CHARS, free_tokens // 2 * 3))
+
 import xml.etree.ElementTree as ET
 import yaml
 
@@ -71,6 +133,7 @@ def send_command_to_shell(container, command):
     except Exception as e:
         return f"An error occurred while sending the command: {e}"
 
+@traced()
 def get_screen_process_list(container, screen_id):
     command = "pstree -p {}".format(screen_id)
     output = execute_command_in_container_screen(container, command)
@@ -140,10 +203,11 @@ def remove_progress_bars(text):
         with open("prompt_files/remove_progress_bars") as rpb:
             system_prompt= rpb.read()
         summary = ""
-        for i in range(int(len(text)/100000)+1):
-            query= "Here is the output of a command that you should clean:\n"+ text[i*100000: (i+1)*100000]
-            summary += "\n" + ask_llm(query, system_prompt)
-            print("CLEANED 100K CHARACTERS.........")
+        chunk_size = progress_bar_chunk_size(system_prompt)
+        for i in range(int(len(text)/chunk_size)+1):
+            query= "Here is the output of a command that you should clean:\n"+ text[i*chunk_size: (i+1)*chunk_size]
+            summary += "\n" + ask_llm(query, system_prompt, call_site="progress_bar_cleanup")
+            print(f"CLEANED {chunk_size} CHARACTERS.........")
             print("LEN CLEANED:", len(summary))
     except Exception as e:
         print("ERRRRRROOOOOOOOOOOR IN PROGRESSSSSSSSSS:", e)
@@ -218,6 +282,7 @@ def extract_test_sections(maven_output):
     # Join all extracted sections into a single string
     return "\n".join(sections)
 
+@traced()
 def build_image(dockerfile_path, tag):
     client = docker.from_env()
     try:
@@ -384,6 +449,7 @@ def write_string_to_file(container, file_content, file_path):
         # Stop and remove the container
         pass
 
+@traced()
 def read_file_from_container(container, file_path):
     """
     Reads the content of a file within a Docker container and returns it as a string.
@@ -425,6 +491,11 @@ from .docker_helpers_static import (
     remove_progress_bars,
 )
 
+# Sleeps show up in the trace, next to the polling they wait for
+screen_sleep = traced("screen sleep")(time.sleep)
+
+
+@traced()
 def exec_in_screen_and_get_log(container: Container, cmd: str) -> tuple[int, str, str, bool]:
     """
     Improved: waits for first output before ever checking the process tree,
@@ -436,7 +507,7 @@ def exec_in_screen_and_get_log(container: Container, cmd: str) -> tuple[int, str
     # start per‐command logging
     container.exec_run(f"screen -S {SCREEN_SESSION} -X logfile {logfile}")
     container.exec_run(f"screen -S {SCREEN_SESSION} -X log on")
-    time.sleep(0.5) 
+    screen_sleep(0.5) 
 
     if cmd in ['exec "$SHELL" -l', "exec '$SHELL' -l", 'exec "$SHELL" -l ', "exec '$SHELL' -l "]:
         container.exec_run(f"screen -S {SCREEN_SESSION} -X stuff 'exec /bin/bash -l\\n'", tty=False)
@@ -474,7 +545,7 @@ def exec_in_screen_and_get_log(container: Container, cmd: str) -> tuple[int, str
         if seen_any:
             tree = get_screen_process_list(container, ACTIVE_SCREEN["id"])
             if tree == ACTIVE_SCREEN["default_process_list"]:
-                time.sleep(2)
+                screen_sleep(2)
                 break
 
 
@@ -482,11 +553,11 @@ def exec_in_screen_and_get_log(container: Container, cmd: str) -> tuple[int, str
             stuck = True
             break
 
-        time.sleep(WAIT)
+        screen_sleep(WAIT)
 
     # stop logging
     container.exec_run(f"screen -S {SCREEN_SESSION} -X log off")
-    time.sleep(2)
+    screen_sleep(2)
     old_output = read_file_from_container(container, logfile)
     # build the return values
     if stuck:
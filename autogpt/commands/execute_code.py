@@ -10,6 +10,7 @@ from pathlib import Path
 import docker
 from docker.errors import DockerException, ImageNotFound
 from docker.models.containers import Container as DockerContainer
+from autogpt.commands.command_cache import is_read_only
 from autogpt.commands.docker_helpers_static import execute_command_in_container, read_file_from_container, remove_progress_bars, textify_output, extract_test_sections
 from autogpt.agents.agent import Agent
 from autogpt.command_decorator import command
@@ -186,25 +187,25 @@ def execute_python_file(filename: str, agent: Agent) -> str:
 
 @command(
     "repetition_detected",
-    "Warn the LLM that a six‐command repetition was detected and request a fresh next step.",
+    "Warn the LLM that a command repetition was detected and request a fresh next step.",
     {
         "repetition_window": {
             "type": "string",
-            "description": "A single string representing the last six commands that triggered repetition.",
+            "description": "A single string representing the last commands that triggered repetition.",
             "required": True,
         },
     },
 )
 def repetition_detected(repetition_window: str, agent: Agent) -> str:
     """
-    Called whenever the agent detects that the last six commands are looping
-    (e.g. A A A A A A, A B A B A B, or A B C A B C).
+    Called whenever the agent detects that the latest commands are looping
+    (e.g. A A A A A A, A B A B A B, or A B C A B C); see `LoopDetector`.
 
-    repetition_window is provided as one concatenated string of those six commands.
+    repetition_window is provided as one concatenated string of those commands.
     """
     return (
-        "Repetition detected: the last six commands form a cycle with no apparent progress.\n\n"
-        "Here is the concatenated string of the last 6 commands (in order):\n"
+        "Repetition detected: the last commands form a cycle with no apparent progress.\n\n"
+        "Here is the concatenated string of these commands (in order):\n"
         f"{repetition_window}\n\n"
         "Please analyze everything you know about the task so far, break out of this loop, "
         "and suggest exactly one new command (with its arguments) that will move the task forward.\n\n"
@@ -624,8 +625,19 @@ def execute_shell(command: str, agent: Agent) -> str:
 
     # If container exists but a previous cmd is stuck, handle it
     if agent.container and (stuck_msg := _handle_stuck(command, agent)):
+        # The stuck command may still be writing files
+        agent.command_cache.invalidate()
         return stuck_msg
 
+    # Read-only commands are served from cache while no file changed
+    cacheable = is_read_only(command) and not getattr(agent, "command_stuck", False)
+    if cacheable and (cached := agent.command_cache.lookup(command)) is not None:
+        logger.info(f"Serving '{command}' from cache, no file changed since it last ran")
+        return (
+            "Output in terminal after executing the command "
+            f"(cached: no file changed since this command last ran):\n{cached}"
+        )
+
     # Dispatch
     try:
         if not agent.container:
@@ -641,6 +653,8 @@ def execute_shell(command: str, agent: Agent) -> str:
             return raw
 
         agent.command_stuck = False
+        if cacheable:
+            agent.command_cache.store(command, raw)
         return f"Output in terminal after executing the command:\n{raw}"
     except Exception as e:
         print("-"*20 + "OUTPUT AS RETURNED BY SHELL" + "-"*20)
@@ -3,6 +3,10 @@ import requests
 from googlesearch import search
 import openai
 import json
+import time
+
+from autogpt.llm.metering import get_usage_meter
+from autogpt.llm.routing import get_router
 
 def google_search(query, num_results=5, pause=2.0):
     """
@@ -68,8 +72,10 @@ def analyze_content_with_llm(content, prompt):
         ]
 
         # Prepare the request data for the /chat/completions endpoint
+        router = get_router()
+        model = router.model_for("doc_analysis", "gpt-4o-mini")
         data = {
-            "model": "gpt-4o-mini",
+            "model": model,
             "messages": messages
         }
 
@@ -85,12 +91,19 @@ def analyze_content_with_llm(content, prompt):
         ]
 
         # Execute the curl command and capture the response
+        started_at = time.perf_counter()
         result = subprocess.run(curl_command, capture_output=True, text=True)
 
         # Check if the request was successful
         if result.returncode == 0:
             # Parse the JSON response
             response_data = json.loads(result.stdout)
+            get_usage_meter().record_usage(
+                model,
+                response_data.get("usage", {}),
+                time.perf_counter() - started_at,
+                call_site="doc_analysis",
+            )
             return response_data['choices'][0]['message']['content'].strip()
         else:
             print(f"Error with curl request: {result.stderr}")
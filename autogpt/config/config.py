@@ -58,6 +58,20 @@ class Config(SystemSettings, arbitrary_types_allowed=True):
     smart_llm: str = "gpt-4o-mini"
     temperature: float = 0
     openai_functions: bool = False
+    openai_streaming: bool = False
+    openai_rpm_limit: Optional[int] = None
+    openai_tpm_limit: Optional[int] = None
+    openai_max_concurrency: int = 16
+    openai_rate_limit_state_file: Optional[str] = None
+    openai_hedge_model: Optional[str] = None
+    openai_hedge_api_base: Optional[str] = None
+    openai_hedge_api_key: Optional[str] = None
+    openai_hedge_budget_percent: float = 5
+    openai_hedge_fallback_delay: Optional[float] = None
+    llm_replay_mode: str = "off"
+    llm_replay_file: Optional[str] = None
+    llm_replay_match: str = "exact"
+    llm_routes: list[str] = Field(default_factory=list)
     embedding_model: str = "text-embedding-ada-002"
     browse_spacy_language_model: str = "en_core_web_sm"
     # Run loop configuration
@@ -87,6 +101,10 @@ class Config(SystemSettings, arbitrary_types_allowed=True):
     execute_local_commands: bool = False
     shell_denylist: list[str] = Field(default_factory=lambda: ["sudo", "su"])
     shell_allowlist: list[str] = Field(default_factory=list)
+    command_result_token_budget: int = 4000
+    local_summary_max_tokens: int = 60
+    parsable_log_fsync: str = "close"
+    trace_events: bool = False
     # Text to image
     image_provider: Optional[str] = None
     huggingface_image_model: str = "CompVis/stable-diffusion-v1-4"
@@ -247,6 +265,16 @@ class ConfigBuilder(Configurable[Config]):
             "restrict_to_workspace": os.getenv("RESTRICT_TO_WORKSPACE", "True")
             == "True",
             "openai_functions": os.getenv("OPENAI_FUNCTIONS", "False") == "True",
+            "openai_streaming": os.getenv("OPENAI_STREAMING", "False") == "True",
+            "openai_rate_limit_state_file": os.getenv("OPENAI_RATE_LIMIT_STATE_FILE"),
+            "openai_hedge_model": os.getenv("OPENAI_HEDGE_MODEL"),
+            "openai_hedge_api_base": os.getenv("OPENAI_HEDGE_API_BASE"),
+            "openai_hedge_api_key": os.getenv("OPENAI_HEDGE_API_KEY"),
+            "llm_replay_mode": os.getenv("LLM_REPLAY_MODE"),
+            "llm_replay_file": os.getenv("LLM_REPLAY_FILE"),
+            "llm_replay_match": os.getenv("LLM_REPLAY_MATCH"),
+            "parsable_log_fsync": os.getenv("PARSABLE_LOG_FSYNC"),
+            "trace_events": os.getenv("TRACE_EVENTS") == "True",
             "elevenlabs_api_key": os.getenv("ELEVENLABS_API_KEY"),
             "streamelements_voice": os.getenv("STREAMELEMENTS_VOICE"),
             "text_to_speech_provider": os.getenv("TEXT_TO_SPEECH_PROVIDER"),
@@ -306,6 +334,8 @@ class ConfigBuilder(Configurable[Config]):
                 default_tts_provider = "gtts"
             config_dict["text_to_speech_provider"] = default_tts_provider
 
+        config_dict["llm_routes"] = _safe_split(os.getenv("LLM_ROUTES"))
+
         config_dict["plugins_allowlist"] = _safe_split(os.getenv("ALLOWLISTED_PLUGINS"))
         config_dict["plugins_denylist"] = _safe_split(os.getenv("DENYLISTED_PLUGINS"))
 
@@ -315,6 +345,30 @@ class ConfigBuilder(Configurable[Config]):
             config_dict["redis_port"] = int(os.getenv("REDIS_PORT"))
         with contextlib.suppress(TypeError):
             config_dict["temperature"] = float(os.getenv("TEMPERATURE"))
+        with contextlib.suppress(TypeError):
+            config_dict["openai_rpm_limit"] = int(os.getenv("OPENAI_RPM_LIMIT"))
+        with contextlib.suppress(TypeError):
+            config_dict["openai_tpm_limit"] = int(os.getenv("OPENAI_TPM_LIMIT"))
+        with contextlib.suppress(TypeError):
+            config_dict["openai_max_concurrency"] = int(
+                os.getenv("OPENAI_MAX_CONCURRENCY")
+            )
+        with contextlib.suppress(TypeError):
+            config_dict["command_result_token_budget"] = int(
+                os.getenv("COMMAND_RESULT_TOKEN_BUDGET")
+            )
+        with contextlib.suppress(TypeError):
+            config_dict["local_summary_max_tokens"] = int(
+                os.getenv("LOCAL_SUMMARY_MAX_TOKENS")
+            )
+        with contextlib.suppress(TypeError):
+            config_dict["openai_hedge_budget_percent"] = float(
+                os.getenv("OPENAI_HEDGE_BUDGET_PERCENT")
+            )
+        with contextlib.suppress(TypeError):
+            config_dict["openai_hedge_fallback_delay"] = float(
+                os.getenv("OPENAI_HEDGE_FALLBACK_DELAY")
+            )
 
         if config_dict["use_azure"]:
             azure_config = cls.load_azure_config(
@@ -0,0 +1,213 @@
+"""Incremental JSON parsing for streamed LLM responses."""
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from typing import Any, Iterator
+
+JSONPath = tuple[str | int, ...]
+
+_WHITESPACE = " \t\r\n"
+_SCALAR_TERMINATORS = _WHITESPACE + ",}]"
+
+
+class MalformedJSONError(ValueError):
+    """Raised as soon as the streamed text can no longer become valid JSON."""
+
+
+@dataclass
+class JSONStreamEvent:
+    """A value that has been completely received.
+
+    Attributes:
+        path: the location of the value, e.g. `("command", "name")`
+        value: the decoded value; containers are emitted once they are closed
+    """
+
+    path: JSONPath
+    value: Any
+
+
+class IncrementalJSONParser:
+    """Parses a single JSON object that arrives in arbitrary chunks.
+
+    Every time a value (string, number, literal, object or array) is complete,
+    a `JSONStreamEvent` is emitted with its path from the root. Syntax errors are
+    reported on the first offending character, so a consumer can stop a stream
+    without waiting for the rest of it.
+
+    Everything before the first `{` is skipped, since models sometimes wrap their
+    JSON in a markdown code fence (```` ```json ````) or introduce it with prose.
+    """
+
+    def __init__(self):
+        self._stack: list[tuple[dict | list, str | int | None]] = []
+        self._expect = "value"
+        self._string: list[str] | None = None
+        self._string_is_key = False
+        self._escape = False
+        self._scalar: list[str] | None = None
+        self._pending_key: str | None = None
+        self._started = False
+        self.done = False
+        self.value: Any = None
+
+    @property
+    def path(self) -> JSONPath:
+        return tuple(key for _, key in self._stack)
+
+    def feed(self, chunk: str) -> list[JSONStreamEvent]:
+        """Feed the next chunk of text and return the events it completed."""
+        return list(self._feed(chunk))
+
+    def _feed(self, chunk: str) -> Iterator[JSONStreamEvent]:
+        for char in chunk:
+            if self.done:
+                return
+
+            if not self._started:
+                if char != "{":
+                    continue
+                self._started = True
+
+            if self._string is not None:
+                yield from self._feed_string(char)
+                continue
+
+            if self._scalar is not None:
+                if char not in _SCALAR_TERMINATORS:
+                    self._scalar.append(char)
+                    continue
+                yield from self._end_scalar()
+                if self.done:
+                    return
+
+            yield from self._feed_structural(char)
+
+    def _feed_string(self, char: str) -> Iterator[JSONStreamEvent]:
+        assert self._string is not None
+        if self._escape:
+            self._string.append(char)
+            self._escape = False
+            return
+        if char == "\\":
+            self._string.append(char)
+            self._escape = True
+            return
+        if char != '"':
+            self._string.append(char)
+            return
+
+        try:
+            text = json.loads('"' + "".join(self._string) + '"', strict=False)
+        except json.JSONDecodeError as e:
+            raise MalformedJSONError(f"Invalid string literal: {e}") from e
+        self._string = None
+
+        if self._string_is_key:
+            self._pending_key = text
+            self._expect = "colon"
+        else:
+            yield from self._complete_value(text)
+
+    def _end_scalar(self) -> Iterator[JSONStreamEvent]:
+        assert self._scalar is not None
+        token = "".join(self._scalar)
+        self._scalar = None
+        try:
+            value = json.loads(token)
+        except json.JSONDecodeError as e:
+            raise MalformedJSONError(f"Invalid literal {token!r}") from e
+        yield from self._complete_value(value)
+
+    def _feed_structural(self, char: str) -> Iterator[JSONStreamEvent]:
+        if char in _WHITESPACE:
+            return
+
+        expect = self._expect
+        if expect == "key":
+            if char == '"':
+                self._string = []
+                self._string_is_key = True
+            elif char == "}" and self._can_close(dict):
+                yield from self._close_container()
+            else:
+                raise MalformedJSONError(f"Expected an object key, got {char!r}")
+        elif expect == "colon":
+            if char != ":":
+                raise MalformedJSONError(f"Expected ':', got {char!r}")
+            self._expect = "value"
+        elif expect == "value":
+            if char == "]" and self._can_close(list):
+                yield from self._close_container()
+            else:
+                self._start_value(char)
+        elif expect == "separator":
+            container = self._stack[-1][0]
+            if char == ",":
+                self._expect = "key" if isinstance(container, dict) else "value"
+                self._stack[-1] = (container, None)
+            elif char == "}" and isinstance(container, dict):
+                yield from self._close_container()
+            elif char == "]" and isinstance(container, list):
+                yield from self._close_container()
+            else:
+                raise MalformedJSONError(
+                    f"Expected ',' or a closing bracket, got {char!r}"
+                )
+
+    def _can_close(self, container_type: type) -> bool:
+        """An empty container may be closed right after it was opened"""
+        return bool(self._stack) and (
+            isinstance(self._stack[-1][0], container_type)
+            and not self._stack[-1][0]
+            and self._stack[-1][1] is None
+        )
+
+    def _start_value(self, char: str) -> None:
+        if char == '"':
+            self._string = []
+            self._string_is_key = False
+            self._attach_key()
+        elif char == "{":
+            self._attach_key()
+            self._stack.append(({}, None))
+            self._expect = "key"
+        elif char == "[":
+            self._attach_key()
+            self._stack.append(([], None))
+            self._expect = "value"
+        elif char in "-0123456789tfn":
+            self._attach_key()
+            self._scalar = [char]
+        else:
+            raise MalformedJSONError(f"Expected a value, got {char!r}")
+
+    def _attach_key(self) -> None:
+        """Marks the slot in the parent container that the next value will fill"""
+        if not self._stack:
+            return
+        container, _ = self._stack[-1]
+        if isinstance(container, dict):
+            self._stack[-1] = (container, self._pending_key)
+        else:
+            self._stack[-1] = (container, len(container))
+
+    def _close_container(self) -> Iterator[JSONStreamEvent]:
+        container, _ = self._stack.pop()
+        yield from self._complete_value(container)
+
+    def _complete_value(self, value: Any) -> Iterator[JSONStreamEvent]:
+        if not self._stack:
+            self.value = value
+            self.done = True
+            yield JSONStreamEvent((), value)
+            return
+
+        container, key = self._stack[-1]
+        if isinstance(container, dict):
+            container[key] = value
+        else:
+            container.append(value)
+        yield JSONStreamEvent(self.path, value)
+        self._expect = "separator"
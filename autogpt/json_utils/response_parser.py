@@ -0,0 +1,203 @@
+"""Parse LLM responses once, repairing the usual defects of model-written JSON."""
+from __future__ import annotations
+
+import copy
+import functools
+import re
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import orjson
+
+_ESCAPES = set('"\\/bfnrtu')
+_CONTROL_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_CLOSERS = {"{": "}", "[": "]"}
+_DANGLING_KEY = re.compile(r'[{,]\s*"(?:[^"\\]|\\.)*"$')
+
+
+class ResponseParseError(ValueError):
+    """Raised when a response holds no JSON object, even after repairs."""
+
+
+@dataclass(frozen=True)
+class ParsedResponse:
+    """A response of the LLM, parsed.
+
+    Attributes:
+        raw: the content of the response
+        data: the JSON object in the response, or None if there is none
+        repairs: the defects that were repaired to parse it
+        error: why the response could not be parsed, if it couldn't
+    """
+
+    raw: str
+    data: Optional[dict[str, Any]]
+    repairs: tuple[str, ...] = ()
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.data is not None
+
+    @property
+    def command(self) -> Optional[dict[str, Any]]:
+        command = (self.data or {}).get("command")
+        return command if isinstance(command, dict) else None
+
+    @property
+    def command_name(self) -> Optional[str]:
+        return (self.command or {}).get("name")
+
+    @property
+    def command_args(self) -> dict[str, Any]:
+        args = (self.command or {}).get("args")
+        return args if isinstance(args, dict) else {}
+
+    @property
+    def thoughts(self) -> Any:
+        return (self.data or {}).get("thoughts")
+
+    def to_dict(self) -> dict[str, Any]:
+        """A copy of the parsed object that the caller is free to change"""
+        return copy.deepcopy(self.data) if self.data is not None else {}
+
+
+@functools.lru_cache(maxsize=256)
+def parse_response(content: str) -> ParsedResponse:
+    """Parses the JSON object in an LLM response, once per distinct response.
+
+    Well-formed JSON is decoded directly; anything else is repaired first, see
+    `repair_json`. The result is shared between callers: use `to_dict()` to get
+    an object that can be changed.
+    """
+    stripped = content.strip()
+    if stripped.startswith("{"):
+        try:
+            data = orjson.loads(stripped)
+        except orjson.JSONDecodeError:
+            pass
+        else:
+            if isinstance(data, dict):
+                return ParsedResponse(content, data)
+
+    try:
+        text, repairs = repair_json(content)
+        data = orjson.loads(text)
+    except (ResponseParseError, orjson.JSONDecodeError) as e:
+        return ParsedResponse(content, None, error=str(e))
+    if not isinstance(data, dict):
+        return ParsedResponse(content, None, error="The response is not a JSON object")
+    return ParsedResponse(content, data, tuple(repairs))
+
+
+def repair_json(text: str) -> tuple[str, list[str]]:
+    """Rewrites the first JSON object in `text` as valid JSON.
+
+    Repairs, in a single pass: surrounding prose and code fences, single-quoted
+    strings, invalid escapes, raw control characters in strings, Python literals
+    (`True`, `False`, `None`), trailing commas, and objects cut off before their
+    end, whose open strings, arrays and objects are closed.
+
+    Returns:
+        The repaired JSON, and a description of each kind of repair made.
+    """
+    fence = text.find("```")
+    start = text.find("{", fence + 3 if fence != -1 else 0)
+    if start == -1:
+        start = text.find("{")
+    if start == -1:
+        raise ResponseParseError("The response contains no JSON object")
+
+    repairs: dict[str, None] = {}
+    if text[:start].strip():
+        repairs["text around the object"] = None
+
+    out: list[str] = []
+    stack: list[str] = []
+    quote: Optional[str] = None
+    i, end = start, len(text)
+    while i < end:
+        c = text[i]
+        if quote:
+            if c == "\\":
+                following = text[i + 1] if i + 1 < end else ""
+                if quote == "'" and following == "'":
+                    out.append("'")
+                elif following in _ESCAPES and following:
+                    out.append(c + following)
+                else:
+                    out.append("\\\\")
+                    repairs["invalid escapes"] = None
+                    i += 1
+                    continue
+                i += 2
+                continue
+            if c == quote:
+                out.append('"')
+                quote = None
+            elif c == '"':
+                out.append('\\"')
+            elif c < " ":
+                out.append(_CONTROL_ESCAPES.get(c) or f"\\u{ord(c):04x}")
+                repairs["control characters in strings"] = None
+            else:
+                out.append(c)
+        elif c == '"' or c == "'":
+            if c == "'":
+                repairs["single quotes"] = None
+            out.append('"')
+            quote = c
+        elif c in _CLOSERS:
+            stack.append(c)
+            out.append(c)
+        elif c == "}" or c == "]":
+            if _strip_trailing_comma(out):
+                repairs["trailing commas"] = None
+            closer = _CLOSERS[stack.pop()]
+            if closer != c:
+                repairs["mismatched brackets"] = None
+            out.append(closer)
+            if not stack:
+                break
+        elif c.isalpha() or c == "_":
+            j = i
+            while j < end and (text[j].isalnum() or text[j] == "_"):
+                j += 1
+            word = text[i:j]
+            if word in _LITERALS:
+                repairs["Python literals"] = None
+            out.append(_LITERALS.get(word, word))
+            i = j
+            continue
+        else:
+            out.append(c)
+        i += 1
+
+    if i < end:
+        if text[i + 1 :].strip():
+            repairs["text around the object"] = None
+    else:
+        repairs["truncated object"] = None
+        if quote:
+            out.append('"')
+        _strip_trailing_comma(out)
+        tail = "".join(out[-200:]).rstrip()
+        if tail.endswith(":"):
+            out.append(" null")
+        elif stack[-1] == "{" and _DANGLING_KEY.search(tail):
+            out.append(": null")
+        out.extend(_CLOSERS[opener] for opener in reversed(stack))
+
+    return "".join(out), list(repairs)
+
+
+def _strip_trailing_comma(out: list[str]) -> bool:
+    """Removes a comma (and the whitespace after it) at the end of `out`"""
+    j = len(out)
+    while j and out[j - 1].isspace():
+        j -= 1
+    if j and out[j - 1] == ",":
+        del out[j - 1 :]
+        return True
+    return False
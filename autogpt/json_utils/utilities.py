@@ -1,47 +1,36 @@
 """Utilities for the json_fixes package."""
-import ast
+import functools
 import json
 import os.path
+from types import SimpleNamespace
 from typing import Any, Literal
 
 from jsonschema import Draft7Validator
 
 from autogpt.config import Config
+from autogpt.json_utils.response_parser import ParsedResponse, parse_response
 from autogpt.logs import logger
 
 LLM_DEFAULT_RESPONSE_FORMAT = "llm_response_format_1"
 
 
 def extract_dict_from_response(response_content: str) -> dict[str, Any]:
-    # Someimes the response includes the JSON in a code block with ```
-    start_triple_quote = response_content.find("```")
-    if start_triple_quote != -1:
-        response_content = response_content[start_triple_quote:]
-        end_triple_quote = response_content[3:].find("```")
-        if end_triple_quote !=-1:
-            response_content = response_content[:end_triple_quote+3]
-            response_content = "\n".join(response_content.split("\n")[1:])
-            
-        """if response_content.startswith("```") and response_content.endswith("```"):
-            response_content = response_content.split("\n")[1:]
-            for i in range(len(response_content)-1, 0, -1):
-                if response_content[i]=="```":
-                    response_content = response_content[:i]
-                    break
-            response_content = "\n".join(response_content)"""
-            # Discard the first and last ```, then re-join in case the response naturally included ```
-            #response_content = "```".join(response_content.split("```")[1:-1])
-
-    # response content comes from OpenAI as a Python `str(content_dict)`, literal_eval reverses this
-    try:
-        return ast.literal_eval(response_content)
-    except BaseException as e:
-        with open("response_content.txt", "w") as rct:
-            rct.write(response_content)
-        logger.info(f"Error parsing JSON response with literal_eval {e}")
-        logger.debug(f"Invalid JSON received in response: {response_content}")
-        # TODO: How to raise an error here without causing the program to exit?
-        return {}
+    """Returns the JSON object in a response, or an empty dict if there is none.
+
+    The object is a copy that the caller may change; see `parse_response`.
+    """
+    parsed = parse_response(response_content)
+    log_parse_result(parsed)
+    return parsed.to_dict()
+
+
+def log_parse_result(parsed: ParsedResponse) -> None:
+    """Logs why a response could not be parsed, or what was repaired to parse it"""
+    if not parsed.ok:
+        logger.info(f"Error parsing JSON response: {parsed.error}")
+        logger.debug(f"Invalid JSON received in response: {parsed.raw}")
+    elif parsed.repairs:
+        logger.debug(f"Repaired JSON response: {', '.join(parsed.repairs)}")
 
 
 def llm_response_schema(
@@ -59,6 +48,14 @@ def llm_response_schema(
     return json_schema
 
 
+@functools.lru_cache(maxsize=None)
+def _response_validator(schema_name: str, openai_functions: bool) -> Draft7Validator:
+    """The validator of a response schema, compiled once per process"""
+    config = SimpleNamespace(openai_functions=openai_functions)
+    schema = llm_response_schema(config, schema_name)
+    return Draft7Validator(schema)
+
+
 def validate_dict(
     object: object, config: Config, schema_name: str = LLM_DEFAULT_RESPONSE_FORMAT
 ) -> tuple[Literal[True], None] | tuple[Literal[False], list]:
@@ -71,8 +68,7 @@ def validate_dict(
         bool: Whether the json_object is valid or not
         list: Errors found in the json_object, or None if the object is valid
     """
-    schema = llm_response_schema(config, schema_name)
-    validator = Draft7Validator(schema)
+    validator = _response_validator(schema_name, config.openai_functions)
 
     if errors := sorted(validator.iter_errors(object), key=lambda e: e.path):
         for error in errors:
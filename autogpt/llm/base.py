@@ -1,11 +1,13 @@
 from __future__ import annotations
 
-from copy import deepcopy
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from math import ceil, floor
 from typing import TYPE_CHECKING, Literal, Optional, Type, TypedDict, TypeVar, overload
 
+from autogpt.llm.message_list import MessageList
+
 if TYPE_CHECKING:
+    from autogpt.json_utils.response_parser import ParsedResponse
     from autogpt.llm.providers.openai import OpenAIFunctionCall
 
 MessageRole = Literal["system", "user", "assistant", "function"]
@@ -31,13 +33,29 @@ class FunctionCallDict(TypedDict):
     arguments: str
 
 
-@dataclass
+@dataclass(frozen=True)
 class Message:
-    """OpenAI Message object containing a role and the message content"""
+    """OpenAI Message object containing a role and the message content.
+
+    Messages are immutable so that chat sequences can share them; use
+    `dataclasses.replace` to derive a changed message.
+    """
 
     role: MessageRole
     content: str
     type: MessageType | None = None
+    _token_count: Optional[tuple[str, int]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    """Memo of `autogpt.llm.tokens.message_tokens`: (encoding, count)"""
+    _history_id: Optional[int] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    """When the message was added to a `MessageHistory`; increases with each message"""
+    _parsed: Optional[ParsedResponse] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    """The parsed content of an AI response, see `MessageHistory.add_reply`"""
 
     def raw(self) -> MessageDict:
         return {"role": self.role, "content": self.content}
@@ -122,7 +140,15 @@ class ChatSequence:
     """Utility container for a chat sequence"""
 
     model: ChatModelInfo
-    messages: list[Message] = field(default_factory=list[Message])
+    messages: MessageList = field(default_factory=MessageList)
+    _token_total: Optional[tuple[str, int, int]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    """(model, number of messages counted, token count) for `token_length`"""
+
+    def __post_init__(self):
+        if not isinstance(self.messages, MessageList):
+            self.messages = MessageList(self.messages)
 
     @overload
     def __getitem__(self, key: int) -> Message:
@@ -134,9 +160,7 @@ class ChatSequence:
 
     def __getitem__(self: TChatSequence, key: int | slice) -> Message | TChatSequence:
         if isinstance(key, slice):
-            copy = deepcopy(self)
-            copy.messages = self.messages[key]
-            return copy
+            return replace(self, messages=self.messages[key])
         return self.messages[key]
 
     def __iter__(self):
@@ -162,9 +186,11 @@ class ChatSequence:
     def insert(self, index: int, *messages: Message):
         for message in reversed(messages):
             self.messages.insert(index, message)
+        self._token_total = None
             
     def setFromDictList(self, messages: list[MessageDict]):
         self.messages.clear()
+        self._token_total = None
         self.extend(Message.fromDictList(messages))
 
     @classmethod
@@ -180,14 +206,27 @@ class ChatSequence:
             raise ValueError(f"Unknown chat model '{model_name}'")
 
         return cls(
-            model=OPEN_AI_CHAT_MODELS[model_name], messages=list(messages), **kwargs
+            model=OPEN_AI_CHAT_MODELS[model_name],
+            messages=MessageList(messages),
+            **kwargs,
         )
 
     @property
     def token_length(self) -> int:
-        from autogpt.llm.utils import count_message_tokens
+        """The number of tokens of the sequence.
 
-        return count_message_tokens(self.messages, self.model.name)
+        Messages are only appended to a sequence, or it is rebuilt, so only the
+        messages added since the last count are counted.
+        """
+        from autogpt.llm.tokens import REPLY_PRIMING_TOKENS, message_tokens
+
+        model = self.model.name
+        counted_model, counted, total = self._token_total or (model, 0, 0)
+        if counted_model != model or counted > len(self.messages):
+            counted, total = 0, 0
+        total += sum(message_tokens(m, model) for m in self.messages[counted:])
+        self._token_total = (model, len(self.messages), total)
+        return REPLY_PRIMING_TOKENS + total
 
     def raw(self) -> list[MessageDict]:
         return [m.raw() for m in self.messages]
@@ -0,0 +1,173 @@
+"""Hedging of slow LLM calls with a duplicate request to a secondary endpoint.
+
+If the response to a call has not arrived by the time most calls of the same call
+site have finished (their running p95 latency), a duplicate request is sent to a
+secondary endpoint or model and the first of the two to finish is used. The other
+one is cancelled. To bound the extra load, only a budgeted fraction of all calls
+may be hedged.
+"""
+from __future__ import annotations
+
+import atexit
+import contextvars
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Optional, TypeVar
+
+from autogpt.llm.metering import UsageMeter, get_usage_meter
+from autogpt.logs import logger
+
+T = TypeVar("T")
+
+Racer = Callable[[threading.Event], T]
+"""Makes an LLM call, stopping early once the given event is set"""
+
+
+class HedgeCancelled(Exception):
+    """Raised by a racer that stopped because the other request finished first"""
+
+
+@dataclass
+class HedgeStats:
+    calls: int = 0
+    hedges: int = 0
+    hedge_wins: int = 0
+
+    @property
+    def hedge_rate(self) -> float:
+        return self.hedges / self.calls if self.calls else 0
+
+
+class Hedger:
+    """Races a slow call against a duplicate sent to a secondary endpoint.
+
+    Params:
+        secondary: Arguments that point a duplicate request to the secondary
+            endpoint or model, e.g. `model`, `api_base` and `api_key`.
+        budget: The maximum fraction of calls that may be hedged.
+        percentile: The latency percentile of a call site after which to hedge.
+        min_samples: The number of latencies a call site needs before its
+            percentile is trusted; until then `fallback_delay` is used.
+        fallback_delay: Seconds after which to hedge calls of call sites without
+            enough samples; `None` to not hedge them.
+        meter: The usage meter to take the latencies from.
+    """
+
+    def __init__(
+        self,
+        secondary: dict,
+        budget: float = 0.05,
+        percentile: float = 95,
+        min_samples: int = 20,
+        fallback_delay: Optional[float] = None,
+        meter: Optional[UsageMeter] = None,
+    ):
+        self.secondary = secondary
+        self.budget = budget
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.fallback_delay = fallback_delay
+        self.meter = meter
+        self.stats = HedgeStats()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(thread_name_prefix="llm-hedge")
+
+    def delay_for(self, call_site: str) -> Optional[float]:
+        """Returns after how many seconds a call of `call_site` is hedged"""
+        stats = (self.meter or get_usage_meter()).call_site_stats(call_site)
+        if len(stats.latencies) < self.min_samples:
+            return self.fallback_delay
+        return stats.latency_percentile(self.percentile)
+
+    def call(self, call_site: str, primary: Racer[T], secondary: Racer[T]) -> T:
+        """Runs `primary`, and races it against `secondary` if it is slow.
+
+        Returns:
+            The result of whichever racer finished first without an error
+
+        Raises:
+            The error of the last racer to fail, if both fail
+        """
+        with self._lock:
+            self.stats.calls += 1
+
+        delay = self.delay_for(call_site)
+        cancel_primary = threading.Event()
+        primary_future = self._submit(primary, cancel_primary)
+        wait([primary_future], timeout=delay)
+        if primary_future.done() or not self._take_budget():
+            return primary_future.result()
+
+        logger.debug(f"Hedging {call_site} call after {delay:.1f}s")
+        cancel_secondary = threading.Event()
+        secondary_future = self._submit(secondary, cancel_secondary)
+        cancel_events = {
+            primary_future: cancel_primary,
+            secondary_future: cancel_secondary,
+        }
+
+        pending = set(cancel_events)
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winner = next((f for f in done if f.exception() is None), None)
+            if winner is not None:
+                for loser in pending:
+                    cancel_events[loser].set()
+                if winner is secondary_future:
+                    with self._lock:
+                        self.stats.hedge_wins += 1
+                return winner.result()
+            if not pending:
+                raise done.pop().exception()
+
+    def _submit(self, racer: Racer[T], cancelled: threading.Event) -> Future:
+        # Racers run in the context of the caller, e.g. to keep its call site
+        context = contextvars.copy_context()
+        return self._executor.submit(context.run, racer, cancelled)
+
+    def _take_budget(self) -> bool:
+        with self._lock:
+            if self.stats.hedges + 1 > self.budget * self.stats.calls:
+                return False
+            self.stats.hedges += 1
+            return True
+
+
+_hedger: Optional[Hedger] = None
+
+
+def get_hedger() -> Optional[Hedger]:
+    """Returns the process-wide hedger, or `None` if hedging is disabled"""
+    return _hedger
+
+
+def configure_hedger(
+    model: Optional[str] = None,
+    api_base: Optional[str] = None,
+    api_key: Optional[str] = None,
+    budget_percent: float = 5,
+    fallback_delay: Optional[float] = None,
+) -> Optional[Hedger]:
+    """Enables hedging if a secondary model or endpoint is given"""
+    global _hedger
+    secondary = {
+        k: v
+        for k, v in {"model": model, "api_base": api_base, "api_key": api_key}.items()
+        if v
+    }
+    if "model" not in secondary and "api_base" not in secondary:
+        _hedger = None
+        return None
+    _hedger = Hedger(secondary, budget_percent / 100, fallback_delay=fallback_delay)
+    return _hedger
+
+
+@atexit.register
+def _log_stats() -> None:
+    if _hedger and _hedger.stats.hedges:
+        stats = _hedger.stats
+        logger.info(
+            f"Hedged {stats.hedges} of {stats.calls} LLM calls "
+            f"({stats.hedge_rate:.1%}), the secondary won {stats.hedge_wins}"
+        )
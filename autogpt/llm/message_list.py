@@ -0,0 +1,162 @@
+"""A list of messages whose slices share storage with it."""
+from __future__ import annotations
+
+import itertools
+import weakref
+from typing import TYPE_CHECKING, Iterable, Iterator, MutableSequence, overload
+
+if TYPE_CHECKING:
+    from autogpt.llm.base import Message
+
+
+class _Storage:
+    __slots__ = ("items", "views")
+
+    def __init__(self, items: list[Message]):
+        self.items = items
+        # Keyed by id: lists compare by value and aren't hashable
+        self.views: weakref.WeakValueDictionary[int, MessageList] = (
+            weakref.WeakValueDictionary()
+        )
+
+
+class MessageList(MutableSequence["Message"]):
+    """A list of messages of which (contiguous) slices are views, not copies.
+
+    Slicing takes constant time: the slice is a window onto the same storage.
+    Appending to a list or view that ends where the storage ends is done in place.
+    Any other change is copy-on-write: if another live view can see the change,
+    the list first copies its messages to storage of its own.
+
+    Messages are immutable, so sharing them between views is safe. A typical use
+    is `history = history[:-2]` followed by appends to the new `history`: once the
+    original list is gone, the appends reuse its storage.
+    """
+
+    __slots__ = ("_storage", "_start", "_stop", "__weakref__")
+
+    def __init__(self, messages: Iterable[Message] = ()):
+        self._attach(_Storage(list(messages)), 0, None)
+
+    def _attach(self, storage: _Storage, start: int, stop: int | None) -> None:
+        if hasattr(self, "_storage"):
+            self._storage.views.pop(id(self), None)
+        self._storage = storage
+        self._start = start
+        self._stop = len(storage.items) if stop is None else stop
+        storage.views[id(self)] = self
+
+    @classmethod
+    def _view(cls, storage: _Storage, start: int, stop: int) -> MessageList:
+        view = cls.__new__(cls)
+        view._attach(storage, start, stop)
+        return view
+
+    def _shared(self, beyond: int = -1) -> bool:
+        """Whether another view sees any message past index `beyond` of the storage"""
+        return any(
+            view is not self and view._stop > max(beyond, view._start)
+            for view in self._storage.views.values()
+        )
+
+    def _own(self) -> None:
+        """Makes sure no other view sees changes to this list"""
+        if self._shared():
+            self._attach(_Storage(self._storage.items[self._start : self._stop]), 0, None)
+            return
+        # Nobody else uses the storage; drop what this view doesn't show
+        items = self._storage.items
+        del items[self._stop :]
+        del items[: self._start]
+        self._start, self._stop = 0, len(items)
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    def __iter__(self) -> Iterator[Message]:
+        return itertools.islice(self._storage.items, self._start, self._stop)
+
+    @overload
+    def __getitem__(self, index: int) -> Message:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> MessageList:
+        ...
+
+    def __getitem__(self, index: int | slice) -> Message | MessageList:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return MessageList(list(self)[index])
+            stop = max(start, stop)
+            return self._view(self._storage, self._start + start, self._start + stop)
+        return self._storage.items[self._start + self._index(index)]
+
+    def __setitem__(self, index, value) -> None:
+        if isinstance(index, slice):
+            messages = list(self)
+            messages[index] = value
+            self._attach(_Storage(messages), 0, None)
+            return
+        index = self._index(index)
+        self._own()
+        self._storage.items[self._start + index] = value
+
+    def __delitem__(self, index) -> None:
+        if isinstance(index, slice):
+            messages = list(self)
+            del messages[index]
+            self._attach(_Storage(messages), 0, None)
+            return
+        index = self._index(index)
+        self._own()
+        del self._storage.items[self._start + index]
+        self._stop -= 1
+
+    def insert(self, index: int, value: Message) -> None:
+        self._own()
+        index = min(max(index + len(self) if index < 0 else index, 0), len(self))
+        self._storage.items.insert(self._start + index, value)
+        self._stop += 1
+
+    def append(self, value: Message) -> None:
+        items = self._storage.items
+        if self._stop != len(items):
+            if self._shared(beyond=self._stop):
+                self._attach(_Storage(items[self._start : self._stop]), 0, None)
+            else:
+                del items[self._stop :]
+        self._storage.items.append(value)
+        self._stop += 1
+
+    def extend(self, values: Iterable[Message]) -> None:
+        for value in list(values):
+            self.append(value)
+
+    def clear(self) -> None:
+        self._attach(_Storage([]), 0, None)
+
+    def _index(self, index: int) -> int:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("message index out of range")
+        return index
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (MessageList, list)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __add__(self, other: Iterable[Message]) -> list[Message]:
+        return list(self) + list(other)
+
+    def __radd__(self, other: Iterable[Message]) -> list[Message]:
+        return list(other) + list(self)
+
+    def __reduce__(self):
+        return (MessageList, (list(self),))
+
+    def __repr__(self) -> str:
+        return f"MessageList({list(self)!r})"
@@ -0,0 +1,221 @@
+"""Usage and latency metering of LLM calls, per model and per call site."""
+from __future__ import annotations
+
+import atexit
+import contextlib
+import contextvars
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Iterator, Mapping, Optional
+
+from autogpt.logs import logger
+
+_call_site: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "llm_call_site", default="default"
+)
+
+
+def current_call_site() -> str:
+    return _call_site.get()
+
+
+@contextlib.contextmanager
+def using_call_site(call_site: str) -> Iterator[None]:
+    """Attributes the LLM calls made within the context to `call_site`"""
+    token = _call_site.set(call_site)
+    try:
+        yield
+    finally:
+        _call_site.reset(token)
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Returns the cost of a call in USD; 0 for models with unknown pricing"""
+    from autogpt.llm.providers.openai import OPEN_AI_MODELS
+
+    model = model[:-3] if model.endswith("-v2") else model
+    if not (info := OPEN_AI_MODELS.get(model)):
+        return 0.0
+    return (
+        prompt_tokens * info.prompt_token_cost
+        + completion_tokens * getattr(info, "completion_token_cost", 0)
+    ) / 1000
+
+
+@dataclass
+class UsageStats:
+    """Usage of one model at one call site"""
+
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_prompt_tokens: int = 0
+    cost: float = 0.0
+    retries: int = 0
+    cache_hits: int = 0
+    escalations: Counter = field(default_factory=Counter)
+    latencies: list[float] = field(default_factory=list)
+
+    def merge(self, other: UsageStats) -> None:
+        self.calls += other.calls
+        self.prompt_tokens += other.prompt_tokens
+        self.completion_tokens += other.completion_tokens
+        self.cached_prompt_tokens += other.cached_prompt_tokens
+        self.cost += other.cost
+        self.retries += other.retries
+        self.cache_hits += other.cache_hits
+        self.escalations.update(other.escalations)
+        self.latencies.extend(other.latencies)
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        latencies = sorted(self.latencies)
+        index = round(percentile / 100 * (len(latencies) - 1))
+        return latencies[index]
+
+
+UsageKey = tuple[str, str]
+"""(call site, model)"""
+
+
+class UsageMeter:
+    """Collects the usage of LLM calls without locking on the hot path.
+
+    Every thread records into its own buffer; the buffers are only merged when
+    the usage is read, so concurrent calls never contend for a lock.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._buffers: list[dict[UsageKey, UsageStats]] = []
+        self._buffers_lock = threading.Lock()
+
+    def _stats(self, model: str, call_site: Optional[str]) -> UsageStats:
+        try:
+            buffer = self._local.buffer
+        except AttributeError:
+            buffer = self._local.buffer = {}
+            with self._buffers_lock:
+                self._buffers.append(buffer)
+
+        key = (call_site or current_call_site(), model)
+        if (stats := buffer.get(key)) is None:
+            stats = buffer[key] = UsageStats()
+        return stats
+
+    def record(
+        self,
+        model: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        latency: Optional[float] = None,
+        cached_prompt_tokens: int = 0,
+        call_site: Optional[str] = None,
+    ) -> None:
+        stats = self._stats(model, call_site)
+        stats.calls += 1
+        stats.prompt_tokens += prompt_tokens
+        stats.completion_tokens += completion_tokens
+        stats.cached_prompt_tokens += cached_prompt_tokens
+        stats.cost += estimate_cost(model, prompt_tokens, completion_tokens)
+        if latency is not None:
+            stats.latencies.append(latency)
+
+    def record_usage(
+        self,
+        model: str,
+        usage: Mapping,
+        latency: Optional[float] = None,
+        call_site: Optional[str] = None,
+    ) -> None:
+        """Records a call from the `usage` object of an API response"""
+        details = usage.get("prompt_tokens_details") or {}
+        self.record(
+            model,
+            usage.get("prompt_tokens", 0),
+            usage.get("completion_tokens", 0),
+            latency,
+            cached_prompt_tokens=details.get("cached_tokens", 0),
+            call_site=call_site,
+        )
+
+    def record_retry(self, model: str, call_site: Optional[str] = None) -> None:
+        self._stats(model, call_site).retries += 1
+
+    def record_cache_hit(self, model: str, call_site: Optional[str] = None) -> None:
+        """Records a call that was answered without calling the API"""
+        self._stats(model, call_site).cache_hits += 1
+
+    def record_escalation(
+        self, model: str, reason: str, call_site: Optional[str] = None
+    ) -> None:
+        self._stats(model, call_site).escalations[reason] += 1
+
+    def snapshot(self) -> dict[UsageKey, UsageStats]:
+        """Merges the buffers of all threads"""
+        with self._buffers_lock:
+            buffers = list(self._buffers)
+        merged: dict[UsageKey, UsageStats] = {}
+        for buffer in buffers:
+            for key, stats in list(buffer.items()):
+                merged.setdefault(key, UsageStats()).merge(stats)
+        return merged
+
+    def call_site_stats(self, call_site: str) -> UsageStats:
+        """The usage of a call site over all models"""
+        total = UsageStats()
+        for (site, _), stats in self.snapshot().items():
+            if site == call_site:
+                total.merge(stats)
+        return total
+
+    def total(self) -> UsageStats:
+        total = UsageStats()
+        for stats in self.snapshot().values():
+            total.merge(stats)
+        return total
+
+    def report(self) -> str:
+        """A per call site and model usage table"""
+
+        def fmt(seconds: Optional[float]) -> str:
+            return f"{seconds:.1f}s" if seconds is not None else "-"
+
+        header = (
+            f"{'call site':<22}{'model':<22}{'calls':>6}{'prompt':>9}{'compl.':>8}"
+            f"{'cached':>8}{'cost':>9}{'p50':>7}{'p95':>7}{'p99':>7}"
+            f"{'retries':>8}{'hits':>6}{'escal.':>7}"
+        )
+        lines = [header]
+        snapshot = self.snapshot()
+        for (call_site, model), s in sorted(snapshot.items()):
+            lines.append(
+                f"{call_site:<22}{model:<22}{s.calls:>6}{s.prompt_tokens:>9}"
+                f"{s.completion_tokens:>8}{s.cached_prompt_tokens:>8}"
+                f"{s.cost:>8.3f}$"
+                f"{fmt(s.latency_percentile(50)):>7}"
+                f"{fmt(s.latency_percentile(95)):>7}"
+                f"{fmt(s.latency_percentile(99)):>7}"
+                f"{s.retries:>8}{s.cache_hits:>6}{sum(s.escalations.values()):>7}"
+            )
+        total = self.total()
+        lines.append(
+            f"Total: {total.calls} calls, {total.prompt_tokens} prompt + "
+            f"{total.completion_tokens} completion tokens, ${total.cost:.3f}"
+        )
+        return "\n".join(lines)
+
+
+_usage_meter = UsageMeter()
+
+
+def get_usage_meter() -> UsageMeter:
+    return _usage_meter
+
+
+@atexit.register
+def _log_usage_report() -> None:
+    if _usage_meter.snapshot():
+        logger.info(f"LLM usage of this run:\n{_usage_meter.report()}")
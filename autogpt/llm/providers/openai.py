@@ -1,10 +1,11 @@
 from __future__ import annotations
 
+import contextlib
 import functools
+import threading
 import time
 from dataclasses import dataclass
-from typing import Callable, List, Optional
-from unittest.mock import patch
+from typing import Callable, Iterator, List, Optional
 
 import openai
 import openai.api_resources.abstract.engine_api_resource as engine_api_resource
@@ -19,6 +20,13 @@ from autogpt.llm.base import (
     TextModelInfo,
     TText,
 )
+from autogpt.llm.hedging import HedgeCancelled
+from autogpt.llm.metering import get_usage_meter
+from autogpt.llm.rate_limiter import (
+    estimate_request_tokens,
+    full_jitter_backoff,
+    get_rate_limiter,
+)
 from autogpt.logs import logger
 from autogpt.models.command_registry import CommandRegistry
 
@@ -111,40 +119,48 @@ OPEN_AI_MODELS: dict[str, ChatModelInfo | EmbeddingModelInfo | TextModelInfo] =
 }
 
 
+def _forward_rate_limit_headers(convert: Callable) -> Callable:
+    """Lets the rate limiter learn the limits from the headers of every response"""
+
+    @functools.wraps(convert)
+    def convert_to_openai_object(resp, *args, **kwargs):
+        if headers := getattr(resp, "_headers", None):
+            get_rate_limiter().update_from_headers(headers)
+        return convert(resp, *args, **kwargs)
+
+    return convert_to_openai_object
+
+
+engine_api_resource.util.convert_to_openai_object = _forward_rate_limit_headers(
+    engine_api_resource.util.convert_to_openai_object
+)
+
+
 def meter_api(func: Callable):
-    """Adds ApiManager metering to functions which make OpenAI API calls"""
+    """Records the usage and latency of functions which make OpenAI API calls.
+
+    The latency is measured end to end, including retries.
+    """
     from autogpt.llm.api_manager import ApiManager
 
     api_manager = ApiManager()
 
-    openai_obj_processor = openai.util.convert_to_openai_object
-
-    def update_usage_with_response(response: OpenAIObject):
-        try:
+    @functools.wraps(func)
+    def metered_func(*args, **kwargs):
+        started_at = time.perf_counter()
+        response = func(*args, **kwargs)
+        if isinstance(response, OpenAIObject) and "usage" in response:
             usage = response.usage
-            logger.debug(f"Reported usage from call to model {response.model}: {usage}")
-            api_manager.update_cost(
-                response.usage.prompt_tokens,
-                response.usage.completion_tokens if "completion_tokens" in usage else 0,
-                response.model,
+            model = kwargs.get("model") or response.model
+            logger.debug(f"Reported usage from call to model {model}: {usage}")
+            get_usage_meter().record_usage(
+                model, usage, time.perf_counter() - started_at
             )
-        except Exception as err:
-            pass
-            #logger.warn(f"Failed to update API costs: {err.__class__.__name__}: {err}")
-
-    def metering_wrapper(*args, **kwargs):
-        openai_obj = openai_obj_processor(*args, **kwargs)
-        if isinstance(openai_obj, OpenAIObject) and "usage" in openai_obj:
-            update_usage_with_response(openai_obj)
-        return openai_obj
-
-    def metered_func(*args, **kwargs):
-        with patch.object(
-            engine_api_resource.util,
-            "convert_to_openai_object",
-            side_effect=metering_wrapper,
-        ):
-            return func(*args, **kwargs)
+            with contextlib.suppress(KeyError):
+                api_manager.update_cost(
+                    usage.prompt_tokens, usage.get("completion_tokens", 0), model
+                )
+        return response
 
     return metered_func
 
@@ -153,13 +169,20 @@ def retry_api(
     max_retries: int = 10,
     backoff_base: float = 2.0,
     warn_user: bool = True,
+    max_backoff: float = 60.0,
+    deadline: float = 600.0,
 ):
     """Retry an OpenAI API call.
 
+    Calls are throttled by the shared rate limiter, and retried with exponential
+    backoff with full jitter, until the retries or the total time budget run out.
+
     Args:
         num_retries int: Number of retries. Defaults to 10.
         backoff_base float: Base for exponential backoff. Defaults to 2.
         warn_user bool: Whether to warn the user. Defaults to True.
+        max_backoff float: Maximum seconds to wait between attempts. Defaults to 60.
+        deadline float: Seconds after which no more retries are made. Defaults to 600.
     """
     error_messages = {
         ServiceUnavailableError: f"{Fore.RED}Error: The OpenAI API engine is currently overloaded{Fore.RESET}",
@@ -177,9 +200,16 @@ def retry_api(
         def _wrapped(*args, **kwargs):
             user_warned = not warn_user
             max_attempts = max_retries + 1  # +1 for the first attempt
+            rate_limiter = get_rate_limiter()
+            estimated_tokens = estimate_request_tokens(args, kwargs)
+            started_at = time.monotonic()
             for attempt in range(1, max_attempts + 1):
+                retry_after = None
                 try:
-                    return func(*args, **kwargs)
+                    with rate_limiter.request(estimated_tokens):
+                        result = func(*args, **kwargs)
+                    rate_limiter.on_success()
+                    return result
 
                 except (RateLimitError, ServiceUnavailableError) as e:
                     if attempt >= max_attempts or (
@@ -190,6 +220,8 @@ def retry_api(
                     ):
                         raise
 
+                    last_error = e
+                    retry_after = rate_limiter.on_rate_limited(e.headers)
                     error_msg = error_messages[type(e)]
                     logger.warn(error_msg)
                     if not user_warned:
@@ -202,9 +234,17 @@ def retry_api(
                 except (APIError, Timeout) as e:
                     if (e.http_status not in [429, 502]) or (attempt == max_attempts):
                         raise
-
-                backoff = backoff_base ** (attempt + 2)
-                logger.warn(backoff_msg.format(backoff=backoff))
+                    last_error = e
+                    retry_after = rate_limiter.on_rate_limited(e.headers)
+
+                get_usage_meter().record_retry(kwargs.get("model", "unknown"))
+                backoff = full_jitter_backoff(attempt, backoff_base, max_backoff)
+                if retry_after:
+                    backoff = max(backoff, retry_after)
+                if time.monotonic() - started_at + backoff > deadline:
+                    logger.warn(f"Giving up after {time.monotonic() - started_at:.0f}s")
+                    raise last_error
+                logger.warn(backoff_msg.format(backoff=f"{backoff:.1f}"))
                 time.sleep(backoff)
 
         return _wrapped
@@ -237,6 +277,78 @@ def create_chat_completion(
     return completion
 
 
+@retry_api()
+def create_chat_completion_stream(
+    messages: List[MessageDict],
+    *_,
+    **kwargs,
+) -> Iterator[str]:
+    """Create a streamed chat completion using the OpenAI API
+
+    The request is sent (and retried, if necessary) right away; the returned
+    iterator yields the content deltas as they arrive. Closing the iterator closes
+    the connection, which stops the generation of further tokens.
+
+    Args:
+        messages: A list of messages to feed to the chatbot.
+        kwargs: Other arguments to pass to the OpenAI API chat completion call.
+    Returns:
+        Iterator[str]: The content deltas of the response
+    """
+    chunks = openai.ChatCompletion.create(
+        messages=messages,
+        stream=True,
+        **kwargs,
+    )
+
+    def iter_content() -> Iterator[str]:
+        try:
+            for chunk in chunks:
+                if not chunk.choices:
+                    continue
+                if delta := chunk.choices[0].delta.get("content"):
+                    yield delta
+        finally:
+            if hasattr(chunks, "close"):
+                chunks.close()
+
+    return iter_content()
+
+
+def create_cancellable_chat_completion(
+    messages: List[MessageDict],
+    cancelled: threading.Event,
+    *_,
+    **kwargs,
+) -> str:
+    """Create a chat completion that can be cancelled while it is being generated
+
+    The completion is streamed, so closing the connection when `cancelled` is set
+    stops the generation of further tokens.
+
+    Args:
+        messages: A list of messages to feed to the chatbot.
+        cancelled: When set, the completion is abandoned.
+        kwargs: Other arguments to pass to the OpenAI API chat completion call.
+    Returns:
+        str: The content of the response
+    Raises:
+        HedgeCancelled: If `cancelled` was set before the response was complete
+    """
+    deltas = create_chat_completion_stream(messages, **kwargs)
+    content = []
+    try:
+        for delta in deltas:
+            if cancelled.is_set():
+                raise HedgeCancelled()
+            content.append(delta)
+    finally:
+        deltas.close()
+    if cancelled.is_set():
+        raise HedgeCancelled()
+    return "".join(content)
+
+
 @meter_api
 @retry_api()
 def create_text_completion(
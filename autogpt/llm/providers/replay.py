@@ -0,0 +1,409 @@
+"""Offline record/replay of LLM calls.
+
+In record mode every chat completion and `ask_llm` call is appended to a cassette
+(a JSONL file) under a fingerprint of its normalized prompt. In replay mode the
+recorded responses are served instead of calling the API, so a whole agent run can
+be re-executed deterministically without an API key.
+
+Cassettes can also be built from the logs of earlier runs, see `import_run_logs`.
+"""
+from __future__ import annotations
+
+import argparse
+import atexit
+import difflib
+import hashlib
+import json
+import re
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Literal, Optional, Sequence
+
+from autogpt.logs import logger
+from autogpt.logs.parsable_log import ATTEMPTS_KEY, load_parsable_log
+from autogpt.logs.prompt_archive import PromptArchive
+
+ReplayMode = Literal["off", "record", "replay"]
+CallKind = Literal["chat", "ask_llm"]
+
+_VOLATILE_PATTERNS = [
+    # ISO timestamps
+    (re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:\.\d+)?"), "<TIME>"),
+    # Unix timestamps
+    (re.compile(r"\b1\d{9}(?:\.\d+)?\b"), "<TS>"),
+    # Container IDs, hashes
+    (re.compile(r"\b[0-9a-f]{12,64}\b"), "<HEX>"),
+]
+_WHITESPACE = re.compile(r"[ \t]+")
+_BLANK_LINES = re.compile(r"\n\s*\n+")
+
+_DUMP_HEADER = re.compile(r"^=+ \w+ =+$")
+_DUMP_SEPARATOR = re.compile(r"^-+ (SYSTEM|USER|ASSISTANT|FUNCTION) -+$")
+
+
+class ReplayMissError(RuntimeError):
+    """Raised in replay mode when no recorded response matches a request."""
+
+
+def normalize_prompt(messages: Sequence[dict]) -> str:
+    """Renders messages as text with run-specific details masked out"""
+    parts = []
+    for message in messages:
+        content = message.get("content") or ""
+        for pattern, placeholder in _VOLATILE_PATTERNS:
+            content = pattern.sub(placeholder, content)
+        content = _WHITESPACE.sub(" ", content)
+        content = _BLANK_LINES.sub("\n", content).strip()
+        parts.append(f"[{message['role']}]\n{content}")
+    return "\n".join(parts)
+
+
+def fingerprint(kind: str, normalized_prompt: str) -> str:
+    return hashlib.sha256(f"{kind}\n{normalized_prompt}".encode()).hexdigest()
+
+
+@dataclass
+class ReplayRecord:
+    """A recorded LLM call.
+
+    Attributes:
+        kind: `chat` for chat completions, `ask_llm` for helper LLM calls
+        prompt: the normalized prompt; `None` if only the call order is known
+        content: the content of the response
+        function_call: the function call of the response, if any
+    """
+
+    kind: str
+    prompt: Optional[str]
+    content: Optional[str]
+    function_call: Optional[dict] = None
+    model: str = ""
+    fingerprint: Optional[str] = None
+
+    def __post_init__(self):
+        if self.fingerprint is None and self.prompt is not None:
+            self.fingerprint = fingerprint(self.kind, self.prompt)
+
+
+@dataclass
+class ReplayDivergence:
+    """A request that was not served by an exactly matching record"""
+
+    call_index: int
+    kind: str
+    resolution: Literal["fuzzy", "call order", "miss"]
+    similarity: Optional[float] = None
+    line_number: Optional[int] = None
+    recorded_line: Optional[str] = None
+    actual_line: Optional[str] = None
+
+    def __str__(self) -> str:
+        text = f"call #{self.call_index} ({self.kind}) served by {self.resolution}"
+        if self.similarity is not None:
+            text += f" (similarity {self.similarity:.3f})"
+        if self.line_number is not None:
+            text += (
+                f", first difference at line {self.line_number}:\n"
+                f"  recorded: {self.recorded_line!r}\n"
+                f"  actual:   {self.actual_line!r}"
+            )
+        return text
+
+
+def _first_difference(a: list[str], b: list[str]) -> tuple[int, str | None, str | None]:
+    for i, (line_a, line_b) in enumerate(zip(a, b)):
+        if line_a != line_b:
+            return i + 1, line_a, line_b
+    i = min(len(a), len(b))
+    return (
+        i + 1,
+        a[i] if i < len(a) else None,
+        b[i] if i < len(b) else None,
+    )
+
+
+class LLMReplay:
+    """Records LLM calls to, or serves them from, a cassette file.
+
+    Params:
+        mode: `off`, `record` or `replay`.
+        cassette: Path of the JSONL cassette.
+        match: `exact` to only serve responses to identical (normalized) prompts;
+            `fuzzy` to fall back to the most similar recorded prompt.
+        fuzzy_threshold: Minimum line-wise similarity for a fuzzy match.
+    """
+
+    def __init__(
+        self,
+        mode: ReplayMode = "off",
+        cassette: Optional[str | Path] = None,
+        match: Literal["exact", "fuzzy"] = "exact",
+        fuzzy_threshold: float = 0.8,
+    ):
+        if mode != "off" and not cassette:
+            raise ValueError(f"A cassette file is required for LLM {mode} mode")
+        self.mode = mode
+        self.cassette = Path(cassette) if cassette else None
+        self.match = match
+        self.fuzzy_threshold = fuzzy_threshold
+        self.records: list[ReplayRecord] = []
+        self.divergences: list[ReplayDivergence] = []
+        self.call_count = 0
+        self._consumed: set[int] = set()
+        self._by_fingerprint: dict[str, list[int]] = {}
+
+        if mode == "replay":
+            self.records = load_cassette(self.cassette)
+            for i, record in enumerate(self.records):
+                if record.fingerprint:
+                    self._by_fingerprint.setdefault(record.fingerprint, []).append(i)
+            logger.info(f"Replaying {len(self.records)} LLM calls from {cassette}")
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def record(
+        self,
+        kind: CallKind,
+        messages: Sequence[dict],
+        content: Optional[str],
+        function_call: Optional[dict] = None,
+        model: str = "",
+    ) -> None:
+        record = ReplayRecord(
+            kind, normalize_prompt(messages), content, function_call, model
+        )
+        self.records.append(record)
+        self.cassette.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.cassette, "a") as f:
+            f.write(json.dumps(asdict(record)) + "\n")
+
+    def lookup(self, kind: CallKind, messages: Sequence[dict]) -> ReplayRecord:
+        """Finds the recorded response to serve for a request.
+
+        Raises:
+            ReplayMissError: if no record matches the request
+        """
+        self.call_count += 1
+        prompt = normalize_prompt(messages)
+
+        candidates = self._by_fingerprint.get(fingerprint(kind, prompt), [])
+        if candidates:
+            unused = [i for i in candidates if i not in self._consumed]
+            # Identical prompts get the recorded responses in order
+            return self._serve(unused[0] if unused else candidates[-1])
+
+        index, similarity = None, None
+        if self.match == "fuzzy":
+            index, similarity = self._closest_record(kind, prompt)
+        if index is None:
+            index = self._next_unkeyed_record(kind)
+
+        divergence = ReplayDivergence(
+            self.call_count,
+            kind,
+            "fuzzy" if similarity else "call order" if index is not None else "miss",
+            similarity,
+        )
+        if index is not None and (recorded := self.records[index].prompt):
+            (
+                divergence.line_number,
+                divergence.recorded_line,
+                divergence.actual_line,
+            ) = _first_difference(recorded.splitlines(), prompt.splitlines())
+        self.divergences.append(divergence)
+        logger.warn(f"LLM replay diverged: {divergence}")
+
+        if index is None:
+            raise ReplayMissError(
+                f"No recorded response for LLM call #{self.call_count} ({kind})"
+            )
+        return self._serve(index)
+
+    def _serve(self, index: int) -> ReplayRecord:
+        self._consumed.add(index)
+        return self.records[index]
+
+    def _closest_record(
+        self, kind: str, prompt: str
+    ) -> tuple[Optional[int], Optional[float]]:
+        lines = prompt.splitlines()
+        matcher = difflib.SequenceMatcher(autojunk=False)
+        matcher.set_seq2(lines)
+        best, best_ratio = None, self.fuzzy_threshold
+        for i, record in enumerate(self.records):
+            if i in self._consumed or record.kind != kind or record.prompt is None:
+                continue
+            matcher.set_seq1(record.prompt.splitlines())
+            if matcher.real_quick_ratio() < best_ratio:
+                continue
+            if matcher.quick_ratio() < best_ratio:
+                continue
+            ratio = matcher.ratio()
+            # Prefer the earliest record among equally similar ones
+            if ratio > best_ratio or (best is None and ratio == best_ratio):
+                best, best_ratio = i, ratio
+        return best, (best_ratio if best is not None else None)
+
+    def _next_unkeyed_record(self, kind: str) -> Optional[int]:
+        """Records imported without a prompt are served in call order"""
+        for i, record in enumerate(self.records):
+            if i not in self._consumed and record.kind == kind and not record.prompt:
+                return i
+        return None
+
+    def write_report(self, path: Optional[str | Path] = None) -> Optional[Path]:
+        """Writes the divergences of this replay next to the cassette"""
+        if not self.divergences:
+            return None
+        path = Path(path or f"{self.cassette}.divergences.json")
+        with open(path, "w") as f:
+            json.dump(
+                {
+                    "cassette": str(self.cassette),
+                    "calls": self.call_count,
+                    "divergences": [asdict(d) for d in self.divergences],
+                },
+                f,
+                indent=2,
+            )
+        return path
+
+
+def load_cassette(path: str | Path) -> list[ReplayRecord]:
+    with open(path) as f:
+        return [ReplayRecord(**json.loads(line)) for line in f if line.strip()]
+
+
+def parse_prompt_dump(dump: str) -> list[dict]:
+    """Parses the output of `ChatSequence.dump()` back into messages"""
+    messages: list[dict] = []
+    # Skip the header and the length line
+    for line in dump.strip().splitlines()[2:]:
+        if line == "=" * 42:
+            break
+        if separator := _DUMP_SEPARATOR.match(line):
+            messages.append({"role": separator.group(1).lower(), "content": ""})
+        elif messages:
+            messages[-1]["content"] += line + "\n"
+    return messages
+
+
+def split_prompt_history(text: str) -> list[str]:
+    """Splits a `prompt_history_*` log into the dumps of the individual prompts"""
+    dumps: list[list[str]] = []
+    for line in text.splitlines():
+        if _DUMP_HEADER.match(line):
+            dumps.append([])
+        if dumps:
+            dumps[-1].append(line)
+    return ["\n".join(lines) for lines in dumps]
+
+
+def import_run_logs(
+    parsable_log: str | Path,
+    prompt_history: Optional[str | Path] = None,
+    cycles_list: Optional[str | Path] = None,
+    prompt_archive: Optional[str | Path] = None,
+) -> list[ReplayRecord]:
+    """Builds replay records from the logs of an earlier run.
+
+    The commands in `parsable_logs/*.jsonl` (or `*.json`) are recorded as responses to the
+    prompts of their cycles. Summaries are keyed to their prompts if the run's
+    `prompt_archive_*` directory (or, for earlier runs, its `prompt_history_*` and
+    `cycles_list_*` logs) is given, and are otherwise served in order. Responses
+    are reconstructed from the logged commands, so the thoughts of the original
+    responses are lost.
+    """
+    attempts = load_parsable_log(parsable_log)[ATTEMPTS_KEY]
+
+    cmd_prompts: list[Optional[str]] = [a.get("prompt_content") for a in attempts]
+    summary_prompts: list[Optional[str]] = []
+    if prompt_archive:
+        archived = list(PromptArchive(prompt_archive).prompts())
+        cycle_types = [t for t, _ in archived]
+        dumps = [d for _, d in archived]
+    elif prompt_history and cycles_list:
+        dumps = split_prompt_history(Path(prompt_history).read_text())
+        cycle_types = Path(cycles_list).read_text().split()
+    if prompt_archive or (prompt_history and cycles_list):
+        cmd_prompts = [d for d, t in zip(dumps, cycle_types) if t == "CMD"]
+        summary_prompts = [d for d, t in zip(dumps, cycle_types) if t == "SUMMARY"]
+
+    def normalized(dumps: list[Optional[str]], i: int) -> Optional[str]:
+        if i < len(dumps) and dumps[i]:
+            return normalize_prompt(parse_prompt_dump(dumps[i]))
+        return None
+
+    records = []
+    summaries = 0
+    for i, attempt in enumerate(attempts):
+        response = {
+            "thoughts": "",
+            "command": {
+                "name": attempt["command_name"],
+                "args": attempt["command_args"] or {},
+            },
+        }
+        records.append(
+            ReplayRecord("chat", normalized(cmd_prompts, i), json.dumps(response))
+        )
+        if "result_summary" in attempt:
+            records.append(
+                ReplayRecord(
+                    "chat",
+                    normalized(summary_prompts, summaries),
+                    json.dumps(attempt["result_summary"]),
+                )
+            )
+            summaries += 1
+    return records
+
+
+_replay = LLMReplay()
+
+
+def get_replay() -> LLMReplay:
+    return _replay
+
+
+def configure_replay(
+    mode: ReplayMode = "off",
+    cassette: Optional[str | Path] = None,
+    match: Literal["exact", "fuzzy"] = "exact",
+) -> LLMReplay:
+    """Replaces the process-wide LLM replay; divergences are reported at exit"""
+    global _replay
+    _replay = LLMReplay(mode, cassette, match)
+    if _replay.replaying:
+        atexit.register(_replay.write_report)
+    return _replay
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Build an LLM replay cassette from the logs of an earlier run"
+    )
+    parser.add_argument("parsable_log", help="parsable_logs/<project><ts>.jsonl")
+    parser.add_argument("cassette", help="Output JSONL cassette")
+    parser.add_argument("--prompt-history", help="The run's prompt_history_* log")
+    parser.add_argument("--cycles-list", help="The run's cycles_list_* log")
+    parser.add_argument("--prompt-archive", help="The run's prompt_archive_* directory")
+    args = parser.parse_args(argv)
+
+    records = import_run_logs(
+        args.parsable_log, args.prompt_history, args.cycles_list, args.prompt_archive
+    )
+    with open(args.cassette, "w") as f:
+        for record in records:
+            f.write(json.dumps(asdict(record)) + "\n")
+    print(f"Wrote {len(records)} records to {args.cassette}")
+
+
+if __name__ == "__main__":
+    main()
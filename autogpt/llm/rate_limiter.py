@@ -0,0 +1,318 @@
+"""Client-side rate limiting and concurrency control for LLM API requests."""
+from __future__ import annotations
+
+import contextlib
+import fcntl
+import json
+import os
+import random
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterator, Mapping, Optional, Sequence
+
+from autogpt.logs import logger
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_reset_duration(value: str | None) -> Optional[float]:
+    """Parses a rate limit reset duration like `6m0s` or `120ms` into seconds"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def full_jitter_backoff(attempt: int, base: float = 2.0, cap: float = 60.0) -> float:
+    """Returns a random backoff in [0, min(cap, base * 2**attempt)] seconds.
+
+    Full jitter spreads out the retries of clients that were throttled at the same
+    moment, instead of having them retry in lockstep.
+    """
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+def estimate_request_tokens(args: Sequence, kwargs: Mapping) -> int:
+    """Cheaply estimates the tokens a request will use, for rate limiting purposes.
+
+    Args:
+        args: The positional arguments of the request (prompt, messages or input)
+        kwargs: The keyword arguments of the request
+    """
+    chars = 0
+    for value in [*args, *(kwargs.get(k) for k in ("messages", "prompt", "input"))]:
+        if isinstance(value, str):
+            chars += len(value)
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, dict):
+                    chars += len(item.get("content") or "")
+                elif isinstance(item, str):
+                    chars += len(item)
+    return chars // 4 + (kwargs.get("max_tokens") or 0)
+
+
+class TokenBucket:
+    """A token bucket that refills continuously up to its capacity.
+
+    Reservations are always granted but may drive the level below zero; the caller
+    then has to wait until the bucket has refilled, which keeps waiting callers in
+    first-come-first-served order.
+    """
+
+    def __init__(
+        self,
+        capacity: float,
+        refill_rate: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.clock = clock
+        self._level = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, level: float, updated: float, now: float) -> float:
+        return min(self.capacity, level + (now - updated) * self.refill_rate)
+
+    def reserve(self, amount: float) -> float:
+        """Takes `amount` from the bucket.
+
+        Returns:
+            The number of seconds to wait before the reservation is covered
+        """
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = self.clock()
+            self._level = self._refill(self._level, self._updated, now) - amount
+            self._updated = now
+            return max(0.0, -self._level / self.refill_rate)
+
+    def sync(self, remaining: float) -> None:
+        """Adopts the remaining budget reported by the server, if it is lower"""
+        with self._lock:
+            now = self.clock()
+            level = self._refill(self._level, self._updated, now)
+            self._level = min(level, remaining)
+            self._updated = now
+
+
+class SharedTokenBucket(TokenBucket):
+    """A token bucket whose state lives in a file, shared by processes on one host.
+
+    Each operation holds an exclusive `flock` on the state file for the duration of a
+    read-modify-write, so several agent processes draw from one budget.
+    """
+
+    def __init__(
+        self,
+        state_file: str | Path,
+        name: str,
+        capacity: float,
+        refill_rate: float,
+    ):
+        super().__init__(capacity, refill_rate, clock=time.time)
+        self.state_file = Path(state_file)
+        self.name = name
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+
+    @contextlib.contextmanager
+    def _locked_state(self) -> Iterator[dict]:
+        with self._lock, open(self.state_file, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                try:
+                    state = json.loads(f.read() or "{}")
+                except json.JSONDecodeError:
+                    state = {}
+                yield state
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(state))
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def reserve(self, amount: float) -> float:
+        amount = min(amount, self.capacity)
+        with self._locked_state() as state:
+            now = self.clock()
+            entry = state.get(self.name, {"level": self.capacity, "updated": now})
+            level = self._refill(entry["level"], entry["updated"], now) - amount
+            state[self.name] = {"level": level, "updated": now}
+            return max(0.0, -level / self.refill_rate)
+
+    def sync(self, remaining: float) -> None:
+        with self._locked_state() as state:
+            now = self.clock()
+            entry = state.get(self.name, {"level": self.capacity, "updated": now})
+            level = self._refill(entry["level"], entry["updated"], now)
+            state[self.name] = {"level": min(level, remaining), "updated": now}
+
+
+class AdaptiveConcurrencyLimiter:
+    """Limits the number of requests in flight, adapting the limit with AIMD.
+
+    Every successful request raises the limit additively (by about 1 per window of
+    `limit` requests); every rate limit or overload error halves it.
+    """
+
+    def __init__(
+        self,
+        initial_limit: float = 4,
+        min_limit: float = 1,
+        max_limit: float = 16,
+        decrease_factor: float = 0.5,
+    ):
+        self.limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+    def on_success(self) -> None:
+        with self._condition:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._condition.notify()
+
+    def on_overload(self) -> None:
+        with self._condition:
+            self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+
+
+class RateLimiter:
+    """Shared request-per-minute, token-per-minute and concurrency limits.
+
+    Limits that are not configured are learned from the `x-ratelimit-*` response
+    headers, if the API sends them.
+
+    Params:
+        requests_per_minute: Request budget; `None` to learn it from the API.
+        tokens_per_minute: Token budget; `None` to learn it from the API.
+        max_concurrency: Upper bound for the adaptive concurrency limit.
+        state_file: If given, the budgets are shared through this file with other
+            processes using the same file.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        max_concurrency: int = 16,
+        state_file: Optional[str | Path] = None,
+    ):
+        self.state_file = state_file
+        self.buckets: dict[str, Optional[TokenBucket]] = {
+            "requests": self._make_bucket("requests", requests_per_minute),
+            "tokens": self._make_bucket("tokens", tokens_per_minute),
+        }
+        self.concurrency = AdaptiveConcurrencyLimiter(
+            initial_limit=min(4, max_concurrency), max_limit=max_concurrency
+        )
+
+    def _make_bucket(self, name: str, per_minute: Optional[float]) -> TokenBucket | None:
+        if not per_minute:
+            return None
+        if self.state_file:
+            return SharedTokenBucket(self.state_file, name, per_minute, per_minute / 60)
+        return TokenBucket(per_minute, per_minute / 60)
+
+    @contextlib.contextmanager
+    def request(self, estimated_tokens: int = 0) -> Iterator[None]:
+        """Holds a concurrency slot and waits for budget before a request is sent"""
+        self.concurrency.acquire()
+        try:
+            wait = 0.0
+            if bucket := self.buckets["requests"]:
+                wait = max(wait, bucket.reserve(1))
+            if (bucket := self.buckets["tokens"]) and estimated_tokens:
+                wait = max(wait, bucket.reserve(estimated_tokens))
+            if wait > 0:
+                logger.debug(f"Rate limiter: waiting {wait:.2f}s for API budget")
+                time.sleep(wait)
+            yield
+        finally:
+            self.concurrency.release()
+
+    def on_success(self) -> None:
+        self.concurrency.on_success()
+
+    def on_rate_limited(self, headers: Optional[Mapping] = None) -> Optional[float]:
+        """Registers a throttled request.
+
+        Returns:
+            The number of seconds the API asked us to wait, if it said so
+        """
+        self.concurrency.on_overload()
+        if not headers:
+            return None
+        self.update_from_headers(headers)
+        return parse_reset_duration(headers.get("retry-after"))
+
+    def update_from_headers(self, headers: Mapping) -> None:
+        """Synchronizes the budgets with the `x-ratelimit-*` headers of a response"""
+        headers = {k.lower(): v for k, v in headers.items()}
+        for name in self.buckets:
+            remaining = headers.get(f"x-ratelimit-remaining-{name}")
+            if remaining is None:
+                continue
+            try:
+                remaining = float(remaining)
+            except ValueError:
+                continue
+
+            if self.buckets[name] is None:
+                try:
+                    limit = float(headers[f"x-ratelimit-limit-{name}"])
+                except (KeyError, ValueError):
+                    continue
+                self.buckets[name] = self._make_bucket(name, limit)
+                logger.debug(f"Rate limiter: learned limit of {limit:.0f} {name}/min")
+
+            self.buckets[name].sync(remaining)
+
+
+_rate_limiter = RateLimiter()
+
+
+def get_rate_limiter() -> RateLimiter:
+    return _rate_limiter
+
+
+def configure_rate_limiter(
+    requests_per_minute: Optional[int] = None,
+    tokens_per_minute: Optional[int] = None,
+    max_concurrency: int = 16,
+    state_file: Optional[str | Path] = None,
+) -> RateLimiter:
+    """Replaces the process-wide rate limiter used for all LLM requests"""
+    global _rate_limiter
+    if state_file:
+        state_file = os.path.abspath(state_file)
+    _rate_limiter = RateLimiter(
+        requests_per_minute, tokens_per_minute, max_concurrency, state_file
+    )
+    return _rate_limiter
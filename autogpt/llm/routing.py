@@ -0,0 +1,156 @@
+"""Routing of LLM calls to model tiers per call site, with escalation."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, Literal, Optional, TypeVar
+
+from autogpt.llm.metering import get_usage_meter, using_call_site
+from autogpt.logs import logger
+
+T = TypeVar("T")
+
+ModelTier = Literal["default", "fast", "smart"]
+EscalationReason = Literal["parse_error", "repetition"]
+
+TIER_ORDER: list[ModelTier] = ["fast", "smart"]
+
+
+@dataclass
+class Route:
+    """Which tier serves a call site first, and when to retry on a stronger tier.
+
+    The `default` tier is the model the call site uses on its own, e.g. the agent's
+    LLM for cycle planning. It does not escalate.
+    """
+
+    tier: ModelTier
+    escalate_on: frozenset[EscalationReason] = frozenset()
+
+
+# Every call site keeps its own model unless LLM_ROUTES moves it to a tier; the
+# escalation rules apply once it does
+DEFAULT_ROUTES: dict[str, Route] = {
+    "cycle_planning": Route("default", frozenset({"parse_error", "repetition"})),
+    "summary": Route("default", frozenset({"parse_error"})),
+}
+DEFAULT_ROUTE = Route("default")
+
+
+class ModelRouter:
+    """Picks the model for each LLM call site.
+
+    Calls, latencies, costs and escalations per call site are collected by the
+    usage meter (see `autogpt.llm.metering`).
+
+    Params:
+        models: The model to use for each tier.
+        routes: The route of each call site; unlisted sites use their own model.
+    """
+
+    def __init__(
+        self,
+        models: dict[ModelTier, str],
+        routes: Optional[dict[str, Route]] = None,
+    ):
+        self.models = models
+        self.routes = {**DEFAULT_ROUTES, **(routes or {})}
+
+    def route(self, call_site: str) -> Route:
+        return self.routes.get(call_site, DEFAULT_ROUTE)
+
+    def model_for(
+        self,
+        call_site: str,
+        default: str,
+        tier: Optional[ModelTier] = None,
+    ) -> str:
+        """The model for a call site whose own model is `default`"""
+        tier = tier or self.route(call_site).tier
+        return default if tier == "default" else self.models[tier]
+
+    def escalate(
+        self, call_site: str, reason: EscalationReason, default: str
+    ) -> Optional[str]:
+        """Records that the answer of a call site was unusable.
+
+        Returns:
+            The model to retry with, or `None` if the route does not escalate for
+            this reason or is already on the strongest tier
+        """
+        route = self.route(call_site)
+        next_tier = _next_tier(route.tier)
+        if reason not in route.escalate_on or next_tier is None:
+            return None
+        get_usage_meter().record_escalation(
+            self.model_for(call_site, default), reason, call_site
+        )
+        logger.debug(f"Escalating {call_site} to the {next_tier} tier: {reason}")
+        return self.models[next_tier]
+
+    def call(
+        self,
+        call_site: str,
+        query: Callable[[str], T],
+        default: str,
+        validate: Optional[Callable[[T], Optional[EscalationReason]]] = None,
+    ) -> T:
+        """Calls `query` with the routed model, escalating while `validate` fails.
+
+        Args:
+            call_site: The name of the call site
+            query: Makes the LLM call with the given model
+            default: The model the call site uses on its own
+            validate: Returns the reason why a result is unusable, or `None`
+
+        Returns:
+            The result of the last call
+        """
+        model = self.model_for(call_site, default)
+        while True:
+            with using_call_site(call_site):
+                result = query(model)
+
+            reason = validate(result) if validate else None
+            if reason is None:
+                return result
+            escalated = self.escalate(call_site, reason, default)
+            if escalated is None or escalated == model:
+                return result
+            model = escalated
+
+
+def _next_tier(tier: ModelTier) -> Optional[ModelTier]:
+    if tier not in TIER_ORDER:
+        return None
+    index = TIER_ORDER.index(tier)
+    return TIER_ORDER[index + 1] if index + 1 < len(TIER_ORDER) else None
+
+
+def parse_routes(specs: list[str]) -> dict[str, Route]:
+    """Parses route overrides like `summary=fast` or `doc_analysis=smart`"""
+    routes = {}
+    for spec in specs:
+        call_site, _, tier = spec.partition("=")
+        call_site, tier = call_site.strip(), tier.strip()
+        if tier != "default" and tier not in TIER_ORDER:
+            raise ValueError(f"Unknown model tier '{tier}' in route '{spec}'")
+        default = DEFAULT_ROUTES.get(call_site, DEFAULT_ROUTE)
+        routes[call_site] = Route(tier, default.escalate_on)
+    return routes
+
+
+_router = ModelRouter({"fast": "gpt-4.1-mini", "smart": "gpt-4.1-mini"})
+
+
+def get_router() -> ModelRouter:
+    return _router
+
+
+def configure_router(
+    fast_model: str, smart_model: str, routes: Optional[dict[str, Route]] = None
+) -> ModelRouter:
+    """Replaces the process-wide router"""
+    global _router
+    _router = ModelRouter({"fast": fast_model, "smart": smart_model}, routes)
+    return _router
+
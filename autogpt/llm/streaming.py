@@ -0,0 +1,128 @@
+"""Incremental consumption of streamed chat completions."""
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Container, Optional
+
+from autogpt.json_utils.incremental import (
+    IncrementalJSONParser,
+    JSONStreamEvent,
+    MalformedJSONError,
+)
+
+COMMAND_NAME_PATH = ("command", "name")
+COMMAND_PATH = ("command",)
+
+
+class StreamAborted(Exception):
+    """Raised by `ChatStreamMonitor.feed` when the rest of a stream is not needed."""
+
+
+@dataclass
+class StreamStats:
+    """Timings of a single streamed completion, in seconds since the request."""
+
+    time_to_first_token: Optional[float] = None
+    time_to_command_ready: Optional[float] = None
+    total_time: Optional[float] = None
+    aborted: Optional[str] = None
+    unparsed: Optional[str] = None
+
+    def __str__(self) -> str:
+        def fmt(t: Optional[float]) -> str:
+            return f"{t:.2f}s" if t is not None else "n/a"
+
+        text = (
+            f"time to first token: {fmt(self.time_to_first_token)}; "
+            f"time to command-ready: {fmt(self.time_to_command_ready)}; "
+            f"total: {fmt(self.total_time)}"
+        )
+        if self.aborted:
+            text += f"; aborted: {self.aborted}"
+        if self.unparsed:
+            text += f"; not parsed incrementally: {self.unparsed}"
+        return text
+
+
+class ChatStreamMonitor:
+    """Watches the content of a streamed chat completion as it arrives.
+
+    The content is parsed incrementally, so the command of an agent response is
+    known before the rest of the response has been generated: `on_command_ready`
+    is called with it as soon as its arguments are complete. The stream is aborted
+    as soon as the response names a command that does not exist.
+
+    A response the incremental parser rejects (e.g. one with single-quoted keys)
+    may still be repaired once it is complete, so it is received in full and only
+    no longer checked.
+
+    Params:
+        known_commands: Command names to validate `command.name` against;
+            `None` to skip validation (e.g. for responses without a command).
+        on_command_ready: Called with the name and arguments of the command once
+            they have been received.
+    """
+
+    def __init__(
+        self,
+        known_commands: Optional[Container[str]] = None,
+        on_command_ready: Optional[Callable[[str, dict[str, Any]], None]] = None,
+    ):
+        self.known_commands = known_commands
+        self.on_command_ready = on_command_ready
+        self.parser: Optional[IncrementalJSONParser] = IncrementalJSONParser()
+        self.chunks: list[str] = []
+        self.stats = StreamStats()
+        self._started_at = time.perf_counter()
+
+    @property
+    def content(self) -> str:
+        return "".join(self.chunks)
+
+    def start(self) -> None:
+        """Resets the clock; call right before sending the request."""
+        self._started_at = time.perf_counter()
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._started_at
+
+    def feed(self, delta: str) -> None:
+        """Processes the next content delta of the stream.
+
+        Raises:
+            StreamAborted: if the rest of the stream should not be consumed.
+        """
+        if not delta:
+            return
+        if self.stats.time_to_first_token is None:
+            self.stats.time_to_first_token = self.elapsed()
+        self.chunks.append(delta)
+        if self.parser is None:
+            return
+
+        try:
+            events = self.parser.feed(delta)
+        except MalformedJSONError as e:
+            self.stats.unparsed = str(e)
+            self.parser = None
+            return
+
+        for event in events:
+            self._handle_event(event)
+
+    def finish(self) -> StreamStats:
+        self.stats.total_time = self.elapsed()
+        return self.stats
+
+    def _handle_event(self, event: JSONStreamEvent) -> None:
+        if event.path == COMMAND_NAME_PATH and self.known_commands is not None:
+            if event.value not in self.known_commands:
+                self.stats.aborted = f"unknown command '{event.value}'"
+                raise StreamAborted(self.stats.aborted)
+
+        elif event.path == COMMAND_PATH and isinstance(event.value, dict):
+            self.stats.time_to_command_ready = self.elapsed()
+            name, args = event.value.get("name"), event.value.get("args") or {}
+            if self.on_command_ready and isinstance(name, str) and isinstance(args, dict):
+                self.on_command_ready(name, args)
@@ -0,0 +1,93 @@
+"""Token accounting with cached encoders and memoized token counts.
+
+Loading a tiktoken encoder and encoding text are the expensive parts of counting
+tokens, so encoders are loaded once per model and the counts of texts and
+messages are memoized. Counting the tokens of a growing chat history then only
+costs as much as encoding the content that was added since the last count.
+"""
+from __future__ import annotations
+
+import functools
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterable
+
+import tiktoken
+
+from autogpt.logs import logger
+
+if TYPE_CHECKING:
+    from autogpt.llm.base import Message
+
+REPLY_PRIMING_TOKENS = 3
+"""Every reply is primed with <|start|>assistant<|message|>"""
+
+
+@dataclass(frozen=True)
+class MessageFormat:
+    """How a model wraps chat messages in tokens"""
+
+    encoding_model: str
+    tokens_per_message: int
+    tokens_per_name: int
+
+
+@functools.lru_cache(maxsize=None)
+def message_format(model: str) -> MessageFormat:
+    if model.startswith("gpt-3.5-turbo"):
+        # every message follows <|start|>{role/name}\n{content}<|end|>\n;
+        # if there's a name, the role is omitted
+        return MessageFormat("gpt-3.5-turbo", 4, -1)
+    elif model.startswith("gpt-4"):
+        return MessageFormat("gpt-4", 3, 1)
+    raise NotImplementedError(
+        f"count_message_tokens() is not implemented for model {model}.\n"
+        " See https://github.com/openai/openai-python/blob/main/chatml.md for"
+        " information on how messages are converted to tokens."
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_encoding(model: str) -> tiktoken.Encoding:
+    """Returns the (cached) encoder of a model"""
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        logger.warn("Warning: model not found. Using cl100k_base encoding.")
+        return tiktoken.get_encoding("cl100k_base")
+
+
+@functools.lru_cache(maxsize=4096)
+def _count_tokens(encoding_model: str, text: str) -> int:
+    # Python caches the hash of a str, so looking up a text that was counted
+    # before does not even rehash it.
+    return len(get_encoding(encoding_model).encode(text))
+
+
+def count_text_tokens(text: str, encoding_model: str = "gpt-4") -> int:
+    """Returns the number of tokens in a text, memoized by content"""
+    return _count_tokens(encoding_model, text)
+
+
+def message_tokens(message: Message, model: str) -> int:
+    """Returns the number of tokens a message takes up in a prompt.
+
+    Messages are immutable, so the count is memoized on the message per encoding.
+    """
+    format = message_format(model)
+    cached = message._token_count
+    if cached is not None and cached[0] == format.encoding_model:
+        return cached[1]
+
+    tokens = format.tokens_per_message
+    for key, value in message.raw().items():
+        tokens += count_text_tokens(value, format.encoding_model)
+        if key == "name":
+            tokens += format.tokens_per_name
+    # Messages are frozen; the memo is not part of their value
+    object.__setattr__(message, "_token_count", (format.encoding_model, tokens))
+    return tokens
+
+
+def count_messages_tokens(messages: Iterable[Message], model: str) -> int:
+    """Returns the number of tokens a list of messages takes up in a prompt"""
+    return REPLY_PRIMING_TOKENS + sum(message_tokens(m, model) for m in messages)
@@ -1,10 +1,15 @@
 from __future__ import annotations
 
+import contextlib
+import threading
+import time
 from typing import List, Literal, Optional
 
 from colorama import Fore
 
 from autogpt.config import Config
+from autogpt.logs import background_writer, logger
+from autogpt.logs.tracing import traced
 
 from ..api_manager import ApiManager
 from ..base import (
@@ -14,6 +19,8 @@ from ..base import (
     Message,
     ResponseMessageDict,
 )
+from ..hedging import Hedger, get_hedger
+from ..metering import current_call_site, get_usage_meter
 from ..providers import openai as iopenai
 from ..providers.openai import (
     OPEN_AI_CHAT_MODELS,
@@ -21,6 +28,8 @@ from ..providers.openai import (
     OpenAIFunctionSpec,
     count_openai_functions_tokens,
 )
+from ..providers.replay import get_replay
+from ..streaming import ChatStreamMonitor, StreamAborted
 from .token_counter import *
 
 
@@ -93,6 +102,7 @@ def create_text_completion(
 
 
 # Overly simple abstraction until we create something better
+@traced()
 def create_chat_completion(
     prompt: ChatSequence,
     config: Config,
@@ -100,6 +110,7 @@ def create_chat_completion(
     model: Optional[str] = None,
     temperature: Optional[float] = None,
     max_tokens: Optional[int] = None,
+    stream_monitor: Optional[ChatStreamMonitor] = None,
 ) -> ChatModelResponse:
     """Create a chat completion using the OpenAI API
 
@@ -108,6 +119,9 @@ def create_chat_completion(
         model (str, optional): The model to use. Defaults to None.
         temperature (float, optional): The temperature to use. Defaults to 0.9.
         max_tokens (int, optional): The max tokens to use. Defaults to None.
+        stream_monitor (ChatStreamMonitor, optional): If given, the response is
+            streamed and fed to the monitor as it arrives. Not used together with
+            `functions`.
 
     Returns:
         str: The response from the chat completion
@@ -131,8 +145,11 @@ def create_chat_completion(
     logger.debug(
         f"{Fore.GREEN}Creating chat completion with model {model}, temperature {temperature}, max_tokens {max_tokens}{Fore.RESET}"
     )
-    with open("model_logging_temp.txt", "w") as mlt:
-        mlt.write(f"Creating chat completion with model {model}, temperature {temperature}, max_tokens {max_tokens}")
+    background_writer.write(
+        "model_logging_temp.txt",
+        f"Creating chat completion with model {model}, temperature {temperature}, max_tokens {max_tokens}",
+        mode="w",
+    )
 
     chat_completion_kwargs = {
         "model": model,
@@ -163,19 +180,38 @@ def create_chat_completion(
     # Print full prompt to debug log
     logger.debug(prompt.dump())
 
-    response = iopenai.create_chat_completion(
-        messages=prompt.raw(),
-        **chat_completion_kwargs,
-    )
-    logger.debug(f"Response: {response}")
+    replay = get_replay()
+    if replay.replaying:
+        recorded = replay.lookup("chat", prompt.raw())
+        content, function_call = recorded.content, recorded.function_call
+        get_usage_meter().record_cache_hit(model)
+        if stream_monitor is not None and content:
+            _replay_into_monitor(content, stream_monitor)
+    elif stream_monitor is not None and not functions:
+        content = _stream_chat_completion(
+            prompt, model, chat_completion_kwargs, stream_monitor
+        )
+        function_call = None
+    elif not functions and (hedger := get_hedger()):
+        content = _hedged_chat_completion(prompt, chat_completion_kwargs, hedger)
+        function_call = None
+    else:
+        response = iopenai.create_chat_completion(
+            messages=prompt.raw(),
+            **chat_completion_kwargs,
+        )
+        logger.debug(f"Response: {response}")
 
-    if hasattr(response, "error"):
-        logger.error(response.error)
-        raise RuntimeError(response.error)
+        if hasattr(response, "error"):
+            logger.error(response.error)
+            raise RuntimeError(response.error)
 
-    first_message: ResponseMessageDict = response.choices[0].message
-    content: str | None = first_message.get("content")
-    function_call: FunctionCallDict | None = first_message.get("function_call")
+        first_message: ResponseMessageDict = response.choices[0].message
+        content: str | None = first_message.get("content")
+        function_call: FunctionCallDict | None = first_message.get("function_call")
+
+    if replay.recording:
+        replay.record("chat", prompt.raw(), content, function_call, model)
 
     for plugin in config.plugins:
         if not plugin.can_handle_on_response():
@@ -192,3 +228,78 @@ def create_chat_completion(
         if function_call
         else None,
     )
+
+
+def _replay_into_monitor(content: str, stream_monitor: ChatStreamMonitor) -> None:
+    """Feeds a replayed response to `stream_monitor` as if it had been streamed"""
+    stream_monitor.start()
+    try:
+        stream_monitor.feed(content)
+    except StreamAborted as e:
+        logger.warn(f"Replayed chat completion would have been aborted: {e}")
+    stream_monitor.finish()
+
+
+def _hedged_chat_completion(
+    prompt: ChatSequence, chat_completion_kwargs: dict, hedger: Hedger
+) -> str:
+    """Makes a chat completion, racing it against the secondary endpoint if it is slow"""
+
+    def racer(kwargs: dict):
+        def race(cancelled: threading.Event) -> tuple[str, str]:
+            content = iopenai.create_cancellable_chat_completion(
+                prompt.raw(), cancelled, **kwargs
+            )
+            return kwargs["model"], content
+
+        return race
+
+    started_at = time.perf_counter()
+    model, content = hedger.call(
+        current_call_site(),
+        racer(chat_completion_kwargs),
+        racer({**chat_completion_kwargs, **hedger.secondary}),
+    )
+    completion_tokens = count_string_tokens(content, model)
+    get_usage_meter().record(
+        model, prompt.token_length, completion_tokens, time.perf_counter() - started_at
+    )
+    with contextlib.suppress(KeyError):
+        ApiManager().update_cost(prompt.token_length, completion_tokens, model)
+    return content
+
+
+def _stream_chat_completion(
+    prompt: ChatSequence,
+    model: str,
+    chat_completion_kwargs: dict,
+    stream_monitor: ChatStreamMonitor,
+) -> str:
+    """Streams a chat completion into `stream_monitor` and returns its content.
+
+    The stream is closed early if the monitor aborts it. Streamed responses carry
+    no usage information, so the usage is counted locally.
+    """
+    stream_monitor.start()
+    deltas = iopenai.create_chat_completion_stream(
+        messages=prompt.raw(),
+        **chat_completion_kwargs,
+    )
+    try:
+        for delta in deltas:
+            stream_monitor.feed(delta)
+    except StreamAborted as e:
+        logger.warn(f"Stopped streaming chat completion early: {e}")
+    finally:
+        deltas.close()
+
+    stats = stream_monitor.finish()
+    logger.debug(f"Streamed chat completion with model {model}: {stats}")
+
+    content = stream_monitor.content
+    completion_tokens = count_string_tokens(content, model)
+    get_usage_meter().record(
+        model, prompt.token_length, completion_tokens, stats.total_time
+    )
+    ApiManager().update_cost(prompt.token_length, completion_tokens, model)
+    return content
@@ -3,10 +3,9 @@ from __future__ import annotations
 
 from typing import List, overload
 
-import tiktoken
-
 from autogpt.llm.base import Message
-from autogpt.logs import logger
+from autogpt.llm.tokens import count_messages_tokens, count_text_tokens
+from autogpt.logs.tracing import traced
 
 
 @overload
@@ -19,6 +18,7 @@ def count_message_tokens(messages: List[Message], model: str = "gpt-3.5-turbo-01
     ...
 
 
+@traced()
 def count_message_tokens(
     messages: Message | List[Message], model: str = "gpt-3.5-turbo-0125"
 ) -> int:
@@ -36,40 +36,10 @@ def count_message_tokens(
     """
     if isinstance(messages, Message):
         messages = [messages]
-
-    if model.startswith("gpt-3.5-turbo"):
-        tokens_per_message = (
-            4  # every message follows <|start|>{role/name}\n{content}<|end|>\n
-        )
-        tokens_per_name = -1  # if there's a name, the role is omitted
-        encoding_model = "gpt-3.5-turbo"
-    elif model.startswith("gpt-4"):
-        tokens_per_message = 3
-        tokens_per_name = 1
-        encoding_model = "gpt-4"
-    else:
-        raise NotImplementedError(
-            f"count_message_tokens() is not implemented for model {model}.\n"
-            " See https://github.com/openai/openai-python/blob/main/chatml.md for"
-            " information on how messages are converted to tokens."
-        )
-    try:
-        encoding = tiktoken.encoding_for_model(encoding_model)
-    except KeyError:
-        logger.warn("Warning: model not found. Using cl100k_base encoding.")
-        encoding = tiktoken.get_encoding("cl100k_base")
-
-    num_tokens = 0
-    for message in messages:
-        num_tokens += tokens_per_message
-        for key, value in message.raw().items():
-            num_tokens += len(encoding.encode(value))
-            if key == "name":
-                num_tokens += tokens_per_name
-    num_tokens += 3  # every reply is primed with <|start|>assistant<|message|>
-    return num_tokens
+    return count_messages_tokens(messages, model)
 
 
+@traced()
 def count_string_tokens(string: str, model_name: str) -> int:
     """
     Returns the number of tokens in a text string.
@@ -81,5 +51,4 @@ def count_string_tokens(string: str, model_name: str) -> int:
     Returns:
         int: The number of tokens in the text string.
     """
-    encoding = tiktoken.encoding_for_model("gpt-4")
-    return len(encoding.encode(string))
+    return count_text_tokens(string)
@@ -1,3 +1,5 @@
+from .async_writer import AsyncWriter, background_writer, flush_on_signals
+from .console import ConsoleRenderer, console_renderer
 from .formatters import AutoGptFormatter, JsonFormatter, remove_color_codes
 from .handlers import ConsoleHandler, JsonFileHandler, TypingConsoleHandler
 from .log_cycle import (
@@ -0,0 +1,189 @@
+"""Background writer for the log files written during each cycle."""
+from __future__ import annotations
+
+import atexit
+import queue
+import signal
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Iterable, Optional
+
+from .logger import logger
+from .tracing import traced
+
+_FLUSH = object()
+_STOP = object()
+
+
+@dataclass
+class WriterStats:
+    """Time and work of an `AsyncWriter`.
+
+    Attributes:
+        agent_seconds: time the writing threads spent in `write`, i.e. queueing
+        blocked_seconds: the part of `agent_seconds` spent waiting for a full queue
+        writer_seconds: time the writer thread spent in file I/O
+        requests: number of writes requested
+        writes: number of files opened and written
+        coalesced: number of requested writes folded into another write
+        batches: number of batches the writer thread handled
+    """
+
+    agent_seconds: float = 0.0
+    blocked_seconds: float = 0.0
+    writer_seconds: float = 0.0
+    requests: int = 0
+    writes: int = 0
+    coalesced: int = 0
+    batches: int = 0
+
+
+class AsyncWriter:
+    """Writes files on a dedicated thread, so the agent never waits on the disk.
+
+    Writes are queued and handled in batches. Within a batch, the writes to the
+    same file are coalesced: a rewrite (`mode="w"`) drops the pending writes to
+    the file before it, and the appends after it are joined, so each file is
+    opened once per batch. Missing parent directories are created by the writer.
+
+    The queue is bounded: when it is full, `write` blocks until the writer thread
+    catches up, so memory does not grow without limit if the disk is slow. The
+    thread is started on the first write, and the queue is flushed on exit.
+
+    Params:
+        max_pending: The number of writes that can be queued before `write` blocks.
+        batch_delay: How long the writer waits for more writes to add to a batch.
+    """
+
+    def __init__(self, max_pending: int = 1000, batch_delay: float = 0.05):
+        self.batch_delay = batch_delay
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats = WriterStats()
+        self._stats_lock = threading.Lock()
+
+    def write(self, path: str | Path, data: str, mode: str = "a") -> None:
+        """Queues writing `data` to `path`, appending (`"a"`) or replacing (`"w"`)"""
+        if mode not in ("a", "w"):
+            raise ValueError(f"mode must be 'a' or 'w', not {mode!r}")
+        start = time.perf_counter()
+        self._ensure_started()
+        item = (Path(path), mode, data)
+        try:
+            self._queue.put_nowait(item)
+            blocked = 0.0
+        except queue.Full:
+            waiting = time.perf_counter()
+            self._queue.put(item)
+            blocked = time.perf_counter() - waiting
+        with self._stats_lock:
+            self._stats.agent_seconds += time.perf_counter() - start
+            self._stats.blocked_seconds += blocked
+            self._stats.requests += 1
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Waits until every queued write is on disk; False if it timed out"""
+        if self._thread is None or not self._thread.is_alive():
+            return self._queue.empty()
+        done = threading.Event()
+        self._queue.put((_FLUSH, done))
+        return done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 10.0) -> None:
+        """Flushes the queue and stops the writer thread"""
+        with self._start_lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._queue.put((_STOP, None))
+        thread.join(timeout)
+
+    def stats(self) -> dict[str, float | int]:
+        with self._stats_lock:
+            return asdict(self._stats)
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="log-writer", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            if self.batch_delay:
+                time.sleep(self.batch_delay)
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._write_batch(
+                [item for item in batch if item[0] not in (_FLUSH, _STOP)]
+            )
+            for item in batch:
+                if item[0] is _FLUSH:
+                    item[1].set()
+            if any(item[0] is _STOP for item in batch):
+                return
+
+    @traced("log writes", cat="io")
+    def _write_batch(self, writes: list[tuple[Path, str, str]]) -> None:
+        start = time.perf_counter()
+        pending: dict[Path, tuple[str, list[str]]] = {}
+        for path, mode, data in writes:
+            if mode == "w" or path not in pending:
+                pending[path] = (mode, [data])
+            else:
+                pending[path][1].append(data)
+
+        for path, (mode, parts) in pending.items():
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                with open(path, mode, encoding="utf-8") as f:
+                    f.write("".join(parts))
+            except OSError as e:
+                logger.warn(f"Could not write {path}: {e}")
+
+        with self._stats_lock:
+            self._stats.writer_seconds += time.perf_counter() - start
+            self._stats.writes += len(pending)
+            self._stats.coalesced += len(writes) - len(pending)
+            self._stats.batches += 1
+
+
+def flush_on_signals(
+    writer: AsyncWriter, signals: Iterable[int] = (signal.SIGTERM,)
+) -> None:
+    """Flushes `writer` before the process is stopped by one of `signals`.
+
+    The previous handler of each signal is called afterwards; if there is none,
+    the process exits, so that the `atexit` handlers run. Must be called from the
+    main thread.
+    """
+    for signum in signals:
+        previous = signal.getsignal(signum)
+
+        def handler(signum, frame, previous=previous):
+            writer.flush(timeout=10.0)
+            if callable(previous):
+                previous(signum, frame)
+            elif previous != signal.SIG_IGN:
+                sys.exit(128 + signum)
+
+        signal.signal(signum, handler)
+
+
+background_writer = AsyncWriter()
+"""The writer shared by the logs of the agent"""
+
+atexit.register(background_writer.close)
@@ -0,0 +1,113 @@
+"""Console output written on its own thread, so printing never blocks the agent."""
+from __future__ import annotations
+
+import atexit
+import queue
+import random
+import sys
+import threading
+import time
+from typing import Optional, TextIO
+
+_FLUSH = object()
+
+
+class ConsoleRenderer:
+    """Writes console output on a dedicated thread.
+
+    On a terminal, output may be animated: it is "typed" word by word, with the
+    delays on the renderer thread rather than the agent's. Animation is skipped
+    whenever more output is waiting, so the console never falls behind the
+    agent by more than the message being typed. When the output is not a
+    terminal (batch runs, redirected output), nothing is animated.
+
+    The queue is bounded: if the console cannot keep up, `write` blocks.
+
+    Params:
+        stream: The stream to write to, `sys.stdout` at the time of writing by default.
+        interactive: Whether the output is a terminal; detected if not given.
+        max_pending: The number of messages that can be queued before `write` blocks.
+    """
+
+    def __init__(
+        self,
+        stream: Optional[TextIO] = None,
+        interactive: Optional[bool] = None,
+        max_pending: int = 1000,
+    ):
+        self._stream = stream
+        self._interactive = interactive
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    @property
+    def stream(self) -> TextIO:
+        return self._stream or sys.stdout
+
+    @property
+    def interactive(self) -> bool:
+        if self._interactive is not None:
+            return self._interactive
+        isatty = getattr(self.stream, "isatty", None)
+        return bool(isatty and isatty())
+
+    def write(self, text: str, animate: bool = False) -> None:
+        """Queues `text` for the console, typed word by word if `animate`"""
+        self._ensure_started()
+        self._queue.put((text, animate and self.interactive))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Writes all queued output without animation; False if it timed out"""
+        if self._thread is None or not self._thread.is_alive():
+            return self._queue.empty()
+        done = threading.Event()
+        self._queue.put((_FLUSH, done))
+        return done.wait(timeout)
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="console-renderer", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            text, animate = self._queue.get()
+            if text is _FLUSH:
+                animate.set()
+                continue
+            try:
+                if animate and self._queue.empty():
+                    self._type(text)
+                else:
+                    self.stream.write(text)
+                self.stream.flush()
+            except Exception as e:
+                sys.__stderr__.write(f"Console output failed: {e}\n")
+
+    def _type(self, text: str) -> None:
+        min_typing_speed = 0.05
+        max_typing_speed = 0.01
+        words = text.split(" ")
+        for i, word in enumerate(words):
+            if not self._queue.empty():
+                # More output is waiting: print the rest at once
+                self.stream.write(" ".join(words[i:]))
+                return
+            self.stream.write(word if i == len(words) - 1 else word + " ")
+            self.stream.flush()
+            time.sleep(random.uniform(min_typing_speed, max_typing_speed))
+            # type faster after each word
+            min_typing_speed = min_typing_speed * 0.95
+            max_typing_speed = max_typing_speed * 0.95
+
+
+console_renderer = ConsoleRenderer()
+"""The renderer shared by the console handlers of the logger"""
+
+atexit.register(console_renderer.flush, 5.0)
@@ -1,39 +1,26 @@
 import json
 import logging
-import random
-import time
 from pathlib import Path
 
+from .console import console_renderer
+
 
 class ConsoleHandler(logging.StreamHandler):
     def emit(self, record: logging.LogRecord) -> None:
         msg = self.format(record)
         try:
-            print(msg)
+            console_renderer.write(msg + "\n")
         except Exception:
             self.handleError(record)
 
 
 class TypingConsoleHandler(logging.StreamHandler):
-    """Output stream to console using simulated typing"""
+    """Output stream to console using simulated typing, on the renderer thread"""
 
     def emit(self, record: logging.LogRecord):
-        min_typing_speed = 0.05
-        max_typing_speed = 0.01
-
         msg = self.format(record)
         try:
-            words = msg.split()
-            for i, word in enumerate(words):
-                print(word, end="", flush=True)
-                if i < len(words) - 1:
-                    print(" ", end="", flush=True)
-                typing_speed = random.uniform(min_typing_speed, max_typing_speed)
-                time.sleep(typing_speed)
-                # type faster after each word
-                min_typing_speed = min_typing_speed * 0.95
-                max_typing_speed = max_typing_speed * 0.95
-            print()
+            console_renderer.write(msg + "\n", animate=True)
         except Exception:
             self.handleError(record)
 
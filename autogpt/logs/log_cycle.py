@@ -24,36 +24,22 @@ class LogCycleHandler:
     def __init__(self):
         self.log_count_within_cycle = 0
 
-    def create_outer_directory(self, ai_name: str, created_at: str) -> Path:
-        if os.environ.get("OVERWRITE_DEBUG") == "1":
-            outer_folder_name = "auto_gpt"
-        else:
-            ai_name_short = self.get_agent_short_name(ai_name)
-            outer_folder_name = f"{created_at}_{ai_name_short}"
-
-        outer_folder_path = logger.log_dir / "DEBUG" / outer_folder_name
-        if not outer_folder_path.exists():
-            outer_folder_path.mkdir(parents=True)
-
-        return outer_folder_path
-
     def get_agent_short_name(self, ai_name: str) -> str:
         return ai_name[:15].rstrip() if ai_name else DEFAULT_PREFIX
 
-    def create_inner_directory(self, outer_folder_path: Path, cycle_count: int) -> Path:
-        nested_folder_name = str(cycle_count).zfill(3)
-        nested_folder_path = outer_folder_path / nested_folder_name
-        if not nested_folder_path.exists():
-            nested_folder_path.mkdir()
-
-        return nested_folder_path
+    def cycle_directory(self, ai_name: str, created_at: str, cycle_count: int) -> Path:
+        """The directory of the logs of a cycle, without creating it"""
+        if os.environ.get("OVERWRITE_DEBUG") == "1":
+            outer_folder_name = "auto_gpt"
+        else:
+            outer_folder_name = f"{created_at}_{self.get_agent_short_name(ai_name)}"
+        return logger.log_dir / "DEBUG" / outer_folder_name / str(cycle_count).zfill(3)
 
     def create_nested_directory(
         self, ai_name: str, created_at: str, cycle_count: int
     ) -> Path:
-        outer_folder_path = self.create_outer_directory(ai_name, created_at)
-        nested_folder_path = self.create_inner_directory(outer_folder_path, cycle_count)
-
+        nested_folder_path = self.cycle_directory(ai_name, created_at, cycle_count)
+        nested_folder_path.mkdir(parents=True, exist_ok=True)
         return nested_folder_path
 
     def log_cycle(
@@ -65,13 +51,14 @@ class LogCycleHandler:
         file_name: str,
     ) -> None:
         """
-        Log cycle data to a JSON file.
+        Log cycle data to a JSON file. The file and its directory are written by the
+        background writer.
 
         Args:
             data (Any): The data to be logged.
             file_name (str): The name of the file to save the logged data.
         """
-        cycle_log_dir = self.create_nested_directory(ai_name, created_at, cycle_count)
+        cycle_log_dir = self.cycle_directory(ai_name, created_at, cycle_count)
 
         json_data = json.dumps(data, ensure_ascii=False, indent=4)
         log_file_path = cycle_log_dir / f"{self.log_count_within_cycle}_{file_name}"
@@ -2,8 +2,9 @@
 from __future__ import annotations
 
 import logging
+import os
 from pathlib import Path
-from typing import TYPE_CHECKING, Any, Optional
+from typing import TYPE_CHECKING, Optional
 
 from colorama import Fore
 
@@ -12,8 +13,9 @@ if TYPE_CHECKING:
 
 from autogpt.singleton import Singleton
 
-from .formatters import AutoGptFormatter, JsonFormatter
-from .handlers import ConsoleHandler, JsonFileHandler, TypingConsoleHandler
+from .console import console_renderer
+from .formatters import AutoGptFormatter
+from .handlers import ConsoleHandler, TypingConsoleHandler
 
 
 class Logger(metaclass=Singleton):
@@ -26,14 +28,22 @@ class Logger(metaclass=Singleton):
     def __init__(self):
         # create log directory if it doesn't exist
         # TODO: use workdir from config
-        self.log_dir = Path(__file__).parent.parent.parent / "logs"
+        self.log_dir = Path(
+            os.getenv("LOG_DIR", Path(__file__).parent.parent.parent / "logs")
+        )
         if not self.log_dir.exists():
-            self.log_dir.mkdir()
+            self.log_dir.mkdir(parents=True)
 
         log_file = "activity.log"
         error_file = "error.log"
 
-        console_formatter = AutoGptFormatter("%(title_color)s %(message)s")
+        if console_renderer.interactive:
+            console_formatter = AutoGptFormatter("%(title_color)s %(message)s")
+        else:
+            # Output that is not read live gets one plain, timestamped line per record
+            console_formatter = AutoGptFormatter(
+                "%(asctime)s %(levelname)s %(title)s %(message_no_color)s"
+            )
 
         # Create a handler for console which simulate typing
         self.typing_console_handler = TypingConsoleHandler()
@@ -175,16 +185,12 @@ class Logger(metaclass=Singleton):
 
         self.typewriter_log("DOUBLE CHECK CONFIGURATION", Fore.YELLOW, additionalText)
 
-    def log_json(self, data: Any, file_name: str | Path) -> None:
-        # Create a handler for JSON files
-        json_file_path = self.log_dir / file_name
-        json_data_handler = JsonFileHandler(json_file_path)
-        json_data_handler.setFormatter(JsonFormatter())
+    def log_json(self, data: str, file_name: str | Path) -> None:
+        """Writes already serialized JSON to a file in the background"""
+        from .async_writer import background_writer
 
-        # Log the JSON data using the custom file handler
-        self.json_logger.addHandler(json_data_handler)
         self.json_logger.debug(data)
-        self.json_logger.removeHandler(json_data_handler)
+        background_writer.write(self.log_dir / file_name, data, mode="w")
 
 
 logger = Logger()
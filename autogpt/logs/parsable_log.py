@@ -0,0 +1,136 @@
+"""Append-only event log of the commands of a run, and its reader."""
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Iterator
+
+from .logger import logger
+from .tracing import traced
+
+FSYNC_POLICIES = ("never", "close", "always")
+"""When events are forced to disk: never, once the log is closed, or every event"""
+
+ATTEMPTS_KEY = "ExecutionAgent_attempt"
+
+
+class ParsableLog:
+    """Writes the parsable log of a run as JSON lines, one event per line.
+
+    Events are only ever appended, so the cost of logging a cycle does not grow
+    with the length of the run, and a crash can at worst cut the last line short.
+    On close, the log is compacted: each attempt is written as a single line
+    holding all its fields, and the file is replaced atomically.
+
+    Events:
+        `{"event": "run", ...}`: fields of the run, e.g. the project.
+        `{"event": "attempt", ...}`: a command the agent executed.
+        `{"event": "update", ...}`: more fields of the latest attempt.
+
+    Params:
+        path: The `.jsonl` file to write.
+        fsync: One of `FSYNC_POLICIES`.
+        run_fields: Fields of the run, e.g. the project and its language.
+    """
+
+    def __init__(self, path: str | Path, fsync: str = "close", **run_fields: Any):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}, not {fsync!r}")
+        self.path = Path(path)
+        self.fsync = fsync
+        self._file = open(self.path, "a", encoding="utf-8")
+        if run_fields:
+            self._write({"event": "run", **run_fields})
+
+    @property
+    def closed(self) -> bool:
+        return self._file.closed
+
+    def attempt(self, **fields: Any) -> None:
+        """Logs a command the agent executed"""
+        self._write({"event": "attempt", **fields})
+
+    def update_attempt(self, **fields: Any) -> None:
+        """Adds fields to the latest attempt, e.g. the summary of its result"""
+        self._write({"event": "update", **fields})
+
+    def update_run(self, **fields: Any) -> None:
+        """Sets fields of the run, e.g. statistics"""
+        self._write({"event": "run", **fields})
+
+    def close(self, compact: bool = True) -> None:
+        if self.closed:
+            return
+        self._file.flush()
+        if self.fsync != "never":
+            os.fsync(self._file.fileno())
+        self._file.close()
+        if compact:
+            self.compact()
+
+    def compact(self) -> None:
+        """Rewrites the log with one line per attempt"""
+        run = load_parsable_log(self.path)
+        attempts = run.pop(ATTEMPTS_KEY)
+        lines = [{"event": "run", **run}] + [
+            {"event": "attempt", **attempt} for attempt in attempts
+        ]
+        temporary = self.path.with_name(self.path.name + ".tmp")
+        with open(temporary, "w", encoding="utf-8") as f:
+            f.writelines(_dumps(line) for line in lines)
+            f.flush()
+            if self.fsync != "never":
+                os.fsync(f.fileno())
+        os.replace(temporary, self.path)
+
+    @traced("parsable log write", cat="io")
+    def _write(self, event: dict[str, Any]) -> None:
+        self._file.write(_dumps(event))
+        self._file.flush()
+        if self.fsync == "always":
+            os.fsync(self._file.fileno())
+
+
+def read_events(path: str | Path) -> Iterator[dict[str, Any]]:
+    """Yields the events of a log, skipping a last line cut short by a crash"""
+    with open(path, encoding="utf-8") as f:
+        lines = f.readlines()
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            if number < len(lines):
+                raise
+            logger.warn(f"Ignoring the incomplete last line of {path}")
+
+
+def load_parsable_log(path: str | Path) -> dict[str, Any]:
+    """Reads a parsable log in the format of the former single-JSON-file logs.
+
+    Accepts both the `.jsonl` event logs and the `.json` files of earlier runs,
+    and returns the fields of the run with its attempts under `ATTEMPTS_KEY`.
+    """
+    path = Path(path)
+    if path.suffix == ".json":
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    run: dict[str, Any] = {}
+    attempts: list[dict[str, Any]] = []
+    for event in read_events(path):
+        kind = event.pop("event", None)
+        if kind == "attempt":
+            attempts.append(event)
+        elif kind == "update" and attempts:
+            attempts[-1].update(event)
+        elif kind == "run":
+            run.update(event)
+    run[ATTEMPTS_KEY] = attempts
+    return run
+
+
+def _dumps(event: dict[str, Any]) -> str:
+    return json.dumps(event, default=str) + "\n"
@@ -0,0 +1,195 @@
+"""Deduplicated, compressed archive of the prompts of a run."""
+from __future__ import annotations
+
+import argparse
+import difflib
+import hashlib
+import json
+import re
+import sys
+import zlib
+from pathlib import Path
+from typing import Iterator, Optional
+
+from .tracing import traced
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+_SECTION_BREAK = re.compile(r"(?<=\n\n)")
+
+CHUNKS_FILE = "chunks.bin"
+INDEX_FILE = "chunks.jsonl"
+CYCLES_FILE = "cycles.jsonl"
+
+
+def split_sections(prompt: str) -> list[str]:
+    """Splits a prompt at its blank lines; the sections join back into the prompt"""
+    return [section for section in _SECTION_BREAK.split(prompt) if section]
+
+
+class PromptArchive:
+    """Stores the prompt of every cycle, keeping each distinct section once.
+
+    Prompts are split into sections at blank lines. Most sections (guidelines,
+    tools, workflows, Dockerfiles) are the same from one cycle to the next, so
+    only new sections are compressed (with zstd if available, zlib otherwise)
+    and appended to the chunk file, keyed by their content hash. A cycle is
+    stored as the list of the hashes of its sections, and its prompt is rebuilt
+    exactly by joining them.
+
+    All files are append-only. A chunk is always written and indexed before the
+    cycles that refer to it.
+
+    Params:
+        directory: Where the archive is stored.
+        level: The compression level.
+    """
+
+    def __init__(self, directory: str | Path, level: int = 6):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.level = level
+        self._index: dict[str, tuple[int, int, str]] = {}
+        self._cycles: list[tuple[str, list[str]]] = []
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._cycles)
+
+    @traced("prompt archive write", cat="io")
+    def append(self, cycle_type: str, prompt: str) -> int:
+        """Archives the prompt of the next cycle, and returns the cycle's number"""
+        hashes = []
+        new_chunks: dict[str, str] = {}
+        for section in split_sections(prompt):
+            digest = hashlib.sha256(section.encode()).hexdigest()[:32]
+            if digest not in self._index:
+                new_chunks[digest] = section
+            hashes.append(digest)
+
+        if new_chunks:
+            with open(self.directory / CHUNKS_FILE, "ab") as chunks, open(
+                self.directory / INDEX_FILE, "a"
+            ) as index:
+                offset = chunks.tell()
+                for digest, section in new_chunks.items():
+                    codec, data = self._compress(section.encode())
+                    chunks.write(data)
+                    self._index[digest] = (offset, len(data), codec)
+                    index.write(json.dumps([digest, offset, len(data), codec]) + "\n")
+                    offset += len(data)
+
+        with open(self.directory / CYCLES_FILE, "a") as cycles:
+            cycles.write(json.dumps({"type": cycle_type, "sections": hashes}) + "\n")
+        self._cycles.append((cycle_type, hashes))
+        return len(self._cycles) - 1
+
+    def cycle_type(self, cycle: int) -> str:
+        return self._cycles[cycle][0]
+
+    def prompt(self, cycle: int) -> str:
+        """The prompt of a cycle, exactly as it was archived"""
+        with open(self.directory / CHUNKS_FILE, "rb") as chunks:
+            return "".join(self._read(chunks, h) for h in self._cycles[cycle][1])
+
+    def prompts(self) -> Iterator[tuple[str, str]]:
+        """The type and prompt of every cycle, in order"""
+        with open(self.directory / CHUNKS_FILE, "rb") as chunks:
+            cache: dict[str, str] = {}
+            for cycle_type, hashes in self._cycles:
+                for h in hashes:
+                    if h not in cache:
+                        cache[h] = self._read(chunks, h)
+                yield cycle_type, "".join(cache[h] for h in hashes)
+
+    def diff(self, cycle: int, previous: Optional[int] = None) -> str:
+        """A unified diff of the prompt of a cycle against an earlier one"""
+        previous = cycle - 1 if previous is None else previous
+        return "".join(
+            difflib.unified_diff(
+                self.prompt(previous).splitlines(keepends=True),
+                self.prompt(cycle).splitlines(keepends=True),
+                f"cycle {previous}",
+                f"cycle {cycle}",
+            )
+        )
+
+    def stats(self) -> dict[str, int]:
+        archived = (self.directory / CHUNKS_FILE).stat().st_size if self._index else 0
+        return {
+            "cycles": len(self._cycles),
+            "sections": sum(len(hashes) for _, hashes in self._cycles),
+            "unique_sections": len(self._index),
+            "archived_bytes": archived,
+        }
+
+    def _compress(self, data: bytes) -> tuple[str, bytes]:
+        if zstandard is not None:
+            return "zstd", zstandard.ZstdCompressor(level=self.level).compress(data)
+        return "zlib", zlib.compress(data, self.level)
+
+    def _read(self, chunks, digest: str) -> str:
+        offset, length, codec = self._index[digest]
+        chunks.seek(offset)
+        data = chunks.read(length)
+        if codec == "zstd":
+            if zstandard is None:
+                raise RuntimeError("Reading this archive requires `zstandard`")
+            data = zstandard.ZstdDecompressor().decompress(data)
+        else:
+            data = zlib.decompress(data)
+        return data.decode()
+
+    def _load(self) -> None:
+        # A chunk is indexed before any cycle refers to it, so a line cut short by
+        # a crash is dropped without losing any complete cycle
+        for digest, offset, length, codec in _read_lines(self.directory / INDEX_FILE):
+            self._index[digest] = (offset, length, codec)
+        for entry in _read_lines(self.directory / CYCLES_FILE):
+            self._cycles.append((entry["type"], entry["sections"]))
+
+
+def _read_lines(path: Path) -> list:
+    """The JSON lines of a file, truncating an incomplete last line"""
+    if not path.exists():
+        return []
+    text = path.read_text()
+    complete = text[: text.rfind("\n") + 1]
+    if complete != text:
+        with open(path, "r+") as f:
+            f.truncate(len(complete.encode()))
+    return [json.loads(line) for line in complete.splitlines() if line]
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="View the archived prompts of a run"
+    )
+    parser.add_argument("archive", help="The prompt_archive_* directory of the run")
+    commands = parser.add_subparsers(dest="command", required=True)
+    show = commands.add_parser("show", help="Print the prompt of a cycle")
+    show.add_argument("cycle", type=int)
+    diff = commands.add_parser("diff", help="Diff the prompt of a cycle with another")
+    diff.add_argument("cycle", type=int)
+    diff.add_argument("--against", type=int, help="Default: the previous cycle")
+    commands.add_parser("list", help="List the cycles and their types")
+    commands.add_parser("stats", help="Print the size of the archive")
+    args = parser.parse_args(argv)
+
+    archive = PromptArchive(args.archive)
+    if args.command == "show":
+        sys.stdout.write(archive.prompt(args.cycle))
+    elif args.command == "diff":
+        sys.stdout.write(archive.diff(args.cycle, args.against))
+    elif args.command == "list":
+        for cycle in range(len(archive)):
+            print(cycle, archive.cycle_type(cycle))
+    else:
+        print(json.dumps(archive.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""Timeline of a run as Chrome trace events, viewable in Perfetto or chrome://tracing."""
+from __future__ import annotations
+
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Optional, TypeVar
+
+if TYPE_CHECKING:
+    from .async_writer import AsyncWriter
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_DISABLED_SPAN = nullcontext()
+
+
+class Span:
+    """A timed section of code, recorded as a complete ("X") event when it ends"""
+
+    __slots__ = ("tracer", "name", "cat", "args", "start")
+
+    def __init__(self, tracer: Tracer, name: str, cat: str, args: dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self.start = 0
+
+    def set(self, **args: Any) -> None:
+        """Adds arguments to the event, e.g. results known only at the end"""
+        self.args.update(args)
+
+    def __enter__(self) -> Span:
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        end = time.perf_counter_ns()
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer._record(
+            {
+                "name": self.name,
+                "cat": self.cat,
+                "ph": "X",
+                "ts": self.tracer._micros(self.start),
+                "dur": (end - self.start) / 1000,
+                "args": self.args,
+            }
+        )
+
+
+class Tracer:
+    """Records spans of the agent's work and writes them as Chrome trace events.
+
+    Disabled until `start` is called: until then, `span` returns a shared no-op
+    context manager and functions decorated with `traced` are called directly,
+    so instrumented code costs one attribute check.
+
+    Events are buffered in memory and appended to the trace file by `flush`
+    (e.g. once per cycle) through the background log writer. The file uses the
+    JSON array format, whose closing bracket is optional, so the trace of a run
+    that crashed can still be opened.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.path: Optional[Path] = None
+        self._writer: Optional[AsyncWriter] = None
+        self._events: list[dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._threads: set[int] = set()
+        self._origin = 0
+        self._first = True
+
+    def start(self, path: str | Path, process_name: str = "ExecutionAgent") -> None:
+        """Starts recording, writing the trace to `path`"""
+        # Imported here: the writer itself is traced
+        from .async_writer import background_writer
+
+        if self.enabled:
+            self.stop()
+        self._writer = background_writer
+        self.path = Path(path)
+        self._origin = time.perf_counter_ns()
+        self._threads = set()
+        self._first = True
+        self._writer.write(self.path, "[", mode="w")
+        self.enabled = True
+        self._record(
+            {"name": "process_name", "ph": "M", "args": {"name": process_name}}
+        )
+        atexit.register(self.stop)
+
+    def stop(self) -> None:
+        """Writes the remaining events and closes the trace"""
+        if not self.enabled:
+            return
+        self.flush()
+        self.enabled = False
+        self._writer.write(self.path, "\n]\n")
+        atexit.unregister(self.stop)
+
+    def flush(self) -> None:
+        """Appends the events recorded so far to the trace file"""
+        if not self.enabled:
+            return
+        with self._lock:
+            events, self._events = self._events, []
+        if not events:
+            return
+        lines = []
+        for event in events:
+            lines.append(("\n" if self._first else ",\n") + _dumps(event))
+            self._first = False
+        self._writer.write(self.path, "".join(lines))
+
+    def span(self, name: str, cat: str = "agent", **args: Any):
+        """A context manager that records the time spent in its block"""
+        if not self.enabled:
+            return _DISABLED_SPAN
+        return Span(self, name, cat, args)
+
+    def begin(self, name: str, cat: str = "agent", **args: Any) -> None:
+        """Opens a span that is closed by `end`, for code that is not a single block"""
+        if self.enabled:
+            self._record(
+                {
+                    "name": name,
+                    "cat": cat,
+                    "ph": "B",
+                    "ts": self._micros(time.perf_counter_ns()),
+                    "args": args,
+                }
+            )
+
+    def end(self, **args: Any) -> None:
+        """Closes the latest span opened by `begin` on this thread"""
+        if self.enabled:
+            self._record(
+                {"ph": "E", "ts": self._micros(time.perf_counter_ns()), "args": args}
+            )
+
+    def _micros(self, ns: int) -> float:
+        return (ns - self._origin) / 1000
+
+    def _record(self, event: dict[str, Any]) -> None:
+        thread = threading.current_thread()
+        tid = thread.native_id or 0
+        event["pid"] = os.getpid()
+        event["tid"] = tid
+        with self._lock:
+            if tid not in self._threads:
+                self._threads.add(tid)
+                self._events.append(
+                    {
+                        "name": "thread_name",
+                        "ph": "M",
+                        "pid": event["pid"],
+                        "tid": tid,
+                        "args": {"name": thread.name},
+                    }
+                )
+            self._events.append(event)
+
+
+def traced(name: Optional[str] = None, cat: str = "agent") -> Callable[[F], F]:
+    """Decorates a function so that each call is recorded as a span.
+
+    Args:
+        name: The name of the span; the qualified name of the function by default.
+        cat: The category of the span.
+    """
+
+    def decorator(func: F) -> F:
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            with Span(tracer, span_name, cat, {}):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore
+
+    return decorator
+
+
+def _dumps(event: dict[str, Any]) -> str:
+    return json.dumps(event, default=str, separators=(",", ":"))
+
+
+tracer = Tracer()
+"""The tracer of the run, disabled unless `TRACE_EVENTS=True`"""
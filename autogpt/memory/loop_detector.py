@@ -0,0 +1,148 @@
+"""Incremental detection of loops in the stream of executed commands."""
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Literal, Optional
+
+LoopKind = Literal["periodic", "runs"]
+"""- periodic: the latest commands repeat with a fixed period, e.g. A B C A B C
+- runs: one command was repeated, then another, e.g. A A A B B B
+"""
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_command(command: dict[str, Any], strict: bool = True) -> str:
+    """Returns a canonical form of a command, so that near-duplicates compare equal.
+
+    Whitespace is collapsed and the flags of shell commands are sorted. Unless
+    `strict`, flags are left out altogether, so commands that only differ in
+    their flags (e.g. `pytest -x` and `pytest -v`) are considered the same.
+    """
+    name = str(command.get("name", "")).strip().lower()
+    args = command.get("args") or {}
+    if not isinstance(args, dict):
+        args = {"": args}
+
+    normalized = {}
+    for key, value in args.items():
+        if not isinstance(value, str):
+            normalized[key] = json.dumps(value, sort_keys=True)
+            continue
+        value = value.replace("|| exit 0", "")
+        tokens = _WHITESPACE.split(value.strip())
+        if key == "command":
+            flags = sorted(t for t in tokens if t.startswith("-"))
+            words = [t for t in tokens if not t.startswith("-")]
+            tokens = words + flags if strict else words
+        normalized[key] = " ".join(tokens)
+    return json.dumps([name, normalized], sort_keys=True)
+
+
+def fingerprint(normalized: str) -> int:
+    digest = hashlib.blake2b(normalized.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+@dataclass
+class Loop:
+    kind: LoopKind
+    period: int
+    """The number of distinct steps of the loop; 0 for runs"""
+    commands: list[str]
+    """The commands that make up the loop, serialized, oldest first"""
+    exact: bool
+    """Whether the commands are the same up to whitespace and the order of flags,
+    rather than only up to their flags"""
+
+
+@dataclass
+class _Stream:
+    """Fingerprints of the latest commands and, for each period `p`, the number
+    of trailing commands that equal the command `p` places before them"""
+
+    fingerprints: deque[int]
+    matches: list[int]
+    run: int = 0
+    previous_run: int = 0
+
+
+class LoopDetector:
+    """Detects loops in the commands of an agent as they come in.
+
+    For every period up to `max_period`, the detector counts how many of the
+    latest commands equal the command one period before them. Each command
+    updates these counters from the fingerprint of the command, so the cost per
+    command does not grow with the length of the history.
+
+    A period `p` is a loop once the latest `max(min_span, 2 * p)` commands repeat
+    with that period. By default this flags A A A A A A, A B A B A B and
+    A B C A B C, as well as A A A B B B.
+
+    Params:
+        max_period: The longest loop that is detected.
+        min_span: The least number of commands a loop must span.
+        min_run: The length of the two runs of a "runs" loop; 0 to not detect them.
+    """
+
+    def __init__(self, max_period: int = 5, min_span: int = 6, min_run: int = 3):
+        self.max_period = max_period
+        self.min_span = min_span
+        self.min_run = min_run
+        window = max(min_span, 2 * max_period)
+        self._commands: deque[str] = deque(maxlen=window)
+        self._strict = _Stream(deque(maxlen=max_period), [0] * (max_period + 1))
+        self._loose = _Stream(deque(maxlen=max_period), [0] * (max_period + 1))
+
+    def push(self, command: dict[str, Any]) -> Optional[Loop]:
+        """Adds the latest command to the stream
+
+        Returns:
+            The loop the latest commands form, if any
+        """
+        loop = self.check(command)
+        self._commands.append(json.dumps(command))
+        for stream, strict in ((self._strict, True), (self._loose, False)):
+            self._update(stream, fingerprint(normalize_command(command, strict)))
+        return loop
+
+    def check(self, command: dict[str, Any]) -> Optional[Loop]:
+        """Returns the loop the latest commands would form if `command` came next"""
+        strict = self._advance(self._strict, fingerprint(normalize_command(command)))
+        loose = self._advance(
+            self._loose, fingerprint(normalize_command(command, strict=False))
+        )
+        for counters, exact in ((strict, True), (loose, False)):
+            matches, run, previous_run = counters
+            for period in range(1, self.max_period + 1):
+                span = max(self.min_span, 2 * period)
+                if matches[period] >= span - period:
+                    return self._loop("periodic", period, span, command, exact)
+            if self.min_run and run == self.min_run and previous_run >= self.min_run:
+                return self._loop("runs", 0, 2 * self.min_run, command, exact)
+        return None
+
+    def _advance(self, stream: _Stream, new: int) -> tuple[list[int], int, int]:
+        """Computes the counters of `stream` after `new`, without changing it"""
+        recent = stream.fingerprints
+        matches = [0] * (self.max_period + 1)
+        for period in range(1, self.max_period + 1):
+            if len(recent) >= period and recent[-period] == new:
+                matches[period] = stream.matches[period] + 1
+        if recent and recent[-1] == new:
+            return matches, stream.run + 1, stream.previous_run
+        return matches, 1, stream.run
+
+    def _update(self, stream: _Stream, new: int) -> None:
+        stream.matches, stream.run, stream.previous_run = self._advance(stream, new)
+        stream.fingerprints.append(new)
+
+    def _loop(
+        self, kind: LoopKind, period: int, span: int, command: dict, exact: bool
+    ) -> Loop:
+        commands = list(self._commands)[-(span - 1) :] + [json.dumps(command)]
+        return Loop(kind, period, commands, exact)
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-import copy
+import itertools
 import json
 from dataclasses import dataclass
 from typing import TYPE_CHECKING, Iterator, Optional
@@ -9,7 +9,7 @@ if TYPE_CHECKING:
     from autogpt.agents import Agent, BaseAgent
     from autogpt.config import Config
 
-from autogpt.json_utils.utilities import extract_dict_from_response
+from autogpt.json_utils.response_parser import ParsedResponse, parse_response
 from autogpt.llm.base import ChatSequence, Message
 from autogpt.llm.providers.openai import OPEN_AI_CHAT_MODELS
 from autogpt.llm.utils import (
@@ -24,13 +24,21 @@ from autogpt.logs import (
     logger,
 )
 
+_message_ids = itertools.count()
+
+
+def _parsed_reply(message: Message) -> ParsedResponse:
+    """The parsed content of an AI response, parsed only if it was added unparsed"""
+    return message._parsed or parse_response(message.content)
+
 
 @dataclass
 class MessageHistory(ChatSequence):
     max_summary_tlength: int = 500
     agent: Optional[BaseAgent | Agent] = None
     summary: str = "I was created"
-    last_trimmed_index: int = 0
+    summarized_id: int = -1
+    """The ID of the newest message that is part of the running summary"""
 
     SUMMARIZATION_PROMPT = '''Your task is to create a concise running summary of actions and information results in the provided text, focusing on key and potentially important information to remember.
 
@@ -47,6 +55,39 @@ Latest Development:
 """
 '''
 
+    def append(self, message: Message):
+        if message._history_id is None:
+            object.__setattr__(message, "_history_id", next(_message_ids))
+        return self.messages.append(message)
+
+    def extend(self, messages: list[Message] | ChatSequence):
+        for message in messages:
+            self.append(message)
+
+    def add_reply(self, reply: ParsedResponse) -> None:
+        """Adds an AI response along with its parsed content"""
+        message = Message("assistant", reply.raw, "ai_response")
+        object.__setattr__(message, "_parsed", reply)
+        self.append(message)
+
+    def messages_since(self, message_id: int) -> list[Message]:
+        """Returns the messages added after the message with ID `message_id`.
+
+        Only the new messages at the end of the history are looked at.
+        """
+        start = len(self.messages)
+        while start > 0:
+            previous_id = self.messages[start - 1]._history_id
+            if previous_id is not None and previous_id <= message_id:
+                break
+            start -= 1
+        new_messages = self.messages[start:]
+        # Messages added to `self.messages` directly don't have an ID yet
+        for message in new_messages:
+            if message._history_id is None:
+                object.__setattr__(message, "_history_id", next(_message_ids))
+        return new_messages
+
     def trim_messages(
         self, current_message_chain: list[Message], config: Config
     ) -> tuple[Message, list[Message]]:
@@ -60,16 +101,15 @@ Latest Development:
 
         Returns:
             Message: A message with the new running summary after adding the trimmed messages.
-            list[Message]: A list of messages that are in full_message_history with an index higher than last_trimmed_index and absent from current_message_chain.
+            list[Message]: A list of messages that were added to the history after the
+                last summarized message and are absent from current_message_chain.
         """
-        # Select messages in full_message_history with an index higher than last_trimmed_index
-        new_messages = [
-            msg for i, msg in enumerate(self) if i > self.last_trimmed_index
-        ]
+        new_messages = self.messages_since(self.summarized_id)
 
         # Remove messages that are already present in current_message_chain
+        chain_ids = {msg._history_id for msg in current_message_chain}
         new_messages_not_in_chain = [
-            msg for msg in new_messages if msg not in current_message_chain
+            msg for msg in new_messages if msg._history_id not in chain_ids
         ]
 
         if not new_messages_not_in_chain:
@@ -78,10 +118,7 @@ Latest Development:
         new_summary_message = self.update_running_summary(
             new_events=new_messages_not_in_chain, config=config
         )
-
-        # Find the index of the last message processed
-        last_message = new_messages_not_in_chain[-1]
-        self.last_trimmed_index = self.messages.index(last_message)
+        self.summarized_id = new_messages_not_in_chain[-1]._history_id
 
         return new_summary_message, new_messages_not_in_chain
 
@@ -104,9 +141,9 @@ Latest Development:
             )
             result_message = messages[i + 1]
             try:
-                assert (
-                    extract_dict_from_response(ai_message.content) != {}
-                ), "AI response is not a valid JSON object"
+                assert _parsed_reply(
+                    ai_message
+                ).data, "AI response is not a valid JSON object"
                 assert result_message.type == "action_result"
 
                 yield user_message, ai_message, result_message
@@ -114,11 +151,7 @@ Latest Development:
                 logger.debug(
                     f"Invalid item in message history: {err}; Messages: {messages[i-1:i+2]}"
                 )
-        prompt = MessageHistory.SUMMARIZATION_PROMPT.format(
-            summary=self.summary, new_events=["NO EVENTS"]
-        )
-        with open("debug_prompt_summary_file.txt", "a+") as dbmp:
-            dbmp.write(prompt)
+
     def summary_message(self) -> Message:
         return Message(
             "system",
@@ -154,31 +187,30 @@ Latest Development:
         if not max_summary_length:
             max_summary_length = self.max_summary_tlength
 
-        # Create a copy of the new_events list to prevent modifying the original list
-        new_events = copy.deepcopy(new_events)
-
-        # Replace "assistant" with "you". This produces much better first person past tense results.
+        # Rewrite the events instead of copying and modifying them
+        events: list[Message] = []
         for event in new_events:
+            # Replace "assistant" with "you". This produces much better first person past tense results.
             if event.role.lower() == "assistant":
-                event.role = "you"
-
+                content = event.content
                 # Remove "thoughts" dictionary from "content"
                 try:
-                    content_dict = extract_dict_from_response(event.content)
-                    if "thoughts" in content_dict:
-                        del content_dict["thoughts"]
-                    event.content = json.dumps(content_dict)
-                except json.JSONDecodeError as e:
+                    content_dict = dict(_parsed_reply(event).data or {})
+                    content_dict.pop("thoughts", None)
+                    content = json.dumps(content_dict)
+                except (json.JSONDecodeError, TypeError) as e:
                     logger.error(f"Error: Invalid JSON: {e}")
                     if config.debug_mode:
                         logger.error(f"{event.content}")
+                events.append(Message("you", content, event.type))
 
             elif event.role.lower() == "system":
-                event.role = "your computer"
+                events.append(Message("your computer", event.content, event.type))
 
             # Delete all user messages
-            elif event.role == "user":
-                new_events.remove(event)
+            elif event.role != "user":
+                events.append(event)
+        new_events = events
 
         summ_model = OPEN_AI_CHAT_MODELS[config.fast_llm]
 
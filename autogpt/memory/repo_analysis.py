@@ -0,0 +1,140 @@
+"""On-disk store of the pre-analysis of a repository, keyed by commit."""
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import json
+import os
+import subprocess
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from autogpt.logs import logger
+
+ANALYSIS_VERSION = 1
+"""Bump when the contents of an analysis change, to invalidate stored bundles"""
+
+DEFAULT_STORE_DIR = "preanalysis_cache"
+
+LANGUAGE_EXTENSIONS = {
+    ".py": "python",
+    ".java": "java",
+    ".kt": "kotlin",
+    ".scala": "scala",
+    ".js": "javascript",
+    ".jsx": "javascript",
+    ".mjs": "javascript",
+    ".ts": "typescript",
+    ".tsx": "typescript",
+    ".c": "c",
+    ".h": "c",
+    ".cc": "c++",
+    ".cpp": "c++",
+    ".cxx": "c++",
+    ".hpp": "c++",
+    ".rs": "rust",
+    ".go": "go",
+    ".rb": "ruby",
+    ".php": "php",
+    ".cs": "c#",
+}
+SKIPPED_DIRS = {".git", "node_modules", "vendor", "venv", ".venv", "target", "build"}
+
+
+@dataclass
+class RepoAnalysis:
+    """Everything the agent finds out about a repository before its first cycle"""
+
+    repo_url: str
+    commit: Optional[str]
+    prompt_version: str
+    workflows: Optional[list[str]] = None
+    dockerfiles: list[str] = field(default_factory=list)
+    search_results: Any = None
+    languages: list[str] = field(default_factory=list)
+    unified_summary: Optional[str] = None
+    """The LLM digest of the search results and CI files, once it was made"""
+
+    def to_dict(self) -> dict[str, Any]:
+        return dataclasses.asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> RepoAnalysis:
+        names = {f.name for f in dataclasses.fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in names})
+
+
+def repo_commit(path: str) -> Optional[str]:
+    """Returns the commit checked out at `path`, or `None` if it is not a git repo"""
+    try:
+        result = subprocess.run(
+            ["git", "-C", path, "rev-parse", "HEAD"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+    except OSError:
+        return None
+    commit = result.stdout.strip()
+    return commit if result.returncode == 0 and commit else None
+
+
+def detect_languages(path: str, limit: int = 3) -> list[str]:
+    """Returns the most common source languages in `path`, most common first"""
+    counts: Counter[str] = Counter()
+    for root, dirs, files in os.walk(path):
+        dirs[:] = [d for d in dirs if d not in SKIPPED_DIRS]
+        for name in files:
+            language = LANGUAGE_EXTENSIONS.get(os.path.splitext(name)[1].lower())
+            if language:
+                counts[language] += 1
+    return [language for language, _ in counts.most_common(limit)]
+
+
+def prompt_version(*prompts: str) -> str:
+    """Identifies the prompts an analysis was made with"""
+    digest = hashlib.sha1("\0".join(prompts).encode()).hexdigest()
+    return f"{ANALYSIS_VERSION}-{digest[:12]}"
+
+
+class RepoAnalysisStore:
+    """Stores one analysis per (repository URL, commit, prompt version).
+
+    Params:
+        root: The directory the analyses are stored in.
+    """
+
+    def __init__(self, root: str = DEFAULT_STORE_DIR):
+        self.root = root
+
+    def path(self, repo_url: str, commit: str, prompt_version: str) -> str:
+        key = hashlib.sha1(f"{repo_url}\0{commit}\0{prompt_version}".encode())
+        return os.path.join(self.root, key.hexdigest() + ".json")
+
+    def load(
+        self, repo_url: str, commit: Optional[str], prompt_version: str
+    ) -> Optional[RepoAnalysis]:
+        if commit is None:
+            return None
+        path = self.path(repo_url, commit, prompt_version)
+        try:
+            with open(path) as f:
+                return RepoAnalysis.from_dict(json.load(f))
+        except FileNotFoundError:
+            return None
+        except (ValueError, TypeError) as e:
+            logger.warn(f"Ignoring corrupt repository analysis {path}: {e}")
+            return None
+
+    def save(self, analysis: RepoAnalysis) -> None:
+        """Stores `analysis`, unless the repository is not at a known commit"""
+        if analysis.commit is None:
+            return
+        os.makedirs(self.root, exist_ok=True)
+        path = self.path(analysis.repo_url, analysis.commit, analysis.prompt_version)
+        # Write to a temporary file first, so a crash never leaves a partial bundle
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(analysis.to_dict(), f)
+        os.replace(temp_path, path)
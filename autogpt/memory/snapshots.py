@@ -0,0 +1,176 @@
+"""Snapshots of the agent state as periodic full bases and per-cycle deltas."""
+from __future__ import annotations
+
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Optional
+
+from autogpt.logs.tracing import traced
+
+_SNAPSHOT_FILE = re.compile(r"^cycle_(\d+)\.(base|delta)\.json$")
+
+Delta = dict[str, Any]
+"""A change to a value: `{"set": value}`, `{"extend": items}` for a list that
+grew at its end, or `{"update": {key: delta}, "remove": [keys]}` for a dict"""
+
+
+def diff(old: Any, new: Any) -> Optional[Delta]:
+    """The delta that turns `old` into `new`, or None if they are equal"""
+    if old == new:
+        return None
+    if isinstance(old, dict) and isinstance(new, dict):
+        delta: Delta = {
+            "update": {
+                key: change
+                for key, value in new.items()
+                if (change := diff(old.get(key, _MISSING), value)) is not None
+            }
+        }
+        if removed := [key for key in old if key not in new]:
+            delta["remove"] = removed
+        return delta
+    if (
+        isinstance(old, list)
+        and isinstance(new, list)
+        and len(new) > len(old)
+        and new[: len(old)] == old
+    ):
+        return {"extend": new[len(old) :]}
+    return {"set": new}
+
+
+def patch(value: Any, delta: Delta) -> Any:
+    """Applies a delta made by `diff`; dicts and lists are changed in place"""
+    if "set" in delta:
+        return delta["set"]
+    if "extend" in delta:
+        value.extend(delta["extend"])
+        return value
+    for key, change in delta["update"].items():
+        value[key] = patch(value.get(key), change)
+    for key in delta.get("remove", ()):
+        value.pop(key, None)
+    return value
+
+
+class _Missing:
+    def __eq__(self, other):
+        return False
+
+
+_MISSING = _Missing()
+
+
+class SnapshotStore:
+    """Saves the state of every cycle, writing only what changed since the last.
+
+    Every `base_every` cycles the full state is written as a base snapshot; in
+    between, a delta with the new list items (e.g. messages and step results)
+    and changed fields. Each file is written to a temporary file and renamed, so
+    a crash never leaves a partial snapshot behind.
+
+    The state of a cycle is rebuilt from the latest base before it and the deltas
+    after that base, so at most `base_every` files are read.
+
+    Params:
+        directory: Where the snapshots are stored.
+        base_every: The number of cycles between full snapshots.
+    """
+
+    def __init__(self, directory: str | Path, base_every: int = 25):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.base_every = base_every
+        self._last: Optional[tuple[int, Any]] = None
+        self._deltas_since_base = 0
+
+    @traced("snapshot write", cat="io")
+    def save(self, cycle: int, state: dict[str, Any]) -> Path:
+        """Saves the state after `cycle`, as a delta if possible"""
+        # Round-trip through JSON: the last state must not share objects with
+        # the agent, and must compare equal to what is read back from disk
+        state = json.loads(json.dumps(state, default=str))
+        if (
+            self._last is None
+            or self._last[0] == cycle
+            or self._deltas_since_base + 1 >= self.base_every
+        ):
+            path = self._write(cycle, "base", state)
+            self._deltas_since_base = 0
+        else:
+            delta = diff(self._last[1], state) or {"update": {}}
+            path = self._write(cycle, "delta", {"after": self._last[0], **delta})
+            self._deltas_since_base += 1
+        self._last = (cycle, state)
+        return path
+
+    def cycles(self) -> list[int]:
+        """The cycles whose state is saved, in order"""
+        return sorted(self._files())
+
+    def load(self, cycle: Optional[int] = None) -> dict[str, Any]:
+        """The state after `cycle`, or after the latest saved cycle"""
+        files = self._files()
+        if not files:
+            raise FileNotFoundError(f"No snapshots in {self.directory}")
+        if cycle is None:
+            cycle = max(files)
+        elif cycle not in files:
+            raise KeyError(f"No snapshot of cycle {cycle} in {self.directory}")
+
+        chain = []
+        current = cycle
+        while files[current][0] == "delta":
+            delta = _read(files[current][1])
+            chain.append(delta)
+            current = delta.pop("after")
+            if current not in files:
+                raise FileNotFoundError(f"Snapshot of cycle {current} is missing")
+        state = _read(files[current][1])
+        for delta in reversed(chain):
+            state = patch(state, delta)
+        return state
+
+    def compact(self, keep_after: Optional[int] = None) -> None:
+        """Drops the snapshots of the cycles up to `keep_after`, the latest by default.
+
+        The state of the oldest cycle that is kept is rewritten as a base, so the
+        states of the later cycles can still be rebuilt.
+        """
+        files = self._files()
+        if not files:
+            return
+        if keep_after is None:
+            keep_after = max(files) - 1
+        first = min((c for c in files if c > keep_after), default=max(files))
+        if files[first][0] == "delta":
+            self._write(first, "base", self.load(first))
+        for cycle, (_, path) in files.items():
+            if cycle < first:
+                os.remove(path)
+        if self._last is not None and self._last[0] == first:
+            self._deltas_since_base = 0
+
+    def _files(self) -> dict[int, tuple[str, Path]]:
+        files = {}
+        for path in self.directory.iterdir():
+            if match := _SNAPSHOT_FILE.match(path.name):
+                files[int(match.group(1))] = (match.group(2), path)
+        return files
+
+    def _write(self, cycle: int, kind: str, content: Any) -> Path:
+        path = self.directory / f"cycle_{cycle}.{kind}.json"
+        temporary = path.with_name(path.name + ".tmp")
+        with open(temporary, "w") as f:
+            json.dump(content, f)
+        os.replace(temporary, path)
+        other = "delta" if kind == "base" else "base"
+        (self.directory / f"cycle_{cycle}.{other}.json").unlink(missing_ok=True)
+        return path
+
+
+def _read(path: Path) -> Any:
+    with open(path) as f:
+        return json.load(f)
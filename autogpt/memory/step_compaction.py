@@ -0,0 +1,97 @@
+"""Rolling compaction of the history of executed steps."""
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Any, Callable, Sequence
+
+from autogpt.logs import logger
+
+Step = tuple[str, Any]
+"""A command and the summary of its result"""
+
+
+def format_step(command: str, summary: Any) -> str:
+    return (
+        command
+        + "\nThe summary of the output of above command: "
+        + json.dumps(summary, indent=4)
+        + "\n"
+    )
+
+
+def format_steps(steps: Sequence[Step]) -> str:
+    return "".join(format_step(command, summary) for command, summary in steps)
+
+
+class StepCompactor:
+    """Keeps the last steps verbatim and folds older ones into phase digests.
+
+    Once `fold_size` steps have aged out of the verbatim window, they are folded
+    into one digest with a single call to `summarize`. When there are more than
+    `max_digests` digests, the two oldest are merged with another call. A fold
+    thus costs at most two LLM calls, and the compacted history never exceeds
+    `max_digests` digests plus `keep_recent + fold_size - 1` steps.
+
+    Digests are cached by the text they were made from, so compacting the same
+    history again (e.g. after restoring an agent) does not call the LLM.
+
+    Params:
+        summarize: Condenses a history of steps into a short phase digest.
+        merge: Merges two digests into one; defaults to `summarize`.
+        keep_recent: The number of latest steps that are always kept verbatim.
+        fold_size: The number of steps folded into each digest.
+        max_digests: The number of digests kept before the oldest are merged.
+    """
+
+    def __init__(
+        self,
+        summarize: Callable[[str], str],
+        merge: Callable[[str], str] | None = None,
+        keep_recent: int = 8,
+        fold_size: int = 6,
+        max_digests: int = 4,
+    ):
+        self.summarize = summarize
+        self.merge = merge or summarize
+        self.keep_recent = keep_recent
+        self.fold_size = fold_size
+        self.max_digests = max_digests
+        self.digests: list[str] = []
+        """Digests of the folded steps, oldest first"""
+        self.folded = 0
+        """The number of steps folded into the digests"""
+        self._cache: dict[tuple[Callable, str], str] = {}
+
+    def compact(self, steps: Sequence[Step]) -> None:
+        """Folds the steps that aged out of the verbatim window into digests"""
+        if len(steps) < self.folded:
+            # The history was rebuilt; start over
+            self.digests, self.folded = [], 0
+
+        while len(steps) - self.folded - self.keep_recent >= self.fold_size:
+            chunk = steps[self.folded : self.folded + self.fold_size]
+            try:
+                digest = self._cached(self.summarize, format_steps(chunk))
+                if len(self.digests) >= self.max_digests:
+                    merged = self._cached(self.merge, "\n".join(self.digests[:2]))
+                    self.digests[:2] = [merged]
+            except Exception as e:
+                # Keep the steps verbatim; the next cycle tries again
+                logger.warn(f"Could not compact the history of executed steps: {e}")
+                return
+            self.digests.append(digest)
+            self.folded += len(chunk)
+
+    def recent(self, steps: Sequence[Step]) -> Sequence[Step]:
+        """The steps that are not folded into a digest"""
+        return steps[self.folded :]
+
+    def _cached(self, condense: Callable[[str], str], text: str) -> str:
+        key = (condense, hashlib.sha1(text.encode()).hexdigest())
+        if key not in self._cache:
+            self._cache[key] = condense(text).strip()
+        return self._cache[key]
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"digests": self.digests, "folded": self.folded}
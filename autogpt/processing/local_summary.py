@@ -0,0 +1,125 @@
+"""Summarize trivial command results without calling the LLM."""
+from __future__ import annotations
+
+import hashlib
+import re
+from typing import Any, Callable, Optional
+
+from autogpt.processing.result_condenser import PATTERN_LIBRARY
+
+SUCCESS_BANNERS = [
+    r"^\[INFO\] BUILD SUCCESS$",
+    r"^BUILD SUCCESSFUL\b",
+    r"^Successfully (?:installed|built|tagged|uninstalled) ",
+    r"^Requirement already satisfied: ",
+    r"^(?:added|removed|changed|up to date,) .*packages?\b",
+    r"^\s*Finished `?\w+`? profile ",
+    r"^Already up to date\.$",
+    r"^Setting up \S+ \(",
+    r"^=+ \d+ passed(?:, \d+ (?:skipped|deselected|xfailed|xpassed|warnings?))* in [\d.]+s",
+]
+"""Lines that report that a command succeeded"""
+
+_RESULT_PREFIX = re.compile(
+    r"^Command \w+ returned(?: a lengthy response, we condensed it)?:\s*"
+    r"(?:Output in terminal after executing the command[^\n]*:\n)?"
+)
+_SUCCESS = re.compile("|".join(SUCCESS_BANNERS), re.MULTILINE)
+_TROUBLE = re.compile(
+    "|".join(p for ps in PATTERN_LIBRARY.values() for p in ps)
+    + r"|(?i:error|fail|fatal|denied|not found|no such file|cannot|unable)",
+    re.MULTILINE,
+)
+
+
+def command_output(result: str) -> str:
+    """The output of a command, without the text the agent wraps it in"""
+    return _RESULT_PREFIX.sub("", result, count=1).strip()
+
+
+def make_summary(summary: str) -> dict[str, str]:
+    """A summary with the structure the summary cycle asks the LLM for"""
+    return {
+        "summary": summary,
+        "Setup details:": "",
+        "Meaningful next setps": "",
+    }
+
+
+class LocalSummarizer:
+    """Summarizes the results of trivial commands locally, escalating the rest.
+
+    Results are summarized from templates when the command printed nothing,
+    printed a short message without any sign of trouble, printed a known success
+    banner and nothing alarming, or printed exactly what it printed the last time
+    it ran. Anything else is left to the summary cycle of the LLM, whose summaries
+    are recorded so that a repeat of the same output can reuse them.
+
+    Params:
+        count_tokens: Counts the tokens in a text.
+        max_tokens: Outputs of up to this many tokens are quoted in the summary.
+        max_banner_chars: Longer outputs are not checked for success banners.
+    """
+
+    def __init__(
+        self,
+        count_tokens: Callable[[str], int],
+        max_tokens: int = 60,
+        max_banner_chars: int = 20000,
+    ):
+        self.count_tokens = count_tokens
+        self.max_tokens = max_tokens
+        self.max_banner_chars = max_banner_chars
+        self.local = 0
+        self.escalated = 0
+        self._previous: dict[str, tuple[str, Any]] = {}
+
+    def summarize(self, command: str, result: str) -> Optional[Any]:
+        """Returns a summary of `result`, or None if it needs the LLM"""
+        output = command_output(result)
+        summary = self._summarize(command, output)
+        if summary is None:
+            self.escalated += 1
+        else:
+            self.local += 1
+            self.record(command, result, summary)
+        return summary
+
+    def record(self, command: str, result: str, summary: Any) -> None:
+        """Remembers the summary of the latest output of `command`"""
+        self._previous[command] = (_digest(command_output(result)), summary)
+
+    def _summarize(self, command: str, output: str) -> Optional[Any]:
+        previous = self._previous.get(command)
+        if previous is not None and previous[0] == _digest(output):
+            return previous[1]
+
+        if not output:
+            return make_summary("The command completed without any output.")
+        if len(output) > self.max_banner_chars or _TROUBLE.search(output):
+            return None
+        if self.count_tokens(output) <= self.max_tokens:
+            return make_summary(f"The command completed and printed: {output}")
+
+        banners = [m.group().strip() for m in _SUCCESS.finditer(output)]
+        if banners:
+            shown = list(dict.fromkeys(banners))[:3]
+            more = f" (and {len(banners) - len(shown)} similar lines)"
+            return make_summary(
+                "The command succeeded: "
+                + "; ".join(shown)
+                + (more if len(banners) > len(shown) else "")
+            )
+        return None
+
+    def stats(self) -> dict[str, Any]:
+        total = self.local + self.escalated
+        return {
+            "local": self.local,
+            "llm": self.escalated,
+            "avoided_fraction": round(self.local / total, 3) if total else 0.0,
+        }
+
+
+def _digest(output: str) -> str:
+    return hashlib.sha1(output.encode()).hexdigest()
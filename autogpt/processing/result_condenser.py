@@ -0,0 +1,275 @@
+"""Condense long command results around the lines that matter."""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional
+
+PATTERN_LIBRARY: dict[str, list[str]] = {
+    "generic": [
+        r"\bERROR\b",
+        r"\bError:",
+        r"\bFAILED\b",
+        r"\bFAILURE\b",
+        r"\bfatal:",
+        r"Segmentation fault",
+    ],
+    "python": [
+        r"^Traceback \(most recent call last\)",
+        r"^E {2,}",
+        r"^FAILED ",
+        r"^\w+(?:\.\w+)*(?:Error|Exception): ",
+        r"^=+ .*\b(?:failed|error)s?\b.* =+$",
+    ],
+    "java": [
+        r"BUILD FAILURE",
+        r"^\[ERROR\]",
+        r"^Tests run: .*(?:Failures: [1-9]|Errors: [1-9])",
+        r"^\s+at [\w$.]+\(",
+        r"FAILURE: Build failed",
+    ],
+    "javascript": [r"^npm ERR!", r"^\s*✕ ", r"^\s*● ", r"^\s*\d+ failing"],
+    "rust": [r"^error(?:\[E\d+\])?:", r"^test .* \.\.\. FAILED", r"panicked at"],
+    "go": [r"^--- FAIL:", r"^FAIL\s", r"^panic:"],
+    "c": [r": error:", r"undefined reference to", r"^make(?:\[\d+\])?: \*\*\*"],
+}
+"""Per-ecosystem patterns of the lines worth keeping in a long command result"""
+
+OMISSION_MARKER = "[... {lines} lines omitted ...]"
+
+
+@dataclass
+class Condensed:
+    text: str
+    kept_windows: int
+    dropped_regions: int
+    dropped_lines: int
+
+
+class ResultCondenser:
+    """Cuts long command results down to a token budget.
+
+    Keeps the head and tail of the output plus windows of context around lines
+    matching the pattern library, e.g. compiler errors and failing tests in the
+    middle of a build log. Each dropped region is replaced with a marker telling
+    how many lines were left out.
+
+    The output is scanned with a single compiled regular expression, and only the
+    kept parts are tokenized, so even outputs of 100 MB are condensed quickly.
+
+    Params:
+        count_tokens: Counts the tokens in a text.
+        token_budget: The maximum number of tokens of a condensed result.
+        patterns: The pattern library, by ecosystem; defaults to `PATTERN_LIBRARY`.
+        context_lines: The number of lines kept on each side of a matching line.
+        head_lines: The number of lines kept from the start of the output.
+        tail_lines: The number of lines kept from the end of the output.
+        max_line_chars: Longer lines, e.g. progress bars, are cut to this length.
+    """
+
+    def __init__(
+        self,
+        count_tokens: Callable[[str], int],
+        token_budget: int = 4000,
+        patterns: Optional[dict[str, Iterable[str]]] = None,
+        context_lines: int = 5,
+        head_lines: int = 20,
+        tail_lines: int = 60,
+        max_line_chars: int = 1000,
+    ):
+        self.count_tokens = count_tokens
+        self.token_budget = token_budget
+        self.context_lines = context_lines
+        self.head_lines = head_lines
+        self.tail_lines = tail_lines
+        self.max_line_chars = max_line_chars
+        library = PATTERN_LIBRARY if patterns is None else patterns
+        self.scanner = _Scanner(p for ps in library.values() for p in ps)
+
+    def condense(self, text: str) -> Condensed:
+        """Returns `text` if it fits the budget, or a condensed version of it"""
+        # No tokenizer packs more than a few dozen characters into one token, so
+        # longer outputs don't need to be counted to know they don't fit
+        if len(text) <= self.token_budget * 32:
+            if self.count_tokens(text) <= self.token_budget:
+                return Condensed(text, 0, 0, 0)
+
+        windows = self._windows(text)
+        budget = self.token_budget - self.count_tokens(
+            _header(self.token_budget, len(windows), len(text), len(text))
+            + OMISSION_MARKER.format(lines=len(text)) * 2
+        )
+        head = self._edge(text, self.head_lines, budget // 5, from_end=False)
+        tail = self._edge(text, self.tail_lines, budget * 2 // 5, from_end=True)
+        kept = [head, tail]
+        budget -= sum(self.count_tokens(self._render(text, s, e)) for s, e in kept)
+
+        # The first match is often the root cause, the last ones the summary
+        ordered = windows[:1] + windows[:0:-1]
+        matched = 0
+        for window in ordered:
+            cost = self.count_tokens(self._render(text, *window)) + 10
+            if cost > budget:
+                break
+            kept.append(window)
+            budget -= cost
+            matched += 1
+
+        return self._assemble(text, kept, matched)
+
+    def _windows(self, text: str) -> list[tuple[int, int]]:
+        """Character ranges of the matching lines with their context"""
+        windows: list[tuple[int, int]] = []
+        search = self.scanner.cursor(text)
+        position = 0
+        while (match := search(position)) is not None:
+            start = _line_start(text, match, self.context_lines)
+            end = _line_end(text, match, self.context_lines)
+            if windows and start <= windows[-1][1]:
+                windows[-1] = (windows[-1][0], end)
+            else:
+                windows.append((start, end))
+            if end >= len(text):
+                break
+            # Matches inside the window are already kept
+            position = end
+        return windows
+
+    def _edge(self, text: str, lines: int, budget: int, from_end: bool):
+        """The longest run of at most `lines` lines at one end that fits `budget`"""
+        while True:
+            if from_end:
+                start = _line_start(text, len(text), lines - 1) if lines else len(text)
+                span = (start, len(text))
+            else:
+                span = (0, _line_end(text, 0, lines - 1) if lines else 0)
+            if lines == 0 or self.count_tokens(self._render(text, *span)) <= budget:
+                return span
+            lines //= 2
+
+    def _render(self, text: str, start: int, end: int) -> str:
+        chunk = text[start:end]
+        if len(chunk) <= self.max_line_chars:
+            return chunk
+        return "\n".join(
+            line
+            if len(line) <= self.max_line_chars
+            else f"{line[:self.max_line_chars]}[... {len(line) - self.max_line_chars} characters omitted]"
+            for line in chunk.split("\n")
+        )
+
+    def _assemble(
+        self, text: str, spans: list[tuple[int, int]], matched: int
+    ) -> Condensed:
+        merged: list[tuple[int, int]] = []
+        for start, end in sorted(s for s in spans if s[0] < s[1]):
+            if merged and start <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+
+        parts: list[str] = []
+        dropped_regions = dropped_lines = 0
+        position = 0
+        for start, end in merged + [(len(text), len(text))]:
+            if start > position:
+                lines = text.count("\n", position, start) + (text[start - 1] != "\n")
+                if lines > 0:
+                    parts.append(OMISSION_MARKER.format(lines=lines))
+                    dropped_regions += 1
+                    dropped_lines += lines
+            if start < end:
+                parts.append(self._render(text, start, end).strip("\n"))
+            position = end + 1
+
+        header = _header(self.token_budget, matched, dropped_lines, dropped_regions)
+        return Condensed(
+            "\n".join([header] + parts), matched, dropped_regions, dropped_lines
+        )
+
+
+class _Scanner:
+    """Finds the next match of any of a set of patterns.
+
+    One alternation of all patterns would defeat the literal-prefix search of the
+    regex engine and be orders of magnitude slower on large outputs. Instead, the
+    line-anchored patterns share one regex, the others get a regex each, and a
+    leading word boundary is checked by hand so as not to slow the search down.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        anchored: list[str] = []
+        self.regexes: list[tuple[re.Pattern, bool]] = []
+        for pattern in patterns:
+            if pattern.startswith("^"):
+                anchored.append(pattern[1:])
+            elif pattern.startswith(r"\b"):
+                self.regexes.append((re.compile(pattern[2:], re.MULTILINE), True))
+            else:
+                self.regexes.append((re.compile(pattern, re.MULTILINE), False))
+        if anchored:
+            self.regexes.append(
+                (re.compile(f"^(?:{'|'.join(anchored)})", re.MULTILINE), False)
+            )
+
+    def cursor(self, text: str) -> Callable[[int], Optional[int]]:
+        """Returns a function giving the first match at or after a position.
+
+        The positions passed to it must not decrease; the next match of each regex
+        is remembered, so that the text is scanned only once.
+        """
+        upcoming: list[Optional[int]] = [-1] * len(self.regexes)
+
+        def search(position: int) -> Optional[int]:
+            for i, (regex, boundary) in enumerate(self.regexes):
+                start = upcoming[i]
+                if start is not None and start < position:
+                    upcoming[i] = _search(regex, boundary, text, position)
+            return min((s for s in upcoming if s is not None), default=None)
+
+        return search
+
+
+def _search(
+    regex: re.Pattern, boundary: bool, text: str, position: int
+) -> Optional[int]:
+    while match := regex.search(text, position):
+        start = match.start()
+        if not boundary or start == 0 or _is_word(text[start - 1]) != _is_word(
+            text[start]
+        ):
+            return start
+        position = start + 1
+    return None
+
+
+def _is_word(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+def _header(budget: int, matched: int, dropped_lines: int, dropped_regions: int):
+    return (
+        f"[Output condensed to fit {budget} tokens: kept {matched} region(s) around "
+        f"errors or failures plus the first and last lines; {dropped_lines} lines "
+        f"omitted in {dropped_regions} region(s)]"
+    )
+
+
+def _line_start(text: str, position: int, lines_before: int) -> int:
+    """The start of the line `lines_before` lines above the one at `position`"""
+    start = text.rfind("\n", 0, position)
+    for _ in range(lines_before):
+        if start <= 0:
+            return 0
+        start = text.rfind("\n", 0, start)
+    return start + 1
+
+
+def _line_end(text: str, position: int, lines_after: int) -> int:
+    """The end of the line `lines_after` lines below the one at `position`"""
+    end = text.find("\n", position)
+    for _ in range(lines_after):
+        if end == -1:
+            break
+        end = text.find("\n", end + 1)
+    return len(text) if end == -1 else end
@@ -3,11 +3,11 @@ from math import ceil
 from typing import Optional
 
 import spacy
-import tiktoken
 
 from autogpt.config import Config
 from autogpt.llm.base import ChatSequence
 from autogpt.llm.providers.openai import OPEN_AI_MODELS
+from autogpt.llm.tokens import get_encoding
 from autogpt.llm.utils import count_string_tokens, create_chat_completion
 from autogpt.logs import logger
 
@@ -52,7 +52,7 @@ def chunk_content(
 
     max_chunk_length = max_chunk_length or _max_chunk_length(for_model)
 
-    tokenizer = tiktoken.encoding_for_model(for_model)
+    tokenizer = get_encoding(for_model)
 
     tokenized_text = tokenizer.encode(content)
     total_length = len(tokenized_text)
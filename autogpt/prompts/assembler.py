@@ -0,0 +1,194 @@
+"""Assembly of agent prompts from cached, deduplicated sections."""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from typing import Any, Callable, Optional
+
+from autogpt.logs import logger
+from autogpt.prompts.layout import PromptLayout, PromptSection, Stability
+from autogpt.prompts.packer import PackedSection, PromptPacker
+
+StatKey = tuple[int, int]
+"""(mtime in ns, size) of a file"""
+
+
+class FileCache:
+    """Caches the contents of files until they change on disk.
+
+    Each lookup costs a `stat` call; a file is only read again if its modification
+    time or size changed. Parsed contents (e.g. JSON) are shared between callers
+    and must not be modified.
+    """
+
+    def __init__(self):
+        self._entries: dict[tuple[str, Callable], tuple[StatKey, Any]] = {}
+        self.reads = 0
+
+    def read(self, path: str) -> Optional[str]:
+        """Returns the content of a file, or `None` if it does not exist"""
+        return self._load(path, _identity)
+
+    def read_json(self, path: str) -> Any:
+        return self._load(path, json.loads)
+
+    def read_lines(self, path: str) -> Optional[list[str]]:
+        return self._load(path, str.splitlines)
+
+    def _load(self, path: str, parse: Callable[[str], Any]) -> Any:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self._entries.pop((path, parse), None)
+            return None
+        stat_key = (stat.st_mtime_ns, stat.st_size)
+
+        cached = self._entries.get((path, parse))
+        if cached is not None and cached[0] == stat_key:
+            return cached[1]
+
+        with open(path) as f:
+            content = f.read()
+        self.reads += 1
+        value = parse(content)
+        self._entries[(path, parse)] = (stat_key, value)
+        return value
+
+
+def _identity(content: str) -> str:
+    return content
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha1(content.encode()).hexdigest()
+
+
+class PromptAssembler:
+    """Builds a prompt from sections, once per cycle.
+
+    File-backed sections are served from a `FileCache`, so cycles in which no file
+    changed do not read from disk. A section or file whose content is already in
+    the prompt is left out, and the tokens taken up by each section are recorded.
+    With a packer, the sections are fit into the token budget given to `render`.
+
+    Params:
+        count_tokens: Counts the tokens of a text for the model in use.
+        files: The cache to read files through.
+        separator: Joins the sections of the prompt.
+        packer: Shrinks the sections of prompts that exceed their token budget.
+    """
+
+    def __init__(
+        self,
+        count_tokens: Callable[[str], int],
+        files: Optional[FileCache] = None,
+        separator: str = "",
+        packer: Optional[PromptPacker] = None,
+    ):
+        self.count_tokens = count_tokens
+        self.files = files or FileCache()
+        self.separator = separator
+        self.packer = packer
+        self.breakdown: dict[str, int] = {}
+        """Tokens per section of the last rendered prompt"""
+        self.cuts: list[PackedSection] = []
+        """Sections of the last rendered prompt that were shrunk to fit the budget"""
+        self.begin()
+
+    def begin(self) -> None:
+        """Starts assembling a new prompt"""
+        self.layout = PromptLayout(self.separator)
+        self.summaries: dict[str, str] = {}
+        self._hashes: set[str] = set()
+
+    @property
+    def sections(self) -> list[PromptSection]:
+        return self.layout.sections
+
+    def add(
+        self,
+        name: str,
+        content: str,
+        stability: Stability = Stability.STATIC,
+        summary: Optional[str] = None,
+    ) -> bool:
+        """Adds a section, unless a section with the same content was added before
+
+        Args:
+            summary: A shorter substitute for the section, if it has to be shrunk
+
+        Returns:
+            Whether the section was added
+        """
+        if not content:
+            return False
+        digest = content_hash(content)
+        if digest in self._hashes:
+            logger.debug(f"Leaving out prompt section '{name}': duplicate content")
+            return False
+        self._hashes.add(digest)
+        self.layout.add(name, content, stability)
+        if summary is not None:
+            self.summaries[name] = summary
+        return True
+
+    def add_file(
+        self,
+        name: str,
+        path: str,
+        template: str = "{}",
+        stability: Stability = Stability.STATIC,
+    ) -> bool:
+        """Adds a section with the content of a file, if it exists"""
+        content = self.files.read(path)
+        if content is None:
+            return False
+        return self.add(name, template.format(content), stability)
+
+    def file_block(self, path: str) -> Optional[str]:
+        """Returns the content of a file to embed in a section.
+
+        Returns `None` if the file does not exist or its content is already part
+        of the prompt, e.g. the same file found under another path.
+        """
+        content = self.files.read(path)
+        if content is None:
+            return None
+        digest = content_hash(content)
+        if digest in self._hashes or (
+            content.strip() and any(content in s.content for s in self.sections)
+        ):
+            logger.debug(f"Leaving out {path} from the prompt: duplicate content")
+            return None
+        self._hashes.add(digest)
+        return content
+
+    def render(self, budget: Optional[int] = None) -> str:
+        """Renders the prompt and records its per-section token breakdown
+
+        Args:
+            budget: The number of tokens the sections may take up; only enforced
+                if the assembler has a packer
+        """
+        sections = self.layout.ordered_sections()
+        if self.packer is None or budget is None:
+            self.cuts = []
+            self.breakdown = {s.name: self.count_tokens(s.content) for s in sections}
+            return self.layout.render()
+
+        packed = self.packer.pack(sections, budget, self.summaries)
+        self.cuts = [p for p in packed if p.action != "kept"]
+        self.breakdown = {p.name: p.tokens for p in packed if p.content}
+        if self.cuts:
+            logger.info(
+                f"Shrunk the prompt to fit {budget} tokens: "
+                + ", ".join(
+                    f"{p.name} {p.action} ({p.original_tokens} -> {p.tokens} tokens)"
+                    for p in self.cuts
+                )
+            )
+        return self.separator.join(p.content for p in packed if p.content)
+
+    def breakdown_text(self) -> str:
+        return ", ".join(f"{name}: {tokens}" for name, tokens in self.breakdown.items())
@@ -0,0 +1,141 @@
+"""Prompt layout that keeps the start of a prompt identical across cycles.
+
+LLM providers cache the longest previously seen prefix of a prompt, which cuts the
+latency and cost of the cached part. To benefit from that, the sections of a prompt
+are ordered from most to least stable, so the bytes of the prefix only change when
+a section that is actually stable changes.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Callable, Optional, Sequence
+
+from autogpt.llm.base import MessageDict
+
+
+class Stability(IntEnum):
+    """How long the content of a prompt section stays the same"""
+
+    STATIC = 0
+    """The same in every cycle of a run"""
+    APPEND_ONLY = 1
+    """Only ever grows at its end, e.g. the history of executed commands"""
+    CYCLE = 2
+    """May change from one cycle to the next"""
+
+
+@dataclass
+class PromptSection:
+    name: str
+    content: str
+    stability: Stability
+
+
+class PromptLayout:
+    """Collects prompt sections and renders them ordered by stability.
+
+    Sections of the same stability keep the order in which they were added. Since
+    an append-only section only keeps the prompt prefix stable if nothing follows
+    it but volatile content, a layout should have at most one of them.
+    """
+
+    def __init__(self, separator: str = "\n"):
+        self.separator = separator
+        self.sections: list[PromptSection] = []
+
+    def add(
+        self, name: str, content: str, stability: Stability = Stability.STATIC
+    ) -> None:
+        if content:
+            self.sections.append(PromptSection(name, content, stability))
+
+    def ordered_sections(self) -> list[PromptSection]:
+        return sorted(self.sections, key=lambda s: s.stability)
+
+    def render(self) -> str:
+        return self.separator.join(s.content for s in self.ordered_sections())
+
+
+def common_prefix_length(a: str, b: str) -> int:
+    """Returns the length of the longest common prefix of two strings"""
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[:middle] == b[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def serialize_messages(messages: Sequence[MessageDict]) -> str:
+    return "".join(f"<{m['role']}>\n{m['content']}\n" for m in messages)
+
+
+@dataclass
+class PrefixCacheStats:
+    prompt_tokens: int
+    cacheable_tokens: int
+
+    @property
+    def cacheable_fraction(self) -> float:
+        return self.cacheable_tokens / self.prompt_tokens if self.prompt_tokens else 0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.cacheable_tokens}/{self.prompt_tokens} prompt tokens cacheable "
+            f"({self.cacheable_fraction:.0%})"
+        )
+
+
+class PrefixCacheTracker:
+    """Measures how much of each prompt could be served from a prefix cache.
+
+    A prompt is cacheable up to the longest prefix it shares with one of the
+    recently sent prompts; alternating cycle types (e.g. command and summary
+    cycles) each keep their own cached prefixes.
+
+    Params:
+        count_tokens: Counts the tokens of a text for the model in use.
+        min_prefix_tokens: Shared prefixes shorter than this are not cached by
+            the provider (1024 tokens for OpenAI).
+        window: The number of recent prompts assumed to still be cached.
+    """
+
+    def __init__(
+        self,
+        count_tokens: Callable[[str], int],
+        min_prefix_tokens: int = 1024,
+        window: int = 8,
+    ):
+        self.count_tokens = count_tokens
+        self.min_prefix_tokens = min_prefix_tokens
+        self.window = window
+        self.recent_prompts: list[str] = []
+        self.history: list[PrefixCacheStats] = []
+
+    def observe(self, messages: Sequence[MessageDict]) -> PrefixCacheStats:
+        """Registers a prompt that is about to be sent and returns its stats"""
+        text = serialize_messages(messages)
+        prefix_length = max(
+            (common_prefix_length(text, p) for p in self.recent_prompts), default=0
+        )
+        cacheable_tokens = self.count_tokens(text[:prefix_length])
+        if cacheable_tokens < self.min_prefix_tokens:
+            cacheable_tokens = 0
+
+        stats = PrefixCacheStats(self.count_tokens(text), cacheable_tokens)
+        self.history.append(stats)
+        self.recent_prompts = (self.recent_prompts + [text])[-self.window :]
+        return stats
+
+    @property
+    def last(self) -> Optional[PrefixCacheStats]:
+        return self.history[-1] if self.history else None
+
+    def overall_fraction(self) -> float:
+        """The cacheable fraction of all prompt tokens observed so far"""
+        total = sum(s.prompt_tokens for s in self.history)
+        cacheable = sum(s.cacheable_tokens for s in self.history)
+        return cacheable / total if total else 0
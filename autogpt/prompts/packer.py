@@ -0,0 +1,217 @@
+"""Packing of prompt sections into a token budget."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, Literal, Optional, Sequence
+
+from autogpt.prompts.layout import PromptSection, Stability
+
+ShrinkStrategy = Literal["none", "keep_head", "keep_tail", "summary", "drop"]
+"""How a section is shrunk when it does not fit:
+- none: never shrunk, e.g. the goals or the instruction of the cycle
+- keep_head / keep_tail: truncated, keeping its start / its end
+- summary: replaced by its summary, or dropped if it has none
+- drop: left out entirely
+"""
+
+PackAction = Literal["kept", "truncated", "summarized", "dropped"]
+
+TRUNCATION_MARKER = "\n[... {} tokens left out ...]\n"
+
+
+@dataclass(frozen=True)
+class SectionPolicy:
+    """Params:
+    priority: Sections with a higher priority get their share of the budget first.
+    min_tokens: A truncated section is dropped rather than cut below this size.
+    max_tokens: The size a section is cut to even if the budget has room.
+    shrink: How the section is shrunk when it does not fit.
+    """
+
+    priority: int = 50
+    min_tokens: int = 0
+    max_tokens: Optional[int] = None
+    shrink: ShrinkStrategy = "keep_head"
+
+
+REQUIRED = SectionPolicy(priority=1000, shrink="none")
+
+
+@dataclass
+class PackedSection:
+    name: str
+    content: str
+    tokens: int
+    original_tokens: int
+    action: PackAction
+
+
+class PromptPacker:
+    """Fits prompt sections into a token budget.
+
+    The budget is handed out in two greedy passes in order of priority: first
+    every section gets the least it can be shrunk to, then sections grow back
+    towards their full size while budget remains. Sections that did not get their
+    full size are truncated, summarized or dropped according to their policy. The
+    result only depends on the sections and the budget.
+
+    Static sections are only ever cut to their minimum, never to whatever budget is
+    left, so they render the same way while the append-only and per-cycle sections
+    after them change size. Otherwise the cached prompt prefix would break every
+    cycle once the budget binds. Give them a higher priority than those sections.
+
+    Params:
+        count_tokens: Counts the tokens of a text for the model in use.
+        policies: The policy of each section by name.
+        default_policy: The policy of sections without one.
+    """
+
+    def __init__(
+        self,
+        count_tokens: Callable[[str], int],
+        policies: dict[str, SectionPolicy],
+        default_policy: SectionPolicy = SectionPolicy(),
+    ):
+        self.count_tokens = count_tokens
+        self.policies = policies
+        self.default_policy = default_policy
+
+    def policy(self, name: str) -> SectionPolicy:
+        return self.policies.get(name, self.default_policy)
+
+    def pack(
+        self,
+        sections: Sequence[PromptSection],
+        budget: int,
+        summaries: Optional[dict[str, str]] = None,
+    ) -> list[PackedSection]:
+        """Shrinks `sections` so that together they take up at most `budget` tokens.
+
+        Sections with the `none` strategy are always kept whole, so the result can
+        only exceed the budget if these sections alone do.
+
+        Returns:
+            The packed sections, in the order of `sections`
+        """
+        summaries = summaries or {}
+        sizes = [self.count_tokens(s.content) for s in sections]
+        policies = [self.policy(s.name) for s in sections]
+        summary_sizes = [
+            self.count_tokens(summaries[s.name]) if s.name in summaries else None
+            for s in sections
+        ]
+
+        limits, floors = [], []
+        for size, policy, summary_size in zip(sizes, policies, summary_sizes):
+            limit = size
+            if policy.shrink != "none" and policy.max_tokens is not None:
+                limit = min(size, policy.max_tokens)
+            if policy.shrink == "none":
+                floor = limit
+            elif policy.shrink in ("keep_head", "keep_tail"):
+                floor = min(policy.min_tokens, limit)
+            elif policy.shrink == "summary" and summary_size is not None:
+                floor = min(summary_size, limit)
+            else:
+                # Sections that can only be dropped are all or nothing
+                floor = None
+                if policy.shrink == "drop" and limit < size:
+                    limit = 0
+            limits.append(limit)
+            floors.append(floor)
+
+        order = sorted(range(len(sections)), key=lambda i: -policies[i].priority)
+        allotted = [0] * len(sections)
+        included = [False] * len(sections)
+        remaining = budget
+
+        # 1. Reserve the minimum of every section that fits
+        for i in order:
+            if floors[i] is None:
+                continue
+            if policies[i].shrink == "none" or floors[i] <= remaining:
+                allotted[i] = floors[i]
+                included[i] = True
+                remaining -= floors[i]
+
+        # 2. Grow sections towards their full size
+        for i in order:
+            missing = limits[i] - allotted[i]
+            if missing <= 0 or remaining <= 0:
+                continue
+            if floors[i] is not None and not included[i]:
+                continue
+            if (
+                policies[i].shrink in ("keep_head", "keep_tail")
+                and sections[i].stability != Stability.STATIC
+            ):
+                extra = min(missing, remaining)
+            elif missing <= remaining:
+                extra = missing
+            else:
+                continue
+            allotted[i] += extra
+            remaining -= extra
+            included[i] = True
+
+        packed = []
+        for i, section in enumerate(sections):
+            policy = policies[i]
+            content, action = section.content, "kept"
+            if not included[i] or not allotted[i]:
+                content, action = "", "dropped"
+            elif allotted[i] < sizes[i]:
+                if policy.shrink in ("summary", "drop", "none"):
+                    if section.name in summaries:
+                        content, action = summaries[section.name], "summarized"
+                    else:
+                        content, action = "", "dropped"
+                else:
+                    keep_tail = policy.shrink == "keep_tail"
+                    content = self.truncate(section.content, allotted[i], keep_tail)
+                    action = "truncated" if content else "dropped"
+            packed.append(
+                PackedSection(
+                    section.name,
+                    content,
+                    self.count_tokens(content) if action != "kept" else sizes[i],
+                    sizes[i],
+                    action,
+                )
+            )
+        return packed
+
+    def truncate(self, text: str, max_tokens: int, keep_tail: bool = False) -> str:
+        """Cuts `text` to at most `max_tokens`, marking where it was cut.
+
+        The cut is moved to a line break if one is close by.
+        """
+        total = self.count_tokens(text)
+        if total <= max_tokens:
+            return text
+        marker = TRUNCATION_MARKER.format(total - max_tokens)
+
+        def cut(length: int) -> str:
+            if not length:
+                return ""
+            return marker + text[-length:] if keep_tail else text[:length] + marker
+
+        # Find the longest cut that fits
+        low, high = 0, len(text)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.count_tokens(cut(middle)) <= max_tokens:
+                low = middle
+            else:
+                high = middle - 1
+        if low == 0:
+            return ""
+
+        kept = text[-low:] if keep_tail else text[:low]
+        line_break = kept.find("\n") + 1 if keep_tail else kept.rfind("\n")
+        if 0 < line_break and (
+            (keep_tail and line_break < low // 5)
+            or (not keep_tail and line_break > low * 4 // 5)
+        ):
+            low = low - line_break if keep_tail else line_break
+        return cut(low)
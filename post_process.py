@@ -2,13 +2,18 @@ import os
 import json
 import sys
 import argparse
+import time
 
 import warnings
 warnings.filterwarnings("ignore")
 
 import openai
 
-def ask_chatgpt(query, system_message, model="gpt-4.1-mini"):
+from autogpt.llm.metering import get_usage_meter
+from autogpt.llm.routing import get_router
+from autogpt.memory.snapshots import SnapshotStore
+
+def ask_chatgpt(query, system_message, model=None):
     # Read the OpenAI API token from a file
     with open("openai_token.txt") as opt:
         token = opt.read().strip()
@@ -23,10 +28,19 @@ def ask_chatgpt(query, system_message, model="gpt-4.1-mini"):
     ]
 
     # Call the OpenAI API for chat completion
+    router = get_router()
+    model = model or router.model_for("post_process_feedback", "gpt-4.1-mini")
+    started_at = time.perf_counter()
     response = openai.ChatCompletion.create(
         model=model,
         messages=messages
     )
+    get_usage_meter().record_usage(
+        model,
+        response["usage"],
+        time.perf_counter() - started_at,
+        call_site="post_process_feedback",
+    )
 
     # Extract and return the content of the assistant's response
     return response["choices"][0]["message"]["content"]
@@ -64,22 +78,13 @@ def main():
         print(f"Error: {contexts_dir} does not exist.")
         sys.exit(1)
 
-    cycle_files = [f for f in os.listdir(contexts_dir) if f.startswith("cycle_") and f[6:].isdigit()]
-    if not cycle_files:
-        print(f"Error: No cycle files found in {contexts_dir}.")
+    # Rebuild the state of the latest cycle
+    try:
+        file_content = SnapshotStore(contexts_dir).load()
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Error: Failed to load the latest snapshot from {contexts_dir}: {e}")
         sys.exit(1)
 
-    latest_cycle_file = max(cycle_files, key=lambda x: int(x[6:]))
-    latest_cycle_path = os.path.join(contexts_dir, latest_cycle_file)
-
-    # Read the JSON content of the latest cycle file
-    with open(latest_cycle_path, 'r') as f:
-        try:
-            file_content = json.load(f)
-        except json.JSONDecodeError:
-            print(f"Error: Failed to decode JSON from {latest_cycle_path}.")
-            sys.exit(1)
-
     # Extract the desired content
     try:
         extracted_content = file_content["steps_object"]["1"]["result_of_step"]
@@ -0,0 +1,8 @@
+# tests/conftest.py
+
+import os
+import tempfile
+
+# The logger is created on import and writes activity.log and error.log into
+# LOG_DIR, so point it away from the repository's logs/ before any test imports it
+os.environ.setdefault("LOG_DIR", tempfile.mkdtemp(prefix="autogpt-test-logs-"))
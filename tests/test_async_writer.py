@@ -0,0 +1,67 @@
+# tests/test_async_writer.py
+
+import threading
+
+from autogpt.logs.async_writer import AsyncWriter
+
+
+def test_writes_reach_the_disk_on_flush(tmp_path):
+    writer = AsyncWriter(batch_delay=0)
+    writer.write(tmp_path / "a" / "b" / "log.txt", "one\n")
+    writer.write(tmp_path / "a" / "b" / "log.txt", "two\n")
+    writer.write(tmp_path / "state.json", "{}", mode="w")
+    assert writer.flush(timeout=5)
+    assert (tmp_path / "a" / "b" / "log.txt").read_text() == "one\ntwo\n"
+    assert (tmp_path / "state.json").read_text() == "{}"
+    writer.close()
+
+
+def test_writes_to_a_file_are_coalesced(tmp_path):
+    writer = AsyncWriter(batch_delay=0.2)
+    path = tmp_path / "log.txt"
+    path.write_text("old\n")
+    for i in range(5):
+        writer.write(path, f"append {i}\n")
+    writer.write(path, "fresh\n", mode="w")
+    writer.write(path, "after\n")
+    writer.close()
+
+    assert path.read_text() == "fresh\nafter\n"
+    stats = writer.stats()
+    assert stats["requests"] == 7
+    assert stats["writes"] == 1
+    assert stats["coalesced"] == 6
+
+
+def test_full_queue_blocks_until_the_writer_catches_up(tmp_path):
+    writer = AsyncWriter(max_pending=2, batch_delay=0.05)
+    for i in range(20):
+        writer.write(tmp_path / "log.txt", f"{i}\n")
+    writer.close()
+    assert (tmp_path / "log.txt").read_text() == "".join(f"{i}\n" for i in range(20))
+    assert writer.stats()["blocked_seconds"] > 0
+
+
+def test_concurrent_writers_keep_every_line(tmp_path):
+    writer = AsyncWriter(batch_delay=0)
+
+    def write_lines(name):
+        for i in range(100):
+            writer.write(tmp_path / "log.txt", f"{name} {i}\n")
+
+    threads = [threading.Thread(target=write_lines, args=(n,)) for n in "abc"]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    writer.close()
+    assert len((tmp_path / "log.txt").read_text().splitlines()) == 300
+
+
+def test_write_after_close_restarts_the_writer(tmp_path):
+    writer = AsyncWriter(batch_delay=0)
+    writer.write(tmp_path / "log.txt", "one\n")
+    writer.close()
+    writer.write(tmp_path / "log.txt", "two\n")
+    writer.close()
+    assert (tmp_path / "log.txt").read_text() == "one\ntwo\n"
@@ -0,0 +1,110 @@
+# tests/test_command_cache.py
+
+import threading
+
+import pytest
+
+from autogpt.commands.command_cache import (
+    CommandCache,
+    EarlyCommand,
+    is_read_only,
+    is_read_only_call,
+)
+
+
+@pytest.mark.parametrize(
+    "command",
+    [
+        "ls -la",
+        "cat setup.py | grep version",
+        "find . -name '*.toml'",
+        "git status",
+        "pip list",
+        "python --version",
+        "mvn -v",
+        "go version",
+        "java -version",
+        "wc -l < requirements.txt",
+    ],
+)
+def test_read_only_commands(command):
+    assert is_read_only(command)
+
+
+@pytest.mark.parametrize(
+    "command",
+    [
+        "pip install -e .",
+        "ls > files.txt",
+        "cat setup.py; rm setup.py",
+        "ls && make",
+        "find . -name '*.pyc' -delete",
+        "sort -o out.txt in.txt",
+        "cat $(which python)",
+        "git checkout main",
+        "pytest -v",
+        "ls &",
+        "cat 'unterminated",
+        "yarn version",
+        "npm version",
+        "make -version",
+    ],
+)
+def test_writing_commands(command):
+    assert not is_read_only(command)
+
+
+def test_read_only_calls():
+    assert is_read_only_call("linux_terminal", {"command": "ls"})
+    assert is_read_only_call("read_file", {"file_path": "setup.py"})
+    assert not is_read_only_call("write_to_file", {"filename": "a", "text": ""})
+    assert not is_read_only_call("linux_terminal", {"command": "make"})
+
+
+def test_writes_invalidate_cached_outputs():
+    cache = CommandCache()
+    cache.begin("linux_terminal", {"command": "ls"})
+    assert cache.lookup("ls") is None
+    cache.store("ls", "setup.py")
+    cache.begin("linux_terminal", {"command": "ls"})
+    assert cache.lookup("ls  ") == "setup.py"
+    assert cache.hits == 1
+
+    cache.begin("write_to_file", {"filename": "a", "text": ""})
+    assert cache.lookup("ls") is None
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = CommandCache(max_entries=2)
+    cache.store("ls", "1")
+    cache.store("pwd", "2")
+    cache.lookup("ls")
+    cache.store("whoami", "3")
+    assert cache.lookup("pwd") is None
+    assert cache.lookup("ls") == "1"
+
+
+def test_early_command_runs_before_it_is_executed():
+    started, release = threading.Event(), threading.Event()
+
+    def run():
+        started.set()
+        release.wait(5)
+        return "file.txt"
+
+    early = EarlyCommand("linux_terminal", {"command": "ls"}, run)
+    assert started.wait(5)
+    assert early.matches("linux_terminal", {"command": "ls"})
+    assert not early.matches("linux_terminal", {"command": "ls -la"})
+    release.set()
+    assert early.result() == "file.txt"
+
+
+def test_early_command_wait_ignores_errors():
+    def run():
+        raise RuntimeError("container stopped")
+
+    early = EarlyCommand("read_file", {"file_path": "setup.py"}, run)
+    early.wait()
+    with pytest.raises(RuntimeError):
+        early.result()
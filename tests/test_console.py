@@ -0,0 +1,48 @@
+# tests/test_console.py
+
+import io
+import time
+
+from autogpt.logs.console import ConsoleRenderer
+
+THOUGHTS = " ".join(f"word{i}" for i in range(100)) + "\n"
+
+
+def test_batch_output_is_written_as_is():
+    stream = io.StringIO()
+    renderer = ConsoleRenderer(stream, interactive=False)
+    start = time.perf_counter()
+    renderer.write(THOUGHTS, animate=True)
+    renderer.write("done\n")
+    assert renderer.flush(timeout=5)
+    assert time.perf_counter() - start < 0.5
+    assert stream.getvalue() == THOUGHTS + "done\n"
+
+
+def test_animation_does_not_block_the_writer():
+    stream = io.StringIO()
+    renderer = ConsoleRenderer(stream, interactive=True)
+    start = time.perf_counter()
+    renderer.write(THOUGHTS, animate=True)
+    assert time.perf_counter() - start < 0.01
+    time.sleep(0.05)
+    assert stream.getvalue() != THOUGHTS
+    # Flushing prints the rest at once
+    assert renderer.flush(timeout=5)
+    assert stream.getvalue() == THOUGHTS
+
+
+def test_animation_is_skipped_when_output_is_waiting():
+    stream = io.StringIO()
+    renderer = ConsoleRenderer(stream, interactive=True)
+    start = time.perf_counter()
+    for i in range(5):
+        renderer.write(THOUGHTS, animate=True)
+    assert renderer.flush(timeout=5)
+    # Typing all five would take seconds
+    assert time.perf_counter() - start < 0.5
+    assert stream.getvalue() == THOUGHTS * 5
+
+
+def test_interactive_is_detected_from_the_stream():
+    assert not ConsoleRenderer(io.StringIO()).interactive
@@ -0,0 +1,156 @@
+# tests/test_hedging.py
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from autogpt.llm.hedging import HedgeCancelled, Hedger
+from autogpt.llm.metering import UsageMeter
+from autogpt.llm.providers.openai import create_cancellable_chat_completion
+
+
+class MockCompletionServer(ThreadingHTTPServer):
+    """Streams a chat completion after an injected latency"""
+
+    daemon_threads = True
+
+    def __init__(self, latency, content):
+        super().__init__(("127.0.0.1", 0), MockCompletionHandler)
+        self.latency = latency
+        self.content = content
+        self.requests = 0
+
+    @property
+    def api_base(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+
+class MockCompletionHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.requests += 1
+        time.sleep(self.server.latency)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        try:
+            for word in self.server.content.split(" "):
+                chunk = {
+                    "object": "chat.completion.chunk",
+                    "choices": [{"index": 0, "delta": {"content": word + " "}}],
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+                time.sleep(0.01)
+            self.wfile.write(b"data: [DONE]\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def servers():
+    slow = MockCompletionServer(latency=1.0, content="slow response")
+    fast = MockCompletionServer(latency=0.05, content="fast response")
+    for server in (slow, fast):
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield slow, fast
+    for server in (slow, fast):
+        server.shutdown()
+        server.server_close()
+
+
+def warmed_up_meter(call_site, latency, samples=20):
+    meter = UsageMeter()
+    for _ in range(samples):
+        meter.record("gpt-4o-mini", 10, 10, latency=latency, call_site=call_site)
+    return meter
+
+
+def racer(api_base, outcomes):
+    def race(cancelled):
+        try:
+            content = create_cancellable_chat_completion(
+                [{"role": "user", "content": "hi"}],
+                cancelled,
+                model="gpt-4o-mini",
+                api_base=api_base,
+                api_key="test",
+            )
+        except HedgeCancelled:
+            outcomes[api_base] = "cancelled"
+            raise
+        outcomes[api_base] = "completed"
+        return content
+
+    return race
+
+
+def test_slow_call_is_hedged_to_secondary_endpoint(servers):
+    slow, fast = servers
+    hedger = Hedger({}, budget=1.0, meter=warmed_up_meter("summary", 0.1))
+    outcomes = {}
+
+    started_at = time.perf_counter()
+    content = hedger.call(
+        "summary", racer(slow.api_base, outcomes), racer(fast.api_base, outcomes)
+    )
+    elapsed = time.perf_counter() - started_at
+
+    assert content.strip() == "fast response"
+    assert elapsed < 0.8
+    assert hedger.stats.hedges == hedger.stats.hedge_wins == 1
+    assert slow.requests == fast.requests == 1
+
+    hedger._executor.shutdown(wait=True)
+    assert outcomes == {slow.api_base: "cancelled", fast.api_base: "completed"}
+
+
+def test_fast_call_is_not_hedged(servers):
+    slow, fast = servers
+    hedger = Hedger({}, budget=1.0, meter=warmed_up_meter("summary", 1.0))
+    outcomes = {}
+
+    content = hedger.call(
+        "summary", racer(fast.api_base, outcomes), racer(slow.api_base, outcomes)
+    )
+    assert content.strip() == "fast response"
+    assert hedger.stats.hedges == 0
+    assert slow.requests == 0
+
+
+def test_hedges_are_bounded_by_budget():
+    hedger = Hedger({}, budget=0.25, fallback_delay=0.01, meter=UsageMeter())
+
+    def slow(cancelled):
+        cancelled.wait(0.2)
+        if cancelled.is_set():
+            raise HedgeCancelled()
+        return "primary"
+
+    results = [hedger.call("summary", slow, lambda c: "secondary") for _ in range(8)]
+    assert hedger.stats.hedges == 2
+    assert results.count("secondary") == 2
+    assert results.count("primary") == 6
+
+
+def test_error_of_primary_falls_back_to_secondary():
+    hedger = Hedger({}, budget=1.0, fallback_delay=0.01, meter=UsageMeter())
+
+    def failing(cancelled):
+        time.sleep(0.05)
+        raise RuntimeError("primary failed")
+
+    assert hedger.call("summary", failing, lambda c: "secondary") == "secondary"
+
+    def also_failing(cancelled):
+        raise ValueError("secondary failed")
+
+    with pytest.raises((RuntimeError, ValueError)):
+        hedger.call("summary", failing, also_failing)
@@ -0,0 +1,117 @@
+# tests/test_llm_replay.py
+
+import json
+from dataclasses import asdict
+
+import pytest
+
+from autogpt.llm.providers.replay import (
+    LLMReplay,
+    ReplayMissError,
+    import_run_logs,
+    normalize_prompt,
+    parse_prompt_dump,
+    split_prompt_history,
+)
+
+
+def messages(user_content):
+    return [
+        {"role": "system", "content": "You are an agent."},
+        {"role": "user", "content": user_content},
+    ]
+
+
+@pytest.fixture
+def cassette(tmp_path):
+    recorder = LLMReplay("record", tmp_path / "run.jsonl")
+    recorder.record("chat", messages("step 1\nls the repo"), "first")
+    recorder.record("chat", messages("step 1\nls the repo"), "second")
+    recorder.record("ask_llm", messages("summarize"), "summary")
+    return tmp_path / "run.jsonl"
+
+
+def test_normalize_masks_volatile_details():
+    a = normalize_prompt(messages("at 2024-12-09 01:02:03 in 3f2a9b8c7d6e5f40"))
+    b = normalize_prompt(messages("at 2025-01-01 11:12:13  in 0123456789abcdef"))
+    assert a == b
+
+
+def test_exact_replay_serves_in_order(cassette):
+    replay = LLMReplay("replay", cassette)
+    assert replay.lookup("chat", messages("step 1\nls the repo")).content == "first"
+    assert replay.lookup("chat", messages("step 1\nls  the repo")).content == "second"
+    assert replay.lookup("ask_llm", messages("summarize")).content == "summary"
+    assert not replay.divergences
+
+
+def test_exact_replay_misses(cassette):
+    replay = LLMReplay("replay", cassette)
+    with pytest.raises(ReplayMissError):
+        replay.lookup("chat", messages("step 2\nls the repo"))
+    assert replay.divergences[0].resolution == "miss"
+
+
+def test_fuzzy_replay_reports_divergence(cassette, tmp_path):
+    replay = LLMReplay("replay", cassette, match="fuzzy", fuzzy_threshold=0.5)
+    record = replay.lookup("chat", messages("step 2\nls the repo"))
+    assert record.content == "first"
+    divergence = replay.divergences[0]
+    assert divergence.resolution == "fuzzy"
+    assert divergence.recorded_line == "step 1"
+    assert divergence.actual_line == "step 2"
+
+    report = json.loads(replay.write_report(tmp_path / "report.json").read_text())
+    assert report["divergences"][0]["line_number"] == divergence.line_number
+
+
+PROMPT_DUMP = """
+============== ChatSequence ==============
+Length: 12 tokens; 2 messages
+----------------- SYSTEM -----------------
+rules
+
+more rules
+------------------ USER ------------------
+go
+==========================================
+"""
+
+
+def test_prompt_dump_round_trip():
+    parsed = parse_prompt_dump(PROMPT_DUMP)
+    assert parsed == [
+        {"role": "system", "content": "rules\n\nmore rules\n"},
+        {"role": "user", "content": "go\n"},
+    ]
+    assert len(split_prompt_history(PROMPT_DUMP + PROMPT_DUMP)) == 2
+
+
+def test_import_run_logs(tmp_path):
+    log = tmp_path / "project1733702797.0.json"
+    log.write_text(
+        json.dumps(
+            {
+                "project": "project",
+                "language": "Python",
+                "ExecutionAgent_attempt": [
+                    {
+                        "command_name": "linux_terminal",
+                        "command_args": {"command": "ls"},
+                        "command_result": "README.md",
+                        "prompt_content": None,
+                        "result_summary": {"summary": "listed files"},
+                    }
+                ],
+            }
+        )
+    )
+    records = import_run_logs(log)
+    assert json.loads(records[0].content)["command"]["name"] == "linux_terminal"
+    assert json.loads(records[1].content) == {"summary": "listed files"}
+
+    cassette = tmp_path / "imported.jsonl"
+    cassette.write_text("".join(json.dumps(asdict(r)) + "\n" for r in records))
+    replay = LLMReplay("replay", cassette)
+    assert replay.lookup("chat", messages("anything")) is not None
+    assert replay.divergences[0].resolution == "call order"
@@ -0,0 +1,82 @@
+# tests/test_llm_routing.py
+
+import pytest
+
+from autogpt.llm import metering
+from autogpt.llm.metering import UsageMeter, current_call_site, get_usage_meter
+from autogpt.llm.routing import ModelRouter, Route, parse_routes
+
+OWN_MODEL = "gpt-4.1-mini"
+
+
+@pytest.fixture(autouse=True)
+def usage_meter(monkeypatch):
+    monkeypatch.setattr(metering, "_usage_meter", UsageMeter())
+
+
+MODELS = {"fast": "gpt-3.5-turbo-0125", "smart": "gpt-4o-mini"}
+
+
+@pytest.fixture
+def router():
+    return ModelRouter(MODELS, parse_routes(["cycle_planning=fast", "summary=fast"]))
+
+
+def test_call_sites_keep_their_own_model_by_default():
+    router = ModelRouter(MODELS)
+    for call_site in ["cycle_planning", "summary", "progress_bar_cleanup", "other"]:
+        assert router.model_for(call_site, OWN_MODEL) == OWN_MODEL
+    assert router.escalate("cycle_planning", "parse_error", OWN_MODEL) is None
+
+
+def test_call_sites_are_routed_to_tiers(router):
+    assert router.model_for("summary", OWN_MODEL) == "gpt-3.5-turbo-0125"
+    assert router.model_for("replanning", OWN_MODEL) == OWN_MODEL
+    assert router.model_for("replanning", OWN_MODEL, tier="smart") == "gpt-4o-mini"
+
+
+def test_escalates_when_response_does_not_parse(router):
+    models = []
+
+    def query(model):
+        models.append(model)
+        get_usage_meter().record(model, 1000, 100, latency=1.0)
+        return "not json" if model == "gpt-3.5-turbo-0125" else '{"a": 1}'
+
+    result = router.call(
+        "cycle_planning",
+        query,
+        OWN_MODEL,
+        validate=lambda r: None if r.startswith("{") else "parse_error",
+    )
+    assert result == '{"a": 1}'
+    assert models == ["gpt-3.5-turbo-0125", "gpt-4o-mini"]
+
+    snapshot = get_usage_meter().snapshot()
+    fast = snapshot[("cycle_planning", "gpt-3.5-turbo-0125")]
+    assert fast.calls == 1
+    assert fast.escalations["parse_error"] == 1
+    assert snapshot[("cycle_planning", "gpt-4o-mini")].calls == 1
+    assert get_usage_meter().call_site_stats("cycle_planning").cost > 0
+    assert current_call_site() == "default"
+
+
+def test_no_escalation_outside_route(router):
+    calls = []
+    router.call(
+        "doc_analysis", calls.append, OWN_MODEL, validate=lambda r: "parse_error"
+    )
+    assert calls == [OWN_MODEL]
+    assert router.escalate("replanning", "repetition", OWN_MODEL) is None
+    assert router.escalate("cycle_planning", "repetition", OWN_MODEL) == "gpt-4o-mini"
+
+
+def test_parse_routes_keeps_escalation_rules():
+    routes = parse_routes(["cycle_planning=smart", "custom=fast"])
+    assert routes["cycle_planning"] == Route(
+        "smart", frozenset({"parse_error", "repetition"})
+    )
+    assert routes["custom"].tier == "fast"
+    assert parse_routes(["summary=default"])["summary"].tier == "default"
+    with pytest.raises(ValueError):
+        parse_routes(["summary=huge"])
@@ -0,0 +1,63 @@
+# tests/test_local_summary.py
+
+from autogpt.processing.local_summary import LocalSummarizer, command_output
+
+
+def count_tokens(text):
+    return len(text.split())
+
+
+def shell_result(output, note=""):
+    return (
+        "Command linux_terminal returned: "
+        f"Output in terminal after executing the command{note}:\n{output}"
+    )
+
+
+def test_command_output_is_unwrapped():
+    assert command_output(shell_result("a\nb\n")) == "a\nb"
+    assert command_output(shell_result("a", " (cached: no file changed)")) == "a"
+    assert command_output("Command write_to_file returned: File written") == (
+        "File written"
+    )
+
+
+def test_trivial_results_are_summarized_locally():
+    summarizer = LocalSummarizer(count_tokens)
+    empty = summarizer.summarize("cd src", shell_result(""))
+    assert empty["summary"] == "The command completed without any output."
+    assert set(empty) == {"summary", "Setup details:", "Meaningful next setps"}
+
+    short = summarizer.summarize("ls", shell_result("setup.py  src  tests"))
+    assert "setup.py  src  tests" in short["summary"]
+
+    pip = "\n".join(
+        [f"Collecting package{i}\n  Downloading package{i}.whl" for i in range(50)]
+        + ["Successfully installed " + " ".join(f"package{i}" for i in range(50))]
+    )
+    installed = summarizer.summarize("pip install -r requirements.txt", shell_result(pip))
+    assert installed["summary"].startswith("The command succeeded: Successfully installed")
+    assert summarizer.stats() == {"local": 3, "llm": 0, "avoided_fraction": 1.0}
+
+
+def test_trouble_is_escalated():
+    summarizer = LocalSummarizer(count_tokens)
+    assert summarizer.summarize("cd src", shell_result("bash: cd: src: No such file")) is None
+    build = "\n".join(["[INFO] Compiling"] * 100 + ["[ERROR] cannot find symbol"])
+    assert summarizer.summarize("mvn compile", shell_result(build)) is None
+    assert summarizer.summarize("mvn dependency:tree", shell_result("[INFO] x\n" * 100)) is None
+    assert summarizer.stats() == {"local": 0, "llm": 3, "avoided_fraction": 0.0}
+
+
+def test_repeated_outputs_reuse_earlier_summaries():
+    summarizer = LocalSummarizer(count_tokens)
+    build = shell_result("[INFO] Compiling\n" * 100 + "[ERROR] cannot find symbol")
+    assert summarizer.summarize("mvn compile", build) is None
+    summarizer.record("mvn compile", build, {"summary": "missing symbol"})
+
+    assert summarizer.summarize("mvn compile", build) == {"summary": "missing symbol"}
+    # Served from the command cache, the output is the same
+    cached = build.replace("command:", "command (cached: no file changed):")
+    assert summarizer.summarize("mvn compile", cached) == {"summary": "missing symbol"}
+    assert summarizer.summarize("mvn compile", build + "\nother") is None
+    assert summarizer.summarize("mvn test", build) is None
@@ -0,0 +1,88 @@
+# tests/test_loop_detector.py
+
+import time
+
+import pytest
+
+from autogpt.memory.loop_detector import LoopDetector, normalize_command
+
+
+def shell(command):
+    return {"name": "linux_terminal", "args": {"command": command}}
+
+
+A, B, C, D = (shell(c) for c in ("ls", "pip install .", "pytest", "cat setup.py"))
+
+
+def feed(detector, commands):
+    loops = [detector.push(command) for command in commands]
+    return loops[-1], loops[:-1]
+
+
+@pytest.mark.parametrize(
+    "commands, period",
+    [
+        ([A] * 6, 1),
+        ([A, B] * 3, 2),
+        ([A, B, C] * 2, 3),
+        ([A, B, C, D] * 2, 4),
+    ],
+)
+def test_periodic_loops(commands, period):
+    loop, earlier = feed(LoopDetector(), [shell("git status"), shell("make")] + commands)
+    assert not any(earlier)
+    assert loop.kind == "periodic"
+    assert loop.period == period
+    assert loop.exact
+    assert len(loop.commands) == max(6, 2 * period)
+
+
+def test_runs_loop():
+    loop, earlier = feed(LoopDetector(), [A, A, A, B, B, B])
+    assert not any(earlier)
+    assert loop.kind == "runs"
+    assert len(loop.commands) == 6
+
+
+def test_progress_is_not_a_loop():
+    detector = LoopDetector()
+    assert not any(detector.push(shell(f"pytest tests/test_{i}.py")) for i in range(50))
+    assert not any(detector.push(c) for c in [A, B, A, C, A, D, B, C])
+
+
+def test_near_duplicates():
+    assert normalize_command(shell("pip  install -q  .")) == normalize_command(
+        shell("pip install . -q || exit 0")
+    )
+    assert normalize_command(shell("pytest -x")) != normalize_command(shell("pytest -v"))
+    assert normalize_command(shell("pytest -x"), strict=False) == normalize_command(
+        shell("pytest -v"), strict=False
+    )
+
+    loop, _ = feed(LoopDetector(), [shell(f"pytest -{flag}") for flag in "xvqsxv"])
+    assert loop.period == 1
+    assert not loop.exact
+
+
+def test_check_does_not_change_the_stream():
+    detector = LoopDetector()
+    feed(detector, [A] * 5)
+    assert detector.check(A).period == 1
+    assert detector.check(B) is None
+    assert detector.push(B) is None
+
+
+def test_cost_per_command_is_constant():
+    detector = LoopDetector()
+    commands = [shell(f"echo {i}") for i in range(20000)]
+
+    def time_pushes(batch):
+        start = time.perf_counter()
+        for command in batch:
+            detector.push(command)
+        return time.perf_counter() - start
+
+    first = time_pushes(commands[:1000])
+    time_pushes(commands[1000:19000])
+    last = time_pushes(commands[19000:])
+    assert last < first * 3
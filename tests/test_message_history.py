@@ -0,0 +1,108 @@
+# tests/test_message_history.py
+
+import json
+from types import SimpleNamespace
+
+import pytest
+import tiktoken
+
+# The history module pulls in the application config and its dependencies
+message_history = pytest.importorskip("autogpt.memory.message_history")
+
+from autogpt.llm import tokens
+from autogpt.llm.base import Message
+from autogpt.llm.providers.openai import OPEN_AI_CHAT_MODELS
+
+MessageHistory = message_history.MessageHistory
+CONFIG = SimpleNamespace(fast_llm="gpt-3.5-turbo", debug_mode=False)
+
+
+def reply(command):
+    return json.dumps({"thoughts": "thinking", "command": {"name": command, "args": {}}})
+
+
+class WhitespaceEncoding:
+    def encode(self, text):
+        return text.split()
+
+
+@pytest.fixture
+def history(monkeypatch):
+    tokens.get_encoding.cache_clear()
+    tokens._count_tokens.cache_clear()
+    monkeypatch.setattr(tiktoken, "encoding_for_model", lambda m: WhitespaceEncoding())
+    history = MessageHistory(OPEN_AI_CHAT_MODELS["gpt-3.5-turbo"])
+    history.batches = []
+    monkeypatch.setattr(
+        history,
+        "_update_summary_with_batch",
+        lambda batch, config, max_length: history.batches.append(batch),
+    )
+    yield history
+    tokens.get_encoding.cache_clear()
+    tokens._count_tokens.cache_clear()
+
+
+def add_cycle(history, i):
+    history.add("user", f"instruction {i}")
+    history.add("assistant", reply(f"command_{i}"), "ai_response")
+    history.add("user", f"result {i}", "action_result")
+
+
+def test_messages_get_increasing_ids(history):
+    for i in range(3):
+        add_cycle(history, i)
+    ids = [m._history_id for m in history]
+    assert ids == sorted(ids) and len(set(ids)) == len(ids)
+    assert history.messages_since(ids[5]) == history.messages[6:]
+
+
+def test_trimming_only_summarizes_new_messages(history):
+    for i in range(3):
+        add_cycle(history, i)
+    chain = history.messages[-3:]
+    _, trimmed = history.trim_messages(chain, CONFIG)
+    assert trimmed == history.messages[:6]
+
+    # An equal message that is not part of the history does not hide one that is
+    chain = [Message("user", "result 3", "action_result")]
+    add_cycle(history, 3)
+    _, trimmed = history.trim_messages(chain, CONFIG)
+    assert trimmed == history.messages[6:]
+
+    assert history.trim_messages(history.messages, CONFIG)[1] == []
+
+
+def test_summary_events_are_rewritten_without_changing_history(history):
+    add_cycle(history, 0)
+    history.add("system", "command timed out")
+    history.trim_messages([], CONFIG)
+
+    [batch] = history.batches
+    assert [m.role for m in batch] == ["you", "your computer"]
+    assert json.loads(batch[0].content) == {"command": {"name": "command_0", "args": {}}}
+    assert history.messages[1].role == "assistant"
+    assert "thoughts" in history.messages[1].content
+
+
+def test_added_replies_are_not_parsed_again(history, monkeypatch):
+    calls = []
+    parse = message_history.parse_response
+    monkeypatch.setattr(
+        message_history,
+        "parse_response",
+        lambda content: calls.append(content) or parse(content),
+    )
+    for i in range(3):
+        history.add("user", f"instruction {i}")
+        history.add_reply(parse(reply(f"command_{i}")))
+        history.add("user", f"result {i}", "action_result")
+    for _ in range(5):
+        assert len(list(history.per_cycle())) == 3
+    history.trim_messages([], CONFIG)
+    assert calls == []
+
+    # Replies added as plain messages are parsed when needed
+    add_cycle(history, 3)
+    assert len(list(history.per_cycle())) == 4
+    assert calls == [reply("command_3")]
@@ -0,0 +1,74 @@
+# tests/test_message_list.py
+
+import copy
+import time
+
+import pytest
+
+from autogpt.llm.base import ChatSequence, Message
+from autogpt.llm.message_list import MessageList
+
+
+def messages(n, prefix="message"):
+    return [Message("user", f"{prefix} {i}") for i in range(n)]
+
+
+def test_slices_are_views():
+    full = MessageList(messages(5))
+    view = full[1:4]
+    assert view == messages(5)[1:4]
+    assert view._storage is full._storage
+    assert view[-1] == Message("user", "message 3")
+    with pytest.raises(IndexError):
+        view[3]
+
+
+def test_changes_are_copy_on_write():
+    full = MessageList(messages(5))
+    prefix = full[:3]
+    prefix.append(Message("user", "new"))
+    assert full == messages(5)
+    assert list(prefix) == messages(3) + [Message("user", "new")]
+
+    full[0] = Message("system", "changed")
+    assert prefix[0] == Message("user", "message 0")
+    del full[1]
+    full.insert(0, Message("user", "first"))
+    assert len(full) == 5 and len(prefix) == 4
+
+
+def test_truncated_history_reuses_storage():
+    history = ChatSequence.for_model("gpt-4", messages(6))
+    storage = history.messages._storage
+    history = history[:-2]
+    history.add("user", "next")
+    assert history.messages._storage is storage
+    assert list(history) == messages(4) + [Message("user", "next")]
+
+
+def test_copies_are_independent():
+    full = MessageList(messages(3))
+    for duplicate in (copy.copy(full[:2]), copy.deepcopy(full[:2])):
+        duplicate.append(Message("user", "other"))
+        assert full == messages(3)
+
+
+def test_per_cycle_history_cost_is_flat():
+    """What the agent loop does each cycle: add a step and drop the summary cycle"""
+    output = "x" * 20_000
+
+    def time_cycles(history, cycles=200):
+        start = time.perf_counter()
+        for i in range(cycles):
+            history.add("user", f"prompt {i}")
+            history.add("assistant", "{}", "ai_response")
+            history.add("user", output, "action_result")
+            history.add("user", "summary prompt")
+            history.add("assistant", "{}")
+            history = history[:-2]
+        return time.perf_counter() - start
+
+    short = ChatSequence.for_model("gpt-4", messages(100))
+    long = ChatSequence.for_model("gpt-4", [Message("user", output)] * 50_000)
+    time_cycles(short)
+    assert time_cycles(long) < time_cycles(short) * 3 + 0.01
@@ -0,0 +1,94 @@
+# tests/test_metering.py
+
+import threading
+
+import pytest
+
+from autogpt.llm.metering import (
+    UsageMeter,
+    current_call_site,
+    estimate_cost,
+    using_call_site,
+)
+
+
+@pytest.fixture
+def meter():
+    return UsageMeter()
+
+
+def test_records_per_call_site_and_model(meter):
+    with using_call_site("summary"):
+        meter.record("gpt-3.5-turbo-0125", 1000, 100, latency=2.0)
+        meter.record_retry("gpt-3.5-turbo-0125")
+    meter.record("gpt-4o-mini", 500, 50, latency=1.0, call_site="replanning")
+    meter.record_cache_hit("gpt-4o-mini", call_site="replanning")
+
+    snapshot = meter.snapshot()
+    summary = snapshot[("summary", "gpt-3.5-turbo-0125")]
+    assert (summary.calls, summary.prompt_tokens, summary.completion_tokens) == (
+        1,
+        1000,
+        100,
+    )
+    assert summary.retries == 1
+    assert summary.cost == pytest.approx(
+        estimate_cost("gpt-3.5-turbo-0125", 1000, 100)
+    )
+    assert snapshot[("replanning", "gpt-4o-mini")].cache_hits == 1
+    assert meter.total().calls == 2
+    assert current_call_site() == "default"
+
+
+def test_records_usage_of_api_responses(meter):
+    usage = {
+        "prompt_tokens": 2000,
+        "completion_tokens": 10,
+        "prompt_tokens_details": {"cached_tokens": 1536},
+    }
+    meter.record_usage("gpt-4o-mini", usage, latency=0.5)
+    meter.record_usage("text-embedding-ada-002", {"prompt_tokens": 8})
+
+    stats = meter.snapshot()[("default", "gpt-4o-mini")]
+    assert stats.cached_prompt_tokens == 1536
+    assert stats.latencies == [0.5]
+    assert meter.total().prompt_tokens == 2008
+
+
+def test_latency_percentiles(meter):
+    for latency in range(1, 101):
+        meter.record("gpt-4o-mini", 1, 1, latency=float(latency))
+    stats = meter.call_site_stats("default")
+    assert stats.latency_percentile(50) == pytest.approx(50, abs=1)
+    assert stats.latency_percentile(95) == pytest.approx(95, abs=1)
+    assert stats.latency_percentile(100) == 100
+    assert meter.call_site_stats("unknown").latency_percentile(50) is None
+
+
+def test_concurrent_recording_is_not_lost(meter):
+    threads, calls_per_thread = 8, 2000
+
+    def work(i):
+        with using_call_site(f"site_{i % 2}"):
+            for _ in range(calls_per_thread):
+                meter.record("gpt-4o-mini", 3, 1, latency=0.01)
+
+    workers = [threading.Thread(target=work, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    total = meter.total()
+    assert total.calls == threads * calls_per_thread
+    assert total.prompt_tokens == 3 * threads * calls_per_thread
+    assert meter.call_site_stats("site_0").calls == threads // 2 * calls_per_thread
+
+
+def test_report_lists_call_sites(meter):
+    meter.record("gpt-4o-mini", 1000, 10, latency=1.5, call_site="summary")
+    meter.record_escalation("gpt-4o-mini", "parse_error", call_site="summary")
+    report = meter.report()
+    assert "summary" in report
+    assert "gpt-4o-mini" in report
+    assert "Total: 1 calls" in report
@@ -0,0 +1,62 @@
+# tests/test_parsable_log.py
+
+import json
+
+import pytest
+
+from autogpt.logs.parsable_log import ATTEMPTS_KEY, ParsableLog, load_parsable_log
+
+
+def write_run(path, fsync="close", cycles=3):
+    log = ParsableLog(path, fsync=fsync, project="gson", language="Java")
+    for i in range(cycles):
+        log.attempt(command_name="linux_terminal", command_args={"command": f"ls {i}"})
+        log.update_attempt(result_summary={"summary": f"listed {i}"})
+        log.update_run(summary_calls={"local": i})
+    return log
+
+
+def test_events_are_appended(tmp_path):
+    path = tmp_path / "run.jsonl"
+    log = write_run(path)
+    assert len(path.read_text().splitlines()) == 1 + 3 * 3
+
+    run = load_parsable_log(path)
+    assert run["project"] == "gson" and run["summary_calls"] == {"local": 2}
+    assert run[ATTEMPTS_KEY][1] == {
+        "command_name": "linux_terminal",
+        "command_args": {"command": "ls 1"},
+        "result_summary": {"summary": "listed 1"},
+    }
+    log.close()
+
+
+def test_close_compacts_the_log(tmp_path):
+    path = tmp_path / "run.jsonl"
+    log = write_run(path, fsync="always")
+    before = load_parsable_log(path)
+    log.close()
+    log.close()
+    assert len(path.read_text().splitlines()) == 1 + 3
+    assert load_parsable_log(path) == before
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_incomplete_last_line_is_ignored(tmp_path):
+    path = tmp_path / "run.jsonl"
+    write_run(path, fsync="never", cycles=2).close(compact=False)
+    with open(path, "a") as f:
+        f.write('{"event": "attempt", "command_na')
+    assert len(load_parsable_log(path)[ATTEMPTS_KEY]) == 2
+
+
+def test_former_json_logs_are_read(tmp_path):
+    path = tmp_path / "run.json"
+    content = {"project": "gson", ATTEMPTS_KEY: [{"command_name": "ls"}]}
+    path.write_text(json.dumps(content))
+    assert load_parsable_log(path) == content
+
+
+def test_unknown_fsync_policy(tmp_path):
+    with pytest.raises(ValueError):
+        ParsableLog(tmp_path / "run.jsonl", fsync="sometimes")
@@ -0,0 +1,103 @@
+# tests/test_prompt_archive.py
+
+import json
+
+from autogpt.llm.providers.replay import import_run_logs
+from autogpt.logs.prompt_archive import PromptArchive, main, split_sections
+
+GUIDELINES = "## Guidelines\n" + "\n".join(f"- rule {i}" for i in range(200))
+
+
+def prompt(cycle, cycle_type="CMD"):
+    return (
+        "\n============== ChatSequence ==============\n"
+        f"Length: {1000 + cycle} tokens; 2 messages\n"
+        "----------------- SYSTEM -----------------\n"
+        "You are an agent.\n\n"
+        f"{GUIDELINES}\n\n"
+        "------------------ USER ------------------\n"
+        f"{cycle_type} cycle {cycle}\n\n\n"
+        "Last command: ls\n"
+        "==========================================\n"
+    )
+
+
+def test_split_sections_round_trips():
+    text = "a\n\nb\n\n\nc\n"
+    assert "".join(split_sections(text)) == text
+    assert split_sections(text) == ["a\n\n", "b\n\n", "\n", "c\n"]
+
+
+def test_prompts_round_trip_and_deduplicate(tmp_path):
+    archive = PromptArchive(tmp_path)
+    prompts = [prompt(i, "CMD" if i % 2 else "SUMMARY") for i in range(10)]
+    for i, text in enumerate(prompts):
+        assert archive.append("CMD" if i % 2 else "SUMMARY", text) == i
+
+    assert [archive.prompt(i) for i in range(10)] == prompts
+    assert [p for _, p in archive.prompts()] == prompts
+    assert archive.cycle_type(0) == "SUMMARY"
+
+    stats = archive.stats()
+    assert stats["cycles"] == 10
+    assert stats["unique_sections"] < stats["sections"]
+    assert stats["archived_bytes"] < len(GUIDELINES)
+
+
+def test_reopened_archive_keeps_appending(tmp_path):
+    archive = PromptArchive(tmp_path)
+    archive.append("CMD", prompt(0))
+    reopened = PromptArchive(tmp_path)
+    assert reopened.append("CMD", prompt(1)) == 1
+    assert PromptArchive(tmp_path).prompt(1) == prompt(1)
+
+
+def test_incomplete_last_line_is_dropped(tmp_path):
+    archive = PromptArchive(tmp_path)
+    archive.append("CMD", prompt(0))
+    archive.append("CMD", prompt(1))
+    with open(tmp_path / "cycles.jsonl", "a") as f:
+        f.write('{"type": "CMD", "sect')
+
+    reopened = PromptArchive(tmp_path)
+    assert len(reopened) == 2
+    reopened.append("CMD", prompt(2))
+    assert PromptArchive(tmp_path).prompt(2) == prompt(2)
+
+
+def test_diff_and_cli(tmp_path, capsys):
+    archive = PromptArchive(tmp_path)
+    archive.append("CMD", prompt(0))
+    archive.append("CMD", prompt(1))
+    diff = archive.diff(1)
+    assert "-CMD cycle 0" in diff and "+CMD cycle 1" in diff
+    assert "rule 5" not in diff
+
+    main([str(tmp_path), "show", "1"])
+    assert capsys.readouterr().out == prompt(1)
+    main([str(tmp_path), "list"])
+    assert capsys.readouterr().out == "0 CMD\n1 CMD\n"
+
+
+def test_replay_import_reads_the_archive(tmp_path):
+    log = tmp_path / "project.json"
+    log.write_text(
+        json.dumps(
+            {
+                "ExecutionAgent_attempt": [
+                    {
+                        "command_name": "linux_terminal",
+                        "command_args": {"command": "ls"},
+                        "result_summary": {"summary": "listed files"},
+                    }
+                ]
+            }
+        )
+    )
+    archive = PromptArchive(tmp_path / "archive")
+    archive.append("CMD", prompt(0))
+    archive.append("SUMMARY", prompt(0, "SUMMARY"))
+
+    records = import_run_logs(log, prompt_archive=tmp_path / "archive")
+    assert len(records) == 2
+    assert all(record.prompt for record in records)
@@ -0,0 +1,98 @@
+# tests/test_prompt_assembler.py
+
+import json
+import os
+
+import pytest
+
+from autogpt.prompts.assembler import FileCache, PromptAssembler
+from autogpt.prompts.layout import Stability
+
+
+@pytest.fixture
+def files(tmp_path):
+    paths = {
+        "memory": tmp_path / "problems_memory",
+        "dockerfile": tmp_path / "Dockerfile",
+        "dockerfile_copy": tmp_path / "docker" / "Dockerfile",
+        "interface": tmp_path / "commands_interface.json",
+    }
+    paths["dockerfile_copy"].parent.mkdir()
+    paths["memory"].write_text("pip install fails without --user")
+    paths["dockerfile"].write_text("FROM python:3.11\nRUN pip install .\n")
+    paths["dockerfile_copy"].write_text("FROM python:3.11\nRUN pip install .\n")
+    paths["interface"].write_text(json.dumps({"linux_terminal": ["command"]}))
+    return {name: str(path) for name, path in paths.items()}
+
+
+def assemble(assembler, files, cycle):
+    assembler.begin()
+    assembler.add("goals", "Run the tests.\n")
+    assembler.add_file("problems_memory", files["memory"], "Learned: {}\n")
+    dockerfiles = ""
+    for path in (files["dockerfile"], files["dockerfile_copy"]):
+        if (content := assembler.file_block(path)) is not None:
+            dockerfiles += f"{path}\n```\n{content}```\n"
+    assembler.add("dockerfiles", dockerfiles)
+    assembler.add("cycle", f"Cycle {cycle}", Stability.CYCLE)
+    return assembler.render()
+
+
+def test_steady_state_cycles_do_not_read_files(files):
+    assembler = PromptAssembler(count_tokens=lambda text: len(text.split()))
+    first = assemble(assembler, files, 1)
+    reads = assembler.files.reads
+    for cycle in range(2, 6):
+        prompt = assemble(assembler, files, cycle)
+        assert prompt.replace(f"Cycle {cycle}", "Cycle 1") == first
+    assert assembler.files.reads == reads
+
+
+def test_changed_files_are_read_again(files):
+    cache = FileCache()
+    assert cache.read(files["memory"]) == "pip install fails without --user"
+
+    with open(files["memory"], "w") as f:
+        f.write("use a venv")
+    stat = os.stat(files["memory"])
+    os.utime(files["memory"], ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert cache.read(files["memory"]) == "use a venv"
+    assert cache.reads == 2
+
+    os.remove(files["memory"])
+    assert cache.read(files["memory"]) is None
+
+
+def test_parsed_files_are_cached(files):
+    cache = FileCache()
+    interface = cache.read_json(files["interface"])
+    assert interface == {"linux_terminal": ["command"]}
+    assert cache.read_json(files["interface"]) is interface
+    assert cache.read(files["interface"]) == json.dumps(interface)
+    assert cache.reads == 2
+
+
+def test_duplicate_content_is_left_out(files):
+    assembler = PromptAssembler(count_tokens=lambda text: len(text.split()))
+    prompt = assemble(assembler, files, 1)
+    assert prompt.count("FROM python:3.11") == 1
+
+    assembler.begin()
+    assert assembler.add("summary", "RUN pip install .")
+    assert not assembler.add("summary_again", "RUN pip install .")
+    # A file quoted verbatim by an earlier section is not repeated
+    assembler.add("quote", "The repo uses:\nFROM python:3.11\nRUN pip install .\n")
+    assert assembler.file_block(files["dockerfile"]) is None
+
+
+def test_token_breakdown_per_section(files):
+    assembler = PromptAssembler(count_tokens=lambda text: len(text.split()))
+    assemble(assembler, files, 1)
+    assert list(assembler.breakdown) == [
+        "goals",
+        "problems_memory",
+        "dockerfiles",
+        "cycle",
+    ]
+    assert assembler.breakdown["goals"] == 3
+    assert "cycle: 2" in assembler.breakdown_text()
@@ -0,0 +1,98 @@
+# tests/test_prompt_layout.py
+
+import pytest
+
+from autogpt.prompts.layout import (
+    PrefixCacheTracker,
+    PromptLayout,
+    Stability,
+    common_prefix_length,
+)
+
+STATIC_SECTIONS = {
+    "goals": "Set up the project and run its tests.\n" * 50,
+    "commands": "linux_terminal: run a command\n" * 50,
+    "dockerfiles": "FROM python:3.11\nRUN pip install .\n" * 20,
+}
+
+
+def build_prompt(executed_steps, cycle_type, last_result=""):
+    """Adds the sections in an order that interleaves volatile and static parts"""
+    layout = PromptLayout(separator="\n")
+    layout.add("goals", STATIC_SECTIONS["goals"])
+    layout.add("cycle_instruction", f"Do a {cycle_type} cycle.", Stability.CYCLE)
+    layout.add("commands", STATIC_SECTIONS["commands"])
+    layout.add(
+        "executed_steps",
+        "".join(f"{i}. {step}\n" for i, step in enumerate(executed_steps)),
+        Stability.APPEND_ONLY,
+    )
+    layout.add("dockerfiles", STATIC_SECTIONS["dockerfiles"])
+    layout.add("last_result", last_result, Stability.CYCLE)
+    return [
+        {"role": "system", "content": "You are an agent."},
+        {"role": "user", "content": layout.render()},
+    ]
+
+
+def run_cycles(n):
+    steps = []
+    for i in range(n):
+        yield build_prompt(steps, "CMD", f"cwd: /app/{i}")
+        yield build_prompt(steps, "SUMMARY", f"output of command {i}")
+        steps.append(f"command {i} in /app/{i}")
+
+
+def test_sections_are_ordered_by_stability():
+    layout = PromptLayout()
+    layout.add("volatile", "c", Stability.CYCLE)
+    layout.add("history", "b", Stability.APPEND_ONLY)
+    layout.add("first", "a1")
+    layout.add("empty", "")
+    layout.add("second", "a2")
+    assert [s.name for s in layout.ordered_sections()] == [
+        "first",
+        "second",
+        "history",
+        "volatile",
+    ]
+    assert layout.render() == "a1\na2\nb\nc"
+
+
+def test_prefix_is_stable_across_cycles():
+    prompts = [p[1]["content"] for p in run_cycles(6)]
+    static_prefix = "\n".join(
+        STATIC_SECTIONS[name] for name in ("goals", "commands", "dockerfiles")
+    )
+    for previous, current in zip(prompts, prompts[1:]):
+        assert current.startswith(static_prefix)
+        # Everything but the volatile tail of the previous prompt is reused
+        assert common_prefix_length(previous, current) >= len(static_prefix)
+
+    # The executed steps of earlier cycles stay in place as new ones are added
+    cmd_prompts = prompts[::2]
+    for previous, current in zip(cmd_prompts, cmd_prompts[1:]):
+        history = previous[len(static_prefix) : previous.index("Do a CMD cycle.")]
+        assert current.startswith(static_prefix + history.rstrip("\n"))
+
+
+def test_cacheable_fraction_is_measured():
+    tracker = PrefixCacheTracker(count_tokens=len, min_prefix_tokens=100)
+    stats = [tracker.observe(prompt) for prompt in run_cycles(5)]
+    assert stats[0].cacheable_tokens == 0
+    assert all(s.cacheable_fraction > 0.9 for s in stats[1:])
+    assert 0.8 < tracker.overall_fraction() < 1
+
+
+def test_short_prefixes_are_not_cacheable():
+    tracker = PrefixCacheTracker(count_tokens=len, min_prefix_tokens=10_000)
+    prompt = [{"role": "user", "content": "a" * 100}]
+    tracker.observe(prompt)
+    assert tracker.observe(prompt).cacheable_tokens == 0
+
+
+@pytest.mark.parametrize(
+    "a, b, expected", [("abc", "abd", 2), ("", "x", 0), ("ab", "ab", 2)]
+)
+def test_common_prefix_length(a, b, expected):
+    assert common_prefix_length(a, b) == expected
@@ -0,0 +1,136 @@
+# tests/test_prompt_packer.py
+
+import re
+
+import pytest
+
+from autogpt.prompts.assembler import PromptAssembler
+from autogpt.prompts.layout import PromptSection, Stability
+from autogpt.prompts.packer import REQUIRED, PromptPacker, SectionPolicy
+
+
+def count_tokens(text):
+    return len(text.split())
+
+
+def words(prefix, n):
+    return "\n".join(f"{prefix}{i}" for i in range(n)) + "\n"
+
+
+POLICIES = {
+    "goals": REQUIRED,
+    "guidelines": SectionPolicy(priority=70, min_tokens=10),
+    "dockerfiles": SectionPolicy(priority=40, shrink="summary"),
+    "workflows": SectionPolicy(priority=30, shrink="drop"),
+    "history": SectionPolicy(priority=20, min_tokens=20, shrink="keep_tail"),
+}
+
+
+@pytest.fixture
+def packer():
+    return PromptPacker(count_tokens, POLICIES)
+
+
+@pytest.fixture
+def sections():
+    return [
+        PromptSection("goals", words("goal", 10), Stability.STATIC),
+        PromptSection("guidelines", words("guideline", 50), Stability.STATIC),
+        PromptSection("dockerfiles", words("docker", 40), Stability.STATIC),
+        PromptSection("workflows", words("workflow", 40), Stability.STATIC),
+        PromptSection("history", words("step", 100), Stability.APPEND_ONLY),
+    ]
+
+
+def test_everything_fits(packer, sections):
+    packed = packer.pack(sections, budget=1000)
+    assert [p.action for p in packed] == ["kept"] * 5
+    assert [p.content for p in packed] == [s.content for s in sections]
+
+
+def test_lower_priority_sections_are_shrunk_first(packer, sections):
+    summaries = {"dockerfiles": "Dockerfiles: Dockerfile"}
+    packed = {p.name: p for p in packer.pack(sections, 150, summaries)}
+
+    assert packed["goals"].action == "kept"
+    assert packed["guidelines"].action == "kept"
+    assert packed["dockerfiles"].action == "kept"
+    assert packed["workflows"].action == "dropped"
+    assert packed["history"].action == "truncated"
+    assert sum(p.tokens for p in packed.values()) <= 150
+
+    packed = {p.name: p for p in packer.pack(sections, 90, summaries)}
+    assert packed["dockerfiles"].action == "summarized"
+    assert packed["dockerfiles"].content == "Dockerfiles: Dockerfile"
+    assert packed["guidelines"].action == "kept"
+    assert sum(p.tokens for p in packed.values()) <= 90
+
+
+def test_tail_is_kept_and_minimum_respected(packer, sections):
+    packed = {p.name: p for p in packer.pack(sections, 40)}
+
+    history = packed["history"]
+    assert history.action == "truncated"
+    assert history.content.rstrip().endswith("step99")
+    assert "tokens left out" in history.content
+    assert 20 <= history.tokens <= 25
+    assert packed["guidelines"].action == "truncated"
+    assert packed["guidelines"].content.startswith("guideline0\n")
+    assert sum(p.tokens for p in packed.values()) <= 40
+
+    # Not even the minimum of the history fits anymore
+    packed = {p.name: p for p in packer.pack(sections, 35)}
+    assert packed["history"].action == "dropped"
+
+
+def test_required_sections_are_never_cut(packer, sections):
+    packed = {p.name: p for p in packer.pack(sections, 5)}
+    assert packed["goals"].action == "kept"
+    assert all(
+        p.action == "dropped" for name, p in packed.items() if name != "goals"
+    )
+
+
+def test_max_tokens_caps_sections_within_budget():
+    packer = PromptPacker(count_tokens, {"log": SectionPolicy(max_tokens=20)})
+    [packed] = packer.pack([PromptSection("log", words("line", 100), 0)], 1000)
+    assert packed.action == "truncated"
+    assert packed.tokens <= 20
+
+
+def test_packing_is_deterministic(packer, sections):
+    results = {
+        tuple((p.name, p.content) for p in packer.pack(sections, 120))
+        for _ in range(5)
+    }
+    assert len(results) == 1
+
+
+def test_assembler_logs_cuts(sections):
+    assembler = PromptAssembler(
+        count_tokens, packer=PromptPacker(count_tokens, POLICIES), separator=""
+    )
+    for section in sections:
+        assembler.add(section.name, section.content, section.stability)
+    prompt = assembler.render(budget=150)
+    assert "workflow0" not in prompt
+    assert prompt.startswith("goal0\n")
+    assert {p.name for p in assembler.cuts} == {"workflows", "history"}
+    assert "workflows" not in assembler.breakdown
+
+
+def test_prefix_is_stable_while_history_grows(sections):
+    assembler = PromptAssembler(
+        count_tokens, packer=PromptPacker(count_tokens, POLICIES), separator=""
+    )
+    prefixes = set()
+    for steps in range(0, 120, 7):
+        assembler.begin()
+        for section in sections[:-1]:
+            assembler.add(section.name, section.content, section.stability)
+        assembler.add("history", "history\n" + words("step", steps), Stability.APPEND_ONLY)
+        prompt = assembler.render(budget=55)
+        assert "guidelines" in {p.name for p in assembler.cuts}
+        # The history is the last section; it may have lost its start
+        prefixes.add(re.split(r"history\n|\n\[\.\.\.|step", prompt, 1)[0])
+    assert len(prefixes) == 1
@@ -0,0 +1,114 @@
+# tests/test_rate_limiter.py
+
+import threading
+
+import pytest
+
+from autogpt.llm.rate_limiter import (
+    AdaptiveConcurrencyLimiter,
+    RateLimiter,
+    SharedTokenBucket,
+    TokenBucket,
+    estimate_request_tokens,
+    full_jitter_backoff,
+    parse_reset_duration,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_waits_for_refill():
+    clock = FakeClock()
+    bucket = TokenBucket(capacity=60, refill_rate=1, clock=clock)
+    assert bucket.reserve(60) == 0
+    assert bucket.reserve(10) == pytest.approx(10)
+    clock.now = 20
+    assert bucket.reserve(5) == 0
+
+
+def test_token_bucket_sync_only_lowers_level():
+    clock = FakeClock()
+    bucket = TokenBucket(capacity=100, refill_rate=1, clock=clock)
+    bucket.sync(1000)
+    assert bucket.reserve(100) == 0
+    bucket.sync(0)
+    assert bucket.reserve(1) == pytest.approx(1)
+
+
+def test_shared_bucket_is_shared_through_file(tmp_path):
+    state_file = tmp_path / "limits.json"
+    a = SharedTokenBucket(state_file, "requests", capacity=2, refill_rate=0.01)
+    b = SharedTokenBucket(state_file, "requests", capacity=2, refill_rate=0.01)
+    assert a.reserve(1) == 0
+    assert b.reserve(1) == 0
+    assert a.reserve(1) > 0
+
+
+def test_aimd_concurrency():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=8)
+    limiter.on_overload()
+    assert limiter.limit == 2
+    for _ in range(100):
+        limiter.on_success()
+    assert limiter.limit == 8
+    for _ in range(10):
+        limiter.on_overload()
+    assert limiter.limit == 1
+
+
+def test_concurrency_limit_is_enforced():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2)
+    limiter.acquire()
+    limiter.acquire()
+    third = threading.Thread(target=limiter.acquire)
+    third.start()
+    third.join(0.1)
+    assert third.is_alive()
+    limiter.release()
+    third.join(1)
+    assert not third.is_alive()
+
+
+@pytest.mark.parametrize(
+    "value, seconds",
+    [("6m0s", 360), ("20ms", 0.02), ("1.5s", 1.5), ("1h2m3s", 3723), ("7", 7)],
+)
+def test_parse_reset_duration(value, seconds):
+    assert parse_reset_duration(value) == pytest.approx(seconds)
+
+
+def test_limits_are_learned_from_headers():
+    limiter = RateLimiter()
+    limiter.update_from_headers(
+        {
+            "x-ratelimit-limit-requests": "500",
+            "x-ratelimit-remaining-requests": "0",
+            "x-ratelimit-reset-requests": "120ms",
+        }
+    )
+    assert limiter.buckets["requests"].capacity == 500
+    assert limiter.buckets["tokens"] is None
+    assert limiter.buckets["requests"].reserve(1) > 0
+
+
+def test_rate_limited_returns_retry_after():
+    limiter = RateLimiter(max_concurrency=8)
+    assert limiter.on_rate_limited({"retry-after": "3"}) == 3
+    assert limiter.concurrency.limit == 2
+
+
+def test_full_jitter_backoff_bounds():
+    for attempt in range(1, 10):
+        backoff = full_jitter_backoff(attempt, base=2, cap=30)
+        assert 0 <= backoff <= min(30, 2 ** (attempt + 1))
+
+
+def test_estimate_request_tokens():
+    messages = [{"role": "user", "content": "x" * 400}]
+    assert estimate_request_tokens((messages,), {"max_tokens": 50}) == 150
@@ -0,0 +1,76 @@
+# tests/test_repo_analysis.py
+
+import subprocess
+
+import pytest
+
+from autogpt.memory.repo_analysis import (
+    RepoAnalysis,
+    RepoAnalysisStore,
+    detect_languages,
+    prompt_version,
+    repo_commit,
+)
+
+URL = "https://github.com/example/project"
+
+
+@pytest.fixture
+def store(tmp_path):
+    return RepoAnalysisStore(str(tmp_path / "store"))
+
+
+def analysis(commit="abc123", version="1-v1", **kwargs):
+    return RepoAnalysis(URL, commit, version, **kwargs)
+
+
+def test_analysis_round_trip(store):
+    stored = analysis(
+        workflows=["ci/test.yml"],
+        dockerfiles=["Dockerfile"],
+        search_results=[{"url": "https://example.com", "analysis": "pip install ."}],
+        languages=["python"],
+        unified_summary="Use Python 3.11",
+    )
+    store.save(stored)
+    assert store.load(URL, "abc123", "1-v1") == stored
+
+
+def test_analyses_are_keyed_by_commit_and_prompt_version(store):
+    store.save(analysis())
+    assert store.load(URL, "def456", "1-v1") is None
+    assert store.load(URL, "abc123", "1-v2") is None
+    assert store.load(URL + "-fork", "abc123", "1-v1") is None
+    # Without a commit, nothing is stored or loaded
+    store.save(analysis(commit=None))
+    assert store.load(URL, None, "1-v1") is None
+
+
+def test_corrupt_analysis_is_ignored(store):
+    store.save(analysis())
+    with open(store.path(URL, "abc123", "1-v1"), "w") as f:
+        f.write("{not json")
+    assert store.load(URL, "abc123", "1-v1") is None
+
+
+def test_prompt_version_follows_prompts():
+    assert prompt_version("a", "b") == prompt_version("a", "b")
+    assert prompt_version("a", "b") != prompt_version("a", "c")
+
+
+def test_detect_languages(tmp_path):
+    for name in ["a.py", "b.py", "c.py", "Main.java", "util.h", "lib.c"]:
+        (tmp_path / name).write_text("")
+    (tmp_path / "node_modules").mkdir()
+    for i in range(10):
+        (tmp_path / "node_modules" / f"{i}.js").write_text("")
+    assert detect_languages(str(tmp_path), limit=2) == ["python", "c"]
+
+
+def test_repo_commit(tmp_path):
+    assert repo_commit(str(tmp_path)) is None
+    git = ["git", "-C", str(tmp_path), "-c", "user.name=t", "-c", "user.email=t@t"]
+    subprocess.run(git[:3] + ["init", "-q"], check=True)
+    subprocess.run(git + ["commit", "-q", "--allow-empty", "-m", "init"], check=True)
+    commit = repo_commit(str(tmp_path))
+    assert commit and len(commit) == 40
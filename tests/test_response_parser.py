@@ -0,0 +1,68 @@
+# tests/test_response_parser.py
+
+import json
+
+import pytest
+
+from autogpt.json_utils.response_parser import parse_response, repair_json
+
+RESPONSE = {"thoughts": "list files", "command": {"name": "ls", "args": {"path": "."}}}
+
+
+def test_valid_json_is_parsed_without_repairs():
+    parsed = parse_response(json.dumps(RESPONSE))
+    assert parsed.ok and parsed.data == RESPONSE
+    assert parsed.repairs == ()
+    assert parsed.command_name == "ls"
+    assert parsed.command_args == {"path": "."}
+    assert parsed.thoughts == "list files"
+
+
+@pytest.mark.parametrize(
+    "content, repair",
+    [
+        (f"Here you go:\n```json\n{json.dumps(RESPONSE)}\n```", "text around the object"),
+        (json.dumps(RESPONSE).replace("}}", "},},"), "trailing commas"),
+        (repr(RESPONSE), "single quotes"),
+        (json.dumps(RESPONSE)[:-3], "truncated object"),
+    ],
+)
+def test_defects_are_repaired(content, repair):
+    parsed = parse_response(content)
+    assert parsed.data == RESPONSE
+    assert repair in parsed.repairs
+
+
+def test_python_literals_and_quotes_in_strings():
+    parsed = parse_response("{'a': True, 'b': None, 'c': 'say \"hi\"', 'd': 'it\\'s'}")
+    assert parsed.data == {"a": True, "b": None, "c": 'say "hi"', "d": "it's"}
+
+
+def test_truncated_values_are_closed():
+    assert parse_response('{"thoughts": "cut off mid-sentence').data == {
+        "thoughts": "cut off mid-sentence"
+    }
+    assert parse_response('{"a": [1, 2').data == {"a": [1, 2]}
+    assert parse_response('{"a": 1, "b":').data == {"a": 1, "b": None}
+    assert parse_response('{"a": 1, "b"').data == {"a": 1, "b": None}
+
+
+def test_strings_are_escaped():
+    text, repairs = repair_json('{"command": "grep \\d+ file\nwc -l"}')
+    assert json.loads(text) == {"command": "grep \\d+ file\nwc -l"}
+    assert set(repairs) == {"invalid escapes", "control characters in strings"}
+
+
+def test_unparsable_responses():
+    assert parse_response("I will now run ls").error
+    assert parse_response("[1, 2]").data is None
+    assert parse_response('{"a": tru}').to_dict() == {}
+
+
+def test_responses_are_parsed_once_and_copied_for_changes():
+    content = json.dumps(RESPONSE) + " "
+    parsed = parse_response(content)
+    assert parse_response(content) is parsed
+    copy = parsed.to_dict()
+    copy["command"]["name"] = "changed"
+    assert parsed.command_name == "ls"
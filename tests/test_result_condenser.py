@@ -0,0 +1,79 @@
+# tests/test_result_condenser.py
+
+import time
+
+from autogpt.processing.result_condenser import ResultCondenser
+
+
+def count_tokens(text):
+    return len(text.split())
+
+
+def maven_log(lines, errors):
+    log = [f"[INFO] Downloading from central: artifact-{i}.pom" for i in range(lines)]
+    for position, error in errors.items():
+        log[position] = error
+    return "\n".join(log)
+
+
+def test_short_results_are_kept_whole():
+    text = "BUILD SUCCESS\nall good"
+    condensed = ResultCondenser(count_tokens).condense(text)
+    assert condensed.text == text
+    assert condensed.dropped_regions == 0
+
+
+def test_errors_in_the_middle_are_kept():
+    text = maven_log(
+        5000,
+        {
+            1200: "[ERROR] Foo.java:[12,8] cannot find symbol",
+            3000: "Traceback (most recent call last):",
+            3001: '  File "setup.py", line 3',
+            3002: "ModuleNotFoundError: No module named 'numpy'",
+            4990: "[INFO] BUILD FAILURE",
+        },
+    )
+    condensed = ResultCondenser(count_tokens, token_budget=500).condense(text)
+    assert count_tokens(condensed.text) <= 500
+    assert "cannot find symbol" in condensed.text
+    assert "No module named 'numpy'" in condensed.text
+    assert "BUILD FAILURE" in condensed.text
+    assert "artifact-0.pom" in condensed.text and "artifact-4999.pom" in condensed.text
+    assert condensed.kept_windows == 3
+
+
+def test_dropped_lines_are_counted():
+    text = maven_log(1000, {500: "npm ERR! code ELIFECYCLE"})
+    condensed = ResultCondenser(
+        count_tokens, token_budget=300, context_lines=2, head_lines=10, tail_lines=10
+    ).condense(text)
+    kept = condensed.text.split("\n")[1:]
+    omitted = [line for line in kept if line.startswith("[... ")]
+    assert len(omitted) == condensed.dropped_regions == 2
+    assert len(kept) - len(omitted) + condensed.dropped_lines == 1000
+    assert omitted == ["[... 488 lines omitted ...]", "[... 487 lines omitted ...]"]
+
+
+def test_word_boundaries_are_respected():
+    text = maven_log(1000, {100: "MIRRORERRORS are fine", 700: "FATAL ERROR here"})
+    condensed = ResultCondenser(count_tokens, token_budget=300).condense(text)
+    assert "FATAL ERROR here" in condensed.text
+    assert "MIRRORERRORS" not in condensed.text
+
+
+def test_windows_beyond_the_budget_are_dropped():
+    text = maven_log(20000, {i: f"FAILED test_{i}" for i in range(100, 19900, 100)})
+    condensed = ResultCondenser(count_tokens, token_budget=1000).condense(text)
+    assert count_tokens(condensed.text) <= 1000
+    assert "FAILED test_100" in condensed.text
+    assert "FAILED test_19800" in condensed.text
+    assert 0 < condensed.kept_windows < 198
+
+
+def test_large_outputs_are_condensed_quickly():
+    text = maven_log(400_000, {200_000: "error[E0425]: cannot find value `x`"})
+    start = time.perf_counter()
+    condensed = ResultCondenser(count_tokens).condense(text)
+    assert time.perf_counter() - start < 2
+    assert "error[E0425]" in condensed.text
@@ -0,0 +1,79 @@
+# tests/test_snapshots.py
+
+import json
+
+from autogpt.memory.snapshots import SnapshotStore, diff, patch
+
+
+def agent_state(cycle):
+    return {
+        "cycle_count": cycle,
+        "config": "x" * 1000,
+        "steps_object": {
+            "1": {"result_of_step": [{"summary": f"step {i}"} for i in range(cycle)]}
+        },
+        "commands": [f"ls {i}" for i in range(cycle)],
+    }
+
+
+def test_diff_and_patch():
+    old = {"a": [1, 2], "b": {"c": 1, "d": 2}, "e": "same"}
+    new = {"a": [1, 2, 3], "b": {"c": 5}, "e": "same", "f": None}
+    delta = diff(old, new)
+    assert delta == {
+        "update": {
+            "a": {"extend": [3]},
+            "b": {"update": {"c": {"set": 5}}, "remove": ["d"]},
+            "f": {"set": None},
+        }
+    }
+    assert patch(json.loads(json.dumps(old)), delta) == new
+    assert diff(new, new) is None
+    assert diff([1, 2], [2]) == {"set": [2]}
+
+
+def test_every_cycle_can_be_rebuilt(tmp_path):
+    store = SnapshotStore(tmp_path, base_every=4)
+    for cycle in range(1, 11):
+        store.save(cycle, agent_state(cycle))
+    assert store.cycles() == list(range(1, 11))
+    bases = sorted(p.name for p in tmp_path.glob("*.base.json"))
+    assert bases == ["cycle_1.base.json", "cycle_5.base.json", "cycle_9.base.json"]
+    for cycle in range(1, 11):
+        assert store.load(cycle) == agent_state(cycle)
+    assert store.load() == agent_state(10)
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_deltas_stay_small(tmp_path):
+    store = SnapshotStore(tmp_path, base_every=1000)
+    sizes = [
+        store.save(cycle, agent_state(cycle)).stat().st_size for cycle in range(1, 200)
+    ]
+    assert sizes[-1] < 200
+    assert max(sizes[1:]) - min(sizes[1:]) < 20
+
+
+def test_saving_a_cycle_again_replaces_it(tmp_path):
+    store = SnapshotStore(tmp_path)
+    store.save(1, agent_state(1))
+    store.save(2, agent_state(2))
+    store.save(2, agent_state(3))
+    assert store.cycles() == [1, 2]
+    assert store.load(2) == agent_state(3)
+
+
+def test_compaction_keeps_later_cycles(tmp_path):
+    store = SnapshotStore(tmp_path, base_every=100)
+    for cycle in range(1, 8):
+        store.save(cycle, agent_state(cycle))
+    store.compact(keep_after=4)
+    assert store.cycles() == [5, 6, 7]
+    assert (tmp_path / "cycle_5.base.json").exists()
+    assert store.load(7) == agent_state(7)
+
+    store.save(8, agent_state(8))
+    assert store.load(8) == agent_state(8)
+    store.compact()
+    assert store.cycles() == [8]
+    assert store.load() == agent_state(8)
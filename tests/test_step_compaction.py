@@ -0,0 +1,96 @@
+# tests/test_step_compaction.py
+
+from autogpt.memory.step_compaction import StepCompactor, format_steps
+
+
+class FakeLLM:
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+
+    def summarize(self, text):
+        if self.fail:
+            raise RuntimeError("rate limited")
+        self.calls.append(("summarize", text))
+        return f"digest of {text.count('Call to tool')} steps"
+
+    def merge(self, text):
+        self.calls.append(("merge", text))
+        return "merged digest"
+
+
+def steps(n):
+    return [
+        (f"Call to tool linux_terminal with arguments {{'command': 'step {i}'}}",
+         {"summary": f"output of step {i}"})
+        for i in range(n)
+    ]
+
+
+def compact_text(compactor, history):
+    compactor.compact(history)
+    return "\n".join(compactor.digests) + format_steps(compactor.recent(history))
+
+
+def test_recent_steps_stay_verbatim():
+    llm = FakeLLM()
+    compactor = StepCompactor(llm.summarize, llm.merge, keep_recent=3, fold_size=2)
+    history = steps(4)
+    compactor.compact(history)
+    assert compactor.digests == []
+    assert compactor.recent(history) == history
+
+    history = steps(5)
+    compactor.compact(history)
+    assert compactor.digests == ["digest of 2 steps"]
+    assert compactor.recent(history) == history[2:]
+    assert "step 1'" not in format_steps(compactor.recent(history))
+
+
+def test_each_fold_costs_constant_llm_calls():
+    llm = FakeLLM()
+    compactor = StepCompactor(
+        llm.summarize, llm.merge, keep_recent=3, fold_size=2, max_digests=2
+    )
+    history = []
+    calls_per_step = []
+    for step in steps(40):
+        history.append(step)
+        before = len(llm.calls)
+        compactor.compact(history)
+        calls_per_step.append(len(llm.calls) - before)
+    assert max(calls_per_step) <= 2
+    assert len(compactor.digests) <= 2
+    assert ("merge", "digest of 2 steps\ndigest of 2 steps") in llm.calls
+
+
+def test_prompt_size_is_bounded():
+    llm = FakeLLM()
+    compactor = StepCompactor(
+        llm.summarize, llm.merge, keep_recent=4, fold_size=3, max_digests=3
+    )
+    for n in range(20, 400, 20):
+        history = steps(n)
+        verbatim_bound = len(format_steps(history[-(4 + 3 - 1) :]))
+        assert len(compact_text(compactor, history)) <= verbatim_bound + 3 * 20
+
+
+def test_digests_are_cached():
+    llm = FakeLLM()
+    history = steps(12)
+    compactor = StepCompactor(llm.summarize, llm.merge, keep_recent=2, fold_size=5)
+    compactor.compact(history)
+    calls = len(llm.calls)
+
+    # Restarting from scratch reuses the cached digests
+    compactor.digests, compactor.folded = [], 0
+    compactor.compact(history)
+    assert len(llm.calls) == calls
+
+
+def test_failed_fold_keeps_steps_verbatim():
+    compactor = StepCompactor(FakeLLM(fail=True).summarize, keep_recent=2, fold_size=2)
+    history = steps(6)
+    compactor.compact(history)
+    assert compactor.digests == []
+    assert compactor.recent(history) == history
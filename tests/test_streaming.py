@@ -0,0 +1,81 @@
+# tests/test_streaming.py
+
+import json
+
+import pytest
+
+from autogpt.json_utils.incremental import IncrementalJSONParser, MalformedJSONError
+from autogpt.llm.streaming import ChatStreamMonitor, StreamAborted
+
+RESPONSE = {
+    "thoughts": "I should list the \"files\"\nfirst.",
+    "command": {"name": "linux_terminal", "args": {"command": "ls -la"}},
+}
+
+
+def chunked(text, size):
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("size", [1, 4, 1000])
+def test_parser_matches_json_loads(size):
+    parser = IncrementalJSONParser()
+    text = json.dumps(RESPONSE)
+    events = []
+    for chunk in chunked(text, size):
+        events += parser.feed(chunk)
+    assert parser.done
+    assert parser.value == RESPONSE
+    paths = [e.path for e in events]
+    assert paths.index(("command", "name")) < paths.index(("command",))
+    assert paths[-1] == ()
+
+
+@pytest.mark.parametrize("preamble", ["```json\n", "Sure, here is my next step:\n"])
+def test_parser_skips_preamble(preamble):
+    parser = IncrementalJSONParser()
+    parser.feed(preamble + json.dumps(RESPONSE) + "\n```")
+    assert parser.value == RESPONSE
+
+
+@pytest.mark.parametrize("text", ["{'a': 1}", '{"a" 1}', '{"a": 1,}', '{"a": tru}'])
+def test_parser_fails_on_first_bad_character(text):
+    with pytest.raises(MalformedJSONError):
+        IncrementalJSONParser().feed(text)
+
+
+def test_monitor_reports_command_before_end():
+    ready = []
+    monitor = ChatStreamMonitor(
+        known_commands={"linux_terminal"},
+        on_command_ready=lambda name, args: ready.append((name, args)),
+    )
+    text = json.dumps({"command": RESPONSE["command"], "thoughts": "x" * 500})
+    fed = 0
+    for chunk in chunked(text, 10):
+        monitor.feed(chunk)
+        fed += len(chunk)
+        if ready:
+            break
+    assert fed < len(text)
+    assert ready == [("linux_terminal", {"command": "ls -la"})]
+    assert monitor.stats.time_to_command_ready is not None
+
+
+def test_monitor_receives_unparsable_response_in_full():
+    monitor = ChatStreamMonitor(known_commands={"linux_terminal"})
+    text = "{'thoughts': 'x', 'command': {'name': 'rm_everything', 'args': {}}}"
+    for chunk in chunked(text, 5):
+        monitor.feed(chunk)
+    assert monitor.content == text
+    assert monitor.stats.aborted is None
+    assert monitor.stats.unparsed
+
+
+def test_monitor_aborts_unknown_command():
+    monitor = ChatStreamMonitor(known_commands={"linux_terminal"})
+    text = json.dumps({"command": {"name": "rm_everything", "args": {}}})
+    with pytest.raises(StreamAborted):
+        for chunk in chunked(text, 5):
+            monitor.feed(chunk)
+    assert "rm_everything" in monitor.stats.aborted
@@ -0,0 +1,121 @@
+# tests/test_tokens.py
+
+import dataclasses
+
+import pytest
+import tiktoken
+
+from autogpt.llm import tokens
+from autogpt.llm.base import ChatSequence, Message
+from autogpt.llm.tokens import count_messages_tokens, get_encoding, message_tokens
+
+
+class WhitespaceEncoding:
+    """Stands in for the tiktoken encodings, which are downloaded on first use"""
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, text):
+        self.encoded.append(text)
+        return text.split()
+
+
+def reference_count(messages, tokens_per_message=3):
+    total = 3
+    for message in messages:
+        total += tokens_per_message
+        total += sum(len(v.split()) for v in message.raw().values())
+    return total
+
+
+@pytest.fixture(autouse=True)
+def encoding(monkeypatch):
+    encoding = WhitespaceEncoding()
+    get_encoding.cache_clear()
+    tokens._count_tokens.cache_clear()
+    monkeypatch.setattr(tiktoken, "encoding_for_model", lambda model: encoding)
+    yield encoding
+    get_encoding.cache_clear()
+    tokens._count_tokens.cache_clear()
+
+
+def test_counts_follow_message_format():
+    messages = [
+        Message("system", "You are a helpful agent."),
+        Message("user", "Install the dependencies and run the tests."),
+    ]
+    assert count_messages_tokens(messages, "gpt-4o-mini") == reference_count(messages)
+    assert count_messages_tokens(messages, "gpt-3.5-turbo-0125") == reference_count(
+        messages, tokens_per_message=4
+    )
+    with pytest.raises(NotImplementedError):
+        count_messages_tokens(messages, "llama-3")
+
+
+def test_encoders_are_loaded_once():
+    get_encoding("gpt-4")
+    get_encoding("gpt-4")
+    assert get_encoding.cache_info().misses == 1
+
+
+def test_message_memo_skips_recounting(monkeypatch):
+    counted = []
+
+    def count_text_tokens(text, encoding_model="gpt-4"):
+        counted.append(text)
+        return len(text.split())
+
+    monkeypatch.setattr(tokens, "count_text_tokens", count_text_tokens)
+    message = Message("user", "run the tests")
+    first = message_tokens(message, "gpt-4")
+    assert counted == ["user", "run the tests"]
+
+    counted.clear()
+    assert message_tokens(message, "gpt-4") == first
+    assert counted == []
+
+
+def test_sequence_only_counts_new_messages(encoding):
+    sequence = ChatSequence.for_model("gpt-4o-mini")
+    sequence.add("system", "You are a helpful agent.")
+    sequence.add("user", "step 1")
+    first = sequence.token_length
+    assert first == reference_count(sequence.messages)
+
+    encoding.encoded.clear()
+    sequence.add("user", "step 2 output")
+    assert sequence.token_length == reference_count(sequence.messages)
+    assert encoding.encoded == ["step 2 output"]
+
+    encoding.encoded.clear()
+    assert sequence.token_length == reference_count(sequence.messages)
+    assert sequence[1:].token_length == reference_count(sequence.messages[1:])
+    assert encoding.encoded == []
+
+
+def test_sequence_recounts_after_rebuild():
+    sequence = ChatSequence.for_model("gpt-4o-mini")
+    sequence.add("user", "a long first message " * 20)
+    assert sequence.token_length == reference_count(sequence.messages)
+
+    sequence.setFromDictList([{"role": "user", "content": "short"}])
+    assert sequence.token_length == reference_count(sequence.messages)
+
+    sequence.insert(0, Message("system", "inserted first"))
+    assert sequence.token_length == reference_count(sequence.messages)
+
+
+def test_messages_are_immutable_and_memoized(encoding):
+    message = Message("assistant", "some content")
+    before = message_tokens(message, "gpt-4")
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        message.content = "other content"
+
+    encoding.encoded.clear()
+    assert message_tokens(message, "gpt-4") == before
+    assert encoding.encoded == []
+
+    changed = dataclasses.replace(message, content="some longer content than before")
+    assert message_tokens(changed, "gpt-4") == reference_count([changed]) - 3
+    assert changed == Message("assistant", "some longer content than before")
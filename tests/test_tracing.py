@@ -0,0 +1,80 @@
+# tests/test_tracing.py
+
+import json
+import threading
+
+from autogpt.logs.async_writer import background_writer
+from autogpt.logs.tracing import Tracer, traced, tracer
+
+
+@traced()
+def work(x):
+    with tracer.span("inner", size=x):
+        return x * 2
+
+
+def read_trace(path):
+    background_writer.flush(timeout=5)
+    return json.loads(path.read_text())
+
+
+def test_disabled_tracer_records_nothing():
+    assert not tracer.enabled
+    assert work(2) == 4
+    assert tracer._events == []
+    with Tracer().span("anything") as span:
+        assert span is None
+
+
+def test_trace_is_chrome_trace_event_json(tmp_path):
+    path = tmp_path / "trace.json"
+    tracer.start(path)
+    try:
+        tracer.begin("cycle", type="CMD")
+        assert work(3) == 6
+        thread = threading.Thread(target=work, args=(1,), name="helper")
+        thread.start()
+        thread.join()
+        tracer.end(command="ls")
+    finally:
+        tracer.stop()
+
+    events = read_trace(path)
+    complete = [e for e in events if e["ph"] == "X"]
+    assert [e["name"] for e in complete] == ["inner", "work", "inner", "work"]
+    inner, outer = complete[:2]
+    assert outer["ts"] <= inner["ts"]
+    assert inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"]
+    assert inner["args"] == {"size": 3}
+    assert [e["ph"] for e in events if e["ph"] in "BE"] == ["B", "E"]
+    names = {e["args"]["name"] for e in events if e.get("name") == "thread_name"}
+    assert "helper" in names
+
+
+def test_trace_of_an_unfinished_run_can_be_read(tmp_path):
+    path = tmp_path / "trace.json"
+    tracer.start(path)
+    try:
+        work(1)
+        tracer.flush()
+        # Viewers accept a trace without its closing bracket
+        background_writer.flush(timeout=5)
+        events = json.loads(path.read_text() + "]")
+        assert any(e["name"] == "work" for e in events)
+    finally:
+        tracer.stop()
+    assert not tracer.enabled
+
+
+def test_errors_are_recorded(tmp_path):
+    path = tmp_path / "trace.json"
+    tracer.start(path)
+    try:
+        with tracer.span("failing"):
+            raise ValueError
+    except ValueError:
+        pass
+    finally:
+        tracer.stop()
+    failing, = (e for e in read_trace(path) if e.get("name") == "failing")
+    assert failing["args"] == {"error": "ValueError"}